@@ -1,6 +1,9 @@
 from __future__ import annotations
-import json, queue, sqlite3, threading, time, uuid
-from typing import Any, Dict, Optional
+import json, os, queue, sqlite3, threading, time, uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from .exec_metrics import RollingWindow
 
 def _ms() -> int:
     return int(time.time() * 1000)
@@ -8,6 +11,8 @@ def _ms() -> int:
 def _json(obj: Any) -> str:
     return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
 
+RATE_WINDOW_S = 60
+
 class AiLogQueue:
     def __init__(self, weex_client, db_path: str = "ai_logs.sqlite", flush_interval_s: float = 2.0, max_batch: int = 25):
         self.weex = weex_client
@@ -17,9 +22,36 @@ class AiLogQueue:
 
         self._stop = threading.Event()
         self._poke = queue.Queue(maxsize=1)
-        self._init_db()
-        self._t = threading.Thread(target=self._run, daemon=True)
-        self._t.start()
+        # the table and the flusher thread are created on the first enqueue
+        self._t: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Backlog counters, kept in step with every insert/update/delete so
+        # stats() never scans the table. Seeded once from the db at start.
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._tries: Dict[int, int] = {}          # pending rows by attempts so far
+        self._oldest_ms: Optional[int] = None     # refreshed by the flusher (indexed MIN)
+        self._enqueued = 0
+        self._uploaded = 0
+        self._failed_attempts = 0
+        self._uploaded_by_tries: Dict[int, int] = {}
+        self._last_error: Optional[str] = None
+        self._last_flush_ms: Optional[int] = None
+        self._upload_latency = RollingWindow(200)   # one upload_ai_log call
+        self._e2e_latency = RollingWindow(200)      # enqueue -> uploaded
+        self._drained: Deque[List[int]] = deque()   # [unix second, uploads]
+        self._seeded = False
+
+    def _ensure_started(self):
+        if self._t is not None:
+            return
+        with self._start_lock:
+            if self._t is None:
+                self._init_db()
+                t = threading.Thread(target=self._run, daemon=True)
+                t.start()
+                self._t = t
 
     def _init_db(self):
         conn = sqlite3.connect(self.db_path)
@@ -35,11 +67,48 @@ class AiLogQueue:
                 last_error TEXT
             );""")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_next_try ON ai_log_events(next_try_ms);")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_created ON ai_log_events(created_ms);")
             conn.commit()
+            # rows left over from a previous run
+            self._seed(conn)
+        finally:
+            conn.close()
+
+    def _seed(self, conn: sqlite3.Connection):
+        tries = dict(conn.execute("SELECT tries, COUNT(*) FROM ai_log_events GROUP BY tries").fetchall())
+        oldest = conn.execute("SELECT MIN(created_ms) FROM ai_log_events").fetchone()[0]
+        with self._stats_lock:
+            self._tries = {int(k): int(v) for k, v in tries.items()}
+            self._pending = sum(self._tries.values())
+            self._oldest_ms = oldest
+            self._seeded = True
+
+    def _peek_db(self):
+        # Before the flusher starts, stats() would otherwise report an empty
+        # backlog while the file still holds a previous run's rows. Read-only,
+        # so a missing file is not created.
+        if self._seeded or not os.path.exists(self.db_path):
+            return
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        except sqlite3.Error:
+            return
+        try:
+            self._seed(conn)
+        except sqlite3.Error:
+            pass   # no table yet
         finally:
             conn.close()
 
+    def resume(self) -> int:
+        # start the flusher at boot if a previous run left rows behind; returns the backlog
+        self._peek_db()
+        if self._pending:
+            self._ensure_started()
+        return self._pending
+
     def enqueue(self, payload: Dict[str, Any]) -> str:
+        self._ensure_started()
         eid = str(uuid.uuid4())
         now = _ms()
         conn = sqlite3.connect(self.db_path)
@@ -51,6 +120,12 @@ class AiLogQueue:
             conn.commit()
         finally:
             conn.close()
+        with self._stats_lock:
+            self._pending += 1
+            self._enqueued += 1
+            self._tries[0] = self._tries.get(0, 0) + 1
+            if self._oldest_ms is None:
+                self._oldest_ms = now
 
         try:
             self._poke.put_nowait(1)
@@ -60,6 +135,8 @@ class AiLogQueue:
 
     def stop(self):
         self._stop.set()
+        if self._t is None:
+            return
         try:
             self._poke.put_nowait(1)
         except queue.Full:
@@ -68,23 +145,26 @@ class AiLogQueue:
 
     def _run(self):
         while not self._stop.is_set():
-            self._flush_due()
+            # a full batch means more is probably due: go again without waiting
+            if self._flush_due() >= self.max_batch:
+                continue
             try:
                 self._poke.get(timeout=self.flush_interval_s)
             except queue.Empty:
                 pass
 
-    def _flush_due(self):
+    def _flush_due(self) -> int:
         conn = sqlite3.connect(self.db_path)
         try:
             now = _ms()
             rows = conn.execute(
-                "SELECT id, tries, payload_json FROM ai_log_events WHERE next_try_ms <= ? ORDER BY next_try_ms LIMIT ?",
+                "SELECT id, created_ms, tries, payload_json FROM ai_log_events WHERE next_try_ms <= ? ORDER BY next_try_ms LIMIT ?",
                 (now, self.max_batch),
             ).fetchall()
 
-            for eid, tries, payload_json in rows:
+            for eid, created_ms, tries, payload_json in rows:
                 payload = json.loads(payload_json)
+                t0 = time.perf_counter()
                 try:
                     resp = self.weex.upload_ai_log(
                         stage=payload["stage"],
@@ -99,6 +179,7 @@ class AiLogQueue:
                         raise RuntimeError(f"WEEX non-success: {resp}")
                     conn.execute("DELETE FROM ai_log_events WHERE id=?", (eid,))
                     conn.commit()
+                    self._on_uploaded(tries, created_ms, time.perf_counter() - t0)
                 except Exception as e:
                     new_tries = tries + 1
                     backoff_s = min(60, 2 ** min(new_tries, 6))
@@ -108,5 +189,74 @@ class AiLogQueue:
                         (new_tries, next_try, str(e)[:500], eid),
                     )
                     conn.commit()
+                    self._on_failed(tries, str(e)[:500], time.perf_counter() - t0)
+
+            if rows:
+                oldest = conn.execute("SELECT MIN(created_ms) FROM ai_log_events").fetchone()[0]
+                with self._stats_lock:
+                    self._oldest_ms = oldest
+            with self._stats_lock:
+                self._last_flush_ms = now
+            return len(rows)
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    def _on_uploaded(self, tries: int, created_ms: int, took_s: float):
+        now = time.time()
+        sec = int(now)
+        with self._stats_lock:
+            self._pending -= 1
+            self._uploaded += 1
+            self._tries[tries] = self._tries.get(tries, 1) - 1
+            if not self._tries[tries]:
+                del self._tries[tries]
+            self._uploaded_by_tries[tries + 1] = self._uploaded_by_tries.get(tries + 1, 0) + 1
+            self._upload_latency.add(took_s)
+            self._e2e_latency.add(max(0.0, now - created_ms / 1000))
+            if self._drained and self._drained[-1][0] == sec:
+                self._drained[-1][1] += 1
+            else:
+                self._drained.append([sec, 1])
+            while self._drained and self._drained[0][0] <= sec - RATE_WINDOW_S:
+                self._drained.popleft()
+
+    def _on_failed(self, tries: int, err: str, took_s: float):
+        with self._stats_lock:
+            self._failed_attempts += 1
+            self._last_error = err
+            self._tries[tries] = self._tries.get(tries, 1) - 1
+            if not self._tries[tries]:
+                del self._tries[tries]
+            self._tries[tries + 1] = self._tries.get(tries + 1, 0) + 1
+            self._upload_latency.add(took_s)
+
+    def stats(self, max_backlog_age_s: Optional[float] = None) -> Dict[str, Any]:
+        if self._t is None:
+            self._peek_db()
+        now = time.time()
+        with self._stats_lock:
+            oldest = self._oldest_ms if self._pending else None
+            age = max(0.0, now - oldest / 1000) if oldest else 0.0
+            drained = sum(n for sec, n in self._drained if sec > int(now) - RATE_WINDOW_S)
+            out = {
+                "started": self._t is not None,
+                "pending": self._pending,
+                "oldest_created_ms": oldest,
+                "backlog_age_s": round(age, 3),
+                "tries": {str(k): v for k, v in sorted(self._tries.items())},
+                "enqueued": self._enqueued,
+                "uploaded": self._uploaded,
+                "uploaded_by_tries": {str(k): v for k, v in sorted(self._uploaded_by_tries.items())},
+                "failed_attempts": self._failed_attempts,
+                "last_error": self._last_error,
+                "last_flush_ms": self._last_flush_ms,
+                "avg_upload_latency_s": self._upload_latency.mean(),
+                "avg_e2e_latency_s": self._e2e_latency.mean(),
+                "drain_rate_per_s": drained / RATE_WINDOW_S,
+                "max_batch": self.max_batch,
+                "flush_interval_s": self.flush_interval_s,
+            }
+        if max_backlog_age_s is not None:
+            out["healthy"] = age <= max_backlog_age_s
+            out["max_backlog_age_s"] = max_backlog_age_s
+        return out
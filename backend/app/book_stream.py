@@ -0,0 +1,194 @@
+from __future__ import annotations
+import json, struct, threading, time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .depth import DepthTop
+
+Level = Tuple[float, float]
+
+# Binary frame: kind (b"S" snapshot, b"D" delta), seq u32, ts f64, n_asks u16,
+# n_bids u16, then n_asks + n_bids levels of (price f64, qty f32). In a delta
+# qty 0 removes the level. A delta with no levels and an unchanged seq is a
+# heartbeat. Frames are self-delimiting, so a stream is just frames back to back.
+_HEAD = struct.Struct("<cIdHH")
+_LEVEL = struct.Struct("<df")
+
+MAX_HZ = 20.0
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+def _diff(old: Dict[float, float], new: Dict[float, float]) -> List[Level]:
+    out = [(px, q) for px, q in new.items() if old.get(px) != q]
+    out.extend((px, 0.0) for px in old if px not in new)
+    return out
+
+class _Book:
+    __slots__ = ("seq", "ts", "asks", "bids", "deltas")
+
+    def __init__(self, keep: int):
+        self.seq = 0
+        self.ts = 0.0
+        self.asks: Dict[float, float] = {}
+        self.bids: Dict[float, float] = {}
+        self.deltas: Deque[Tuple[int, List[Level], List[Level]]] = deque(maxlen=keep)
+
+class BookFeed:
+    # Latest top-N book per symbol plus its recent level deltas, numbered by
+    # seq. The market-data path writes one update per depth fetch; a fetch
+    # that changed nothing does not bump seq. Each stream client remembers the
+    # last seq it was sent and asks for the next frame: everything that
+    # changed since, coalesced into one delta, or a full snapshot if it is new
+    # or has fallen behind the retained deltas.
+    def __init__(self, levels: int = 10, keep: int = 256):
+        self.levels = levels
+        self.keep = keep
+        self._books: Dict[str, _Book] = {}
+        self._cond = threading.Condition()
+        self.clients = 0
+        self.updates = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def update(self, symbol: str, top: DepthTop, ts: Optional[float] = None) -> int:
+        n = self.levels
+        asks = dict(zip(top.ask_px[:n], top.ask_qty[:n]))
+        bids = dict(zip(top.bid_px[:n], top.bid_qty[:n]))
+        with self._cond:
+            b = self._books.get(symbol)
+            if b is None:
+                b = self._books[symbol] = _Book(self.keep)
+            da, db = _diff(b.asks, asks), _diff(b.bids, bids)
+            self.updates += 1
+            if b.seq and not da and not db:
+                return b.seq
+            b.seq += 1
+            b.ts = ts or time.time()
+            if len(da) + len(db) >= len(asks) + len(bids):
+                # the whole book turned over: anyone behind now needs a snapshot,
+                # so the older deltas (and this one) are dead weight
+                b.deltas.clear()
+            else:
+                b.deltas.append((b.seq, da, db))
+            b.asks, b.bids = asks, bids
+            self._cond.notify_all()
+            return b.seq
+
+    def seq(self, symbol: str) -> int:
+        with self._cond:
+            b = self._books.get(symbol)
+            return b.seq if b else 0
+
+    def wait(self, symbol: str, seq: int, timeout: float) -> bool:
+        # True once the book has moved past seq
+        with self._cond:
+            return self._cond.wait_for(lambda: (self._books.get(symbol) or _NO_BOOK).seq != seq, timeout)
+
+    def snapshot(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            b = self._books.get(symbol)
+            if b is None or not b.seq:
+                return None
+            return self._snapshot(symbol, b)
+
+    def _snapshot(self, symbol: str, b: _Book) -> Dict[str, Any]:
+        return {
+            "type": "snapshot", "symbol": symbol, "seq": b.seq, "ts": b.ts,
+            "asks": sorted(b.asks.items()),
+            "bids": sorted(b.bids.items(), reverse=True),
+        }
+
+    def next_frame(self, symbol: str, seq: int) -> Optional[Dict[str, Any]]:
+        # None when nothing changed since seq
+        with self._cond:
+            b = self._books.get(symbol)
+            if b is None or b.seq == seq:
+                return None
+            oldest = b.deltas[0][0] if b.deltas else b.seq + 1
+            if seq <= 0 or seq > b.seq or seq < oldest - 1:
+                return self._snapshot(symbol, b)
+            asks: Dict[float, float] = {}
+            bids: Dict[float, float] = {}
+            for s, da, db in b.deltas:
+                if s > seq:
+                    asks.update(da)
+                    bids.update(db)
+            if len(asks) + len(bids) >= len(b.asks) + len(b.bids):
+                # the whole book turned over: a snapshot is no bigger and needs no merging
+                return self._snapshot(symbol, b)
+            return {"type": "delta", "symbol": symbol, "seq": b.seq, "ts": b.ts, "asks": list(asks.items()), "bids": list(bids.items())}
+
+    def on_sent(self, nbytes: int):
+        with self._cond:
+            self.frames_sent += 1
+            self.bytes_sent += nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "levels": self.levels,
+                "clients": self.clients,
+                "updates": self.updates,
+                "seq": {sym: b.seq for sym, b in self._books.items()},
+                "frames_sent": self.frames_sent,
+                "bytes_sent": self.bytes_sent,
+            }
+
+_NO_BOOK = _Book(0)
+
+def encode_json(frame: Dict[str, Any]) -> bytes:
+    # one Server-Sent Event; the seq doubles as the event id
+    return f"id: {frame['seq']}\nevent: {frame['type']}\ndata: {_json(frame)}\n\n".encode("utf-8")
+
+def encode_binary(frame: Dict[str, Any]) -> bytes:
+    asks, bids = frame["asks"], frame["bids"]
+    kind = b"S" if frame["type"] == "snapshot" else b"D"
+    parts = [_HEAD.pack(kind, frame["seq"] & 0xFFFFFFFF, frame["ts"], len(asks), len(bids))]
+    pack = _LEVEL.pack
+    parts.extend(pack(px, q) for px, q in asks)
+    parts.extend(pack(px, q) for px, q in bids)
+    return b"".join(parts)
+
+def decode_binary(buf: bytes, offset: int = 0) -> Tuple[Dict[str, Any], int]:
+    # inverse of encode_binary; returns the frame and the offset after it
+    kind, seq, ts, na, nb = _HEAD.unpack_from(buf, offset)
+    offset += _HEAD.size
+    levels = [_LEVEL.unpack_from(buf, offset + i * _LEVEL.size) for i in range(na + nb)]
+    offset += (na + nb) * _LEVEL.size
+    return {"type": "snapshot" if kind == b"S" else "delta", "seq": seq, "ts": ts, "asks": levels[:na], "bids": levels[na:]}, offset
+
+def stream(feed: BookFeed, symbol: str, write: Callable[[bytes], None], fmt: str = "json", hz: float = 4.0,
+           heartbeat_s: float = 15.0, stop: Optional[threading.Event] = None):
+    # One client: block until the book moves, send at most hz frames a second
+    # (changes in between are coalesced), heartbeat when idle. Returns when
+    # write() raises, i.e. the client went away.
+    encode = encode_binary if fmt == "binary" else encode_json
+    interval = 1.0 / max(0.1, min(MAX_HZ, hz))
+    seq = 0
+    last = 0.0
+    with feed._cond:
+        feed.clients += 1
+    try:
+        while stop is None or not stop.is_set():
+            wait = interval - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+            if not feed.wait(symbol, seq, heartbeat_s):
+                if fmt == "binary":
+                    beat = encode_binary({"type": "delta", "seq": seq, "ts": time.time(), "asks": [], "bids": []})
+                else:
+                    beat = b": keepalive\n\n"
+                write(beat)
+                continue
+            frame = feed.next_frame(symbol, seq)
+            if frame is None:
+                continue
+            data = encode(frame)
+            write(data)
+            feed.on_sent(len(data))
+            seq = frame["seq"]
+            last = time.monotonic()
+    finally:
+        with feed._cond:
+            feed.clients -= 1
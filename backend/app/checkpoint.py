@@ -0,0 +1,107 @@
+from __future__ import annotations
+import json, os, threading, time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+FORMAT_VERSION = 1
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+class Checkpointer:
+    # Periodic warm-restart snapshot of runtime state. Each component registers
+    # a state() / load_state() pair; a background thread collects them (each
+    # under its own lock, briefly) and writes one file with tmp + os.replace,
+    # so a crash mid-write leaves the previous checkpoint intact.
+    def __init__(self, path: str, interval_s: float = 5.0):
+        self.path = path
+        self.interval_s = interval_s
+        self._parts: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None]]] = {}
+        self._stop = threading.Event()
+        self._t: Optional[threading.Thread] = None
+        self.saves = 0
+        self.failures = 0
+        self.last_save_ms: Optional[float] = None
+        self.last_saved_at: Optional[float] = None
+        self.restored: Optional[Dict[str, Any]] = None
+
+    def register(self, name: str, state: Callable[[], Any], load: Callable[[Any], None]):
+        self._parts[name] = (state, load)
+
+    def save(self) -> bool:
+        t0 = time.perf_counter()
+        doc: Dict[str, Any] = {"v": FORMAT_VERSION, "ts": time.time(), "parts": {}}
+        for name, (state, _) in self._parts.items():
+            try:
+                doc["parts"][name] = state()
+            except Exception as e:
+                print(f"checkpoint: skipping {name}: {e}")
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(_json(doc))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self.failures += 1
+            print(f"checkpoint: write failed: {e}")
+            return False
+        self.saves += 1
+        self.last_saved_at = doc["ts"]
+        self.last_save_ms = (time.perf_counter() - t0) * 1000
+        return True
+
+    def restore(self) -> Optional[Dict[str, Any]]:
+        t0 = time.perf_counter()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"checkpoint: ignoring unreadable {self.path}: {e}")
+            return None
+        if doc.get("v") != FORMAT_VERSION:
+            print(f"checkpoint: ignoring {self.path}, format v{doc.get('v')}")
+            return None
+        loaded = []
+        for name, st in (doc.get("parts") or {}).items():
+            part = self._parts.get(name)
+            if part is None:
+                continue
+            try:
+                part[1](st)
+                loaded.append(name)
+            except Exception as e:
+                print(f"checkpoint: could not restore {name}: {e}")
+        self.restored = {
+            "parts": loaded,
+            "age_s": round(time.time() - float(doc.get("ts") or 0), 3),
+            "ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+        return self.restored
+
+    def start(self):
+        if self._t is None:
+            self._t = threading.Thread(target=self._run, daemon=True, name="checkpoint")
+            self._t.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.save()
+
+    def stop(self, final_save: bool = True):
+        self._stop.set()
+        if self._t is not None:
+            self._t.join(timeout=5)
+            self._t = None
+        if final_save:
+            self.save()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "saves": self.saves,
+            "failures": self.failures,
+            "last_save_ms": self.last_save_ms,
+            "last_saved_at": self.last_saved_at,
+            "restored": self.restored,
+        }
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List
 import os
 
 def _bool_env(name: str, default: bool = False) -> bool:
@@ -7,6 +8,10 @@ def _bool_env(name: str, default: bool = False) -> bool:
         return default
     return v.strip().lower() in ("1", "true", "yes", "y", "on")
 
+def _list_env(name: str, default: str) -> List[str]:
+    v = os.getenv(name) or default
+    return [x.strip() for x in v.split(",") if x.strip()]
+
 @dataclass
 class Settings:
     weex_api_key: str = os.getenv("WEEX_API_KEY", "")
@@ -17,6 +22,16 @@ class Settings:
 
     dry_run: bool = _bool_env("DRY_RUN", True)
     symbol: str = os.getenv("SYMBOL", "cmt_btcusdt")
+    # SYMBOLS=cmt_btcusdt,cmt_ethusdt runs several instruments in one process
+    symbols: List[str] = field(default_factory=lambda: _list_env("SYMBOLS", os.getenv("SYMBOL", "cmt_btcusdt")))
     order_size: str = os.getenv("ORDER_SIZE", "0.001")
+    workers: int = int(os.getenv("WORKERS", "4"))
+    max_inflight_per_symbol: int = int(os.getenv("MAX_INFLIGHT_PER_SYMBOL", "2"))
+    # pre-trade risk limits, see app.execution.risk; 0 disables one
+    risk_max_notional: float = float(os.getenv("RISK_MAX_NOTIONAL", "2000"))
+    risk_max_position: float = float(os.getenv("RISK_MAX_POSITION", "0.05"))
+    risk_max_orders_per_s: float = float(os.getenv("RISK_MAX_ORDERS_PER_S", "5"))
+    risk_burst: float = float(os.getenv("RISK_BURST", "10"))
+    risk_price_band_bps: float = float(os.getenv("RISK_PRICE_BAND_BPS", "100"))
 
 settings = Settings()
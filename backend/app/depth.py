@@ -0,0 +1,124 @@
+from __future__ import annotations
+import json
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+try:  # optional faster decoder for the full-decode fallback
+    import orjson as _fastjson
+except ImportError:
+    _fastjson = None
+
+_STRIP = b'[]" \t\r\n'
+
+class DepthTop:
+    __slots__ = ("bid_px", "bid_qty", "ask_px", "ask_qty")
+
+    def __init__(self, ask_px: array, ask_qty: array, bid_px: array, bid_qty: array):
+        self.ask_px = ask_px
+        self.ask_qty = ask_qty
+        self.bid_px = bid_px
+        self.bid_qty = bid_qty
+
+    def snapshot(self, topn: int = 5) -> Dict[str, float]:
+        if not self.ask_px or not self.bid_px:
+            raise RuntimeError("Depth empty")
+        best_ask, best_bid = self.ask_px[0], self.bid_px[0]
+        return {
+            "mid": (best_ask + best_bid) / 2.0,
+            "spread": max(0.0, best_ask - best_bid),
+            "ask_qty": sum(self.ask_qty[:topn]),
+            "bid_qty": sum(self.bid_qty[:topn]),
+        }
+
+def _skip_ws(raw: bytes, i: int) -> int:
+    n = len(raw)
+    while i < n and raw[i] in b" \t\r\n":
+        i += 1
+    return i
+
+def _scan_side(raw: bytes, key: bytes, top_n: int) -> Optional[List[bytes]]:
+    # Locate the first top_n [price, qty] levels of one side with bytes.find
+    # and return them flattened as [px, qty, px, qty, ...] byte strings.
+    i = raw.find(key)
+    if i < 0:
+        return None
+    # the value must be the array itself: "asks": null (or anything else) goes
+    # to the full decode rather than picking up the next side's array
+    j = _skip_ws(raw, i + len(key))
+    if raw[j:j + 1] != b":":
+        return None
+    j = _skip_ws(raw, j + 1)
+    if raw[j:j + 1] != b"[":
+        return None
+    start = j + 1
+    if raw[start:start + 16].lstrip()[:1] == b"]":
+        return []
+    end = raw.find(b"]]", start)
+    if end < 0:
+        return None
+    j, k = start, 0
+    while k < top_n:
+        j = raw.find(b"]", j, end + 1)
+        if j < 0:
+            break
+        j += 1
+        k += 1
+    parts = raw[start:j].translate(None, _STRIP).split(b",")
+    if k == 0 or len(parts) != 2 * k:
+        return None
+    return parts
+
+def _json_sides(raw: bytes, top_n: int) -> Tuple[List[Any], List[Any]]:
+    d: Any = _fastjson.loads(raw) if _fastjson else json.loads(raw)
+    data = d.get("data", d) if isinstance(d, dict) else {}
+    if not isinstance(data, dict):
+        data = {}
+    asks = data.get("asks") or []
+    bids = data.get("bids") or []
+    return [v for lv in asks[:top_n] for v in lv[:2]], [v for lv in bids[:top_n] for v in lv[:2]]
+
+def _sides(raw: bytes, top_n: int) -> Tuple[List[Any], List[Any]]:
+    # Flattened top_n levels per side, unconverted. The partial scan never
+    # touches deeper levels; anything it does not recognise goes through a
+    # full decode, so correctness never depends on the fast path.
+    asks = _scan_side(raw, b'"asks"', top_n)
+    bids = _scan_side(raw, b'"bids"', top_n) if asks is not None else None
+    if asks is None or bids is None:
+        return _json_sides(raw, top_n)
+    return asks, bids
+
+def parse_depth_top(raw: bytes, top_n: int = 5) -> DepthTop:
+    asks, bids = _sides(raw, top_n)
+    try:
+        a = array("d", map(float, asks))
+        b = array("d", map(float, bids))
+    except ValueError:
+        asks, bids = _json_sides(raw, top_n)
+        a = array("d", map(float, asks))
+        b = array("d", map(float, bids))
+    return DepthTop(a[0::2], a[1::2], b[0::2], b[1::2])
+
+def _summary(asks: List[Any], bids: List[Any]) -> Dict[str, float]:
+    if not asks or not bids:
+        raise RuntimeError("Depth empty")
+    best_ask, best_bid = float(asks[0]), float(bids[0])
+    return {
+        "mid": (best_ask + best_bid) / 2.0,
+        "spread": max(0.0, best_ask - best_bid),
+        "ask_qty": sum(map(float, asks[1::2])),
+        "bid_qty": sum(map(float, bids[1::2])),
+    }
+
+def depth_summary(raw: bytes, top_n: int = 5) -> Dict[str, float]:
+    # Hot-path variant of parse_depth_top(raw).snapshot(): converts only the
+    # best prices and the top_n quantities.
+    try:
+        return _summary(*_sides(raw, top_n))
+    except ValueError:
+        return _summary(*_json_sides(raw, top_n))
+
+def liquidity_score(ask_qty: float, bid_qty: float, scale: float = 100000.0) -> float:
+    return max(0.0, min(1.0, (ask_qty + bid_qty) / scale))
+
+def decoder_name() -> str:
+    return "orjson" if _fastjson else "json"
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import json, time
+from typing import Any, Dict, Iterable, Optional
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+class Event:
+    # Compact, slotted event record. The dict / JSON forms are built only when
+    # a consumer asks for them, and the JSON is cached: records are treated as
+    # immutable once they have been added to a store.
+    __slots__ = ("ts", "_json")
+    type = "event"
+    _keys: tuple = ()
+    _extra: tuple = ()
+
+    def __init__(self, ts: Optional[float] = None, **fields: Any):
+        self.ts = ts or time.time()
+        self._json: Optional[str] = None
+        for k in self._keys:
+            setattr(self, k, fields.get(k))
+
+    def to_dict(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"type": self.type}
+        for k in self._keys:
+            v = getattr(self, k)
+            if v is not None:
+                d[k] = v
+        d["ts"] = self.ts
+        return d
+
+    def json(self) -> str:
+        if self._json is None:
+            self._json = _json(self.to_dict())
+        return self._json
+
+    # dict-style reads, so consumers written against plain event dicts keep working
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "type":
+            return self.type
+        if key == "ts" or key in self._keys:
+            v = getattr(self, key)
+            return default if v is None else v
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        v = self.get(key, KeyError)
+        if v is KeyError:
+            raise KeyError(key)
+        return v
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.json()})"
+
+class DecisionEvent(Event):
+    __slots__ = ("symbol", "side", "style", "price", "size", "reason", "mid", "spread", "liq", "vol_1m", "source")
+    type = "decision"
+    _keys = ("symbol", "side", "style", "price", "size", "reason")
+    _snap_keys = ("mid", "spread", "liq", "vol_1m", "source")
+    _extra = ("snapshot",)
+
+    def __init__(self, ts: Optional[float] = None, snapshot: Optional[Dict[str, Any]] = None, **fields: Any):
+        super().__init__(ts, **fields)
+        snapshot = snapshot or {}
+        for k in self._snap_keys:
+            setattr(self, k, snapshot.get(k))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self._snap_keys if getattr(self, k) is not None}
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = super().to_dict()
+        d["snapshot"] = self.snapshot()
+        return d
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "snapshot":
+            return self.snapshot()
+        return super().get(key, default)
+
+class OrderEvent(Event):
+    __slots__ = ("orderId", "symbol", "side", "style", "price", "size", "status", "client_oid", "note")
+    type = "order"
+    _keys = ("orderId", "symbol", "side", "style", "price", "size", "status", "client_oid", "note")
+
+class FillEvent(Event):
+    __slots__ = ("order_id", "client_oid", "symbol", "status", "side", "filled_qty", "avg_price", "fee", "liquidity")
+    type = "fill"
+    _keys = ("order_id", "client_oid", "symbol", "status", "side", "filled_qty", "avg_price", "fee", "liquidity")
+
+class ErrorEvent(Event):
+    __slots__ = ("symbol", "msg", "client_oid")
+    type = "error"
+    _keys = ("symbol", "msg", "client_oid")
+
+class SystemEvent(Event):
+    __slots__ = ("msg", "results")
+    type = "system"
+    _keys = ("msg", "results")
+
+_BY_TYPE = {c.type: c for c in (DecisionEvent, OrderEvent, FillEvent, ErrorEvent, SystemEvent)}
+
+class RawEvent(Event):
+    # anything that does not match a typed record keeps its original dict
+    __slots__ = ("_d",)
+
+    def __init__(self, d: Dict[str, Any]):
+        super().__init__(d.get("ts"))
+        self._d = d
+
+    @property
+    def type(self) -> str:
+        return self._d.get("type", "event")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self._d, ts=self.ts)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.ts if key == "ts" else self._d.get(key, default)
+
+def as_event(e: Any) -> Event:
+    if isinstance(e, Event):
+        return e
+    cls = _BY_TYPE.get(e.get("type"))
+    if cls is None or not set(e).issubset({"type", "ts", *cls._keys, *cls._extra}):
+        return RawEvent(e)
+    if "snapshot" in e and not set(e["snapshot"] or ()).issubset(DecisionEvent._snap_keys):
+        return RawEvent(e)
+    return cls(**{k: v for k, v in e.items() if k != "type"})
+
+def events_json(events: Iterable[Event]) -> bytes:
+    return ("[" + ",".join(e.json() for e in events) + "]").encode("utf-8")
@@ -0,0 +1,209 @@
+from __future__ import annotations
+import threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+def _f(x: Any) -> Optional[float]:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return None
+
+class RollingWindow:
+    # Fixed-size ring with a running sum: O(1) add/mean, constant memory.
+    __slots__ = ("size", "_buf", "_i", "_n", "_sum")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._buf = [0.0] * size
+        self._i = 0
+        self._n = 0
+        self._sum = 0.0
+
+    def add(self, x: float):
+        if self._n == self.size:
+            self._sum -= self._buf[self._i]
+        else:
+            self._n += 1
+        self._buf[self._i] = x
+        self._sum += x
+        self._i = (self._i + 1) % self.size
+
+    def __len__(self) -> int:
+        return self._n
+
+    def mean(self) -> Optional[float]:
+        return self._sum / self._n if self._n else None
+
+    def state(self) -> list:
+        # oldest first, so load_state() can replay it into any window size
+        if self._n < self.size:
+            return self._buf[:self._n]
+        return self._buf[self._i:] + self._buf[:self._i]
+
+    def load_state(self, values: list):
+        self._buf = [0.0] * self.size
+        self._i = self._n = 0
+        self._sum = 0.0
+        for x in values[-self.size:]:
+            self.add(float(x))
+
+class _Windows:
+    __slots__ = ("maker", "slippage_bps", "latency_s", "fill_ratio", "fills", "orders")
+
+    def __init__(self, size: int):
+        self.maker = RollingWindow(size)
+        self.slippage_bps = RollingWindow(size)
+        self.latency_s = RollingWindow(size)
+        self.fill_ratio = RollingWindow(size)
+        self.fills = 0
+        self.orders = 0
+
+    def view(self) -> Dict[str, Any]:
+        return {
+            "maker_rate": self.maker.mean(),
+            "avg_slippage_bps": self.slippage_bps.mean(),
+            "avg_fill_latency_s": self.latency_s.mean(),
+            "fill_ratio": self.fill_ratio.mean(),
+            "fills": self.fills,
+            "orders_resolved": self.orders,
+            "window": self.maker.size,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) if k in ("fills", "orders") else getattr(self, k).state() for k in self.__slots__}
+
+    def load_state(self, st: Dict[str, Any]):
+        for k in self.__slots__:
+            if k not in st:
+                continue
+            if k in ("fills", "orders"):
+                setattr(self, k, int(st[k]))
+            else:
+                getattr(self, k).load_state(st[k])
+
+class ExecutionMetrics:
+    # Joins decisions to their fills by client_oid and keeps rolling execution
+    # quality per symbol and overall. Slippage is signed so that positive bps
+    # is a cost: paid above decision mid on buys, received below it on sells.
+    def __init__(self, window: int = 200, max_pending: int = 2000, maker_fee_rate: float = 0.0002, taker_fee_rate: float = 0.0006):
+        self.window = window
+        # WEEX base-tier contract fees; an effective rate below the midpoint reads as maker
+        self.maker_fee_rate = maker_fee_rate
+        self.taker_fee_rate = taker_fee_rate
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._all = _Windows(window)
+        self._by_symbol: Dict[str, _Windows] = {}
+        self._version = 0
+        self._cache: Dict[Optional[str], tuple] = {}
+        self.unmatched_fills = 0
+
+    def _sym(self, symbol: str) -> _Windows:
+        w = self._by_symbol.get(symbol)
+        if w is None:
+            w = self._by_symbol[symbol] = _Windows(self.window)
+        return w
+
+    def on_decision(self, client_oid: str, *, symbol: str, side: str, style: str, mid: float, size: float, ts: Optional[float] = None):
+        with self._lock:
+            self._pending[client_oid] = (symbol, side, style, float(mid), float(size), ts or time.time())
+            if len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+    def discard(self, client_oid: str):
+        with self._lock:
+            self._pending.pop(client_oid, None)
+
+    def on_reject(self, client_oid: str):
+        # order never reached the book: counts as an unfilled attempt
+        with self._lock:
+            p = self._pending.pop(client_oid, None)
+            if p is None:
+                return
+            for w in (self._all, self._sym(p[0])):
+                w.fill_ratio.add(0.0)
+                w.orders += 1
+            self._version += 1
+
+    def _is_maker(self, fill: Dict[str, Any], style: str, qty: float, px: float) -> bool:
+        role = fill.get("liquidity")
+        if role in ("maker", "taker"):
+            return role == "maker"
+        fee = _f(fill.get("fee"))
+        if fee and qty > 0 and px:
+            # the sign convention for fees varies between endpoints; the size does not
+            return abs(fee) / (qty * px) < (self.maker_fee_rate + self.taker_fee_rate) / 2
+        # post-only orders can only ever execute as maker
+        return style == "post_only_limit"
+
+    def on_fill(self, fill: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Book a fill against its decision; returns what was booked for a
+        filled order (for rollups), else None.
+
+        Maker / taker comes from how the order actually filled: the role the
+        order detail reports (FillEvent.liquidity), else the effective fee
+        rate. Only when the detail has neither does the requested style
+        decide, which makes anything but post_only_limit a taker.
+        """
+        with self._lock:
+            p = self._pending.pop(str(fill.get("client_oid")), None)
+            if p is None:
+                self.unmatched_fills += 1
+                return None
+            symbol, side, style, mid, size, dts = p
+            qty = _f(fill.get("filled_qty")) or 0.0
+            px = _f(fill.get("avg_price"))
+            ratio = min(1.0, qty / size) if size > 0 else 0.0
+            filled = qty > 0 and bool(px)
+            maker, slip = False, 0.0
+            if filled:
+                maker = self._is_maker(fill, style, qty, px)
+                sign = 1.0 if side == "buy" else -1.0
+                slip = sign * (px - mid) / mid * 1e4 if mid else 0.0
+            for w in (self._all, self._sym(symbol)):
+                w.orders += 1
+                w.fill_ratio.add(ratio)
+                if filled:
+                    w.fills += 1
+                    w.maker.add(1.0 if maker else 0.0)
+                    w.slippage_bps.add(slip)
+                    w.latency_s.add(max(0.0, float(fill.get("ts") or time.time()) - dts))
+            self._version += 1
+            if not filled:
+                return None
+            return {"symbol": symbol, "style": style, "maker": maker, "slippage_bps": slip, "fill_ratio": ratio}
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "all": self._all.state(),
+                "by_symbol": {sym: w.state() for sym, w in self._by_symbol.items()},
+                # decisions still waiting for their fill, so they join after a restart
+                "pending": [[oid, *p] for oid, p in self._pending.items()],
+                "unmatched_fills": self.unmatched_fills,
+            }
+
+    def load_state(self, st: Dict[str, Any]):
+        with self._lock:
+            self._all.load_state(st.get("all") or {})
+            for sym, w in (st.get("by_symbol") or {}).items():
+                self._sym(sym).load_state(w)
+            for oid, *p in st.get("pending") or []:
+                self._pending[oid] = tuple(p)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            self.unmatched_fills = int(st.get("unmatched_fills") or 0)
+            self._version += 1
+
+    def snapshot(self, symbol: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            hit = self._cache.get(symbol)
+            if hit and hit[0] == self._version:
+                view = hit[1]
+            else:
+                w = self._all if symbol is None else self._by_symbol.get(symbol)
+                view = w.view() if w else _Windows(self.window).view()
+                self._cache[symbol] = (self._version, view)
+            return dict(view, pending=len(self._pending), unmatched_fills=self.unmatched_fills)
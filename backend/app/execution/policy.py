@@ -1,16 +1,30 @@
+from dataclasses import dataclass
+
 from .types import MarketSnapshot, ExecDecision, Side
 
-def choose_execution(snapshot: MarketSnapshot, side: Side, target_size: float) -> ExecDecision:
-    tight_spread = snapshot.spread / max(snapshot.mid, 1e-9) < 0.0005
-    calm = snapshot.vol_1m < 0.002
-    big = target_size > 1.0 and snapshot.liquidity_score < 0.5
+@dataclass(frozen=True)
+class PolicyParams:
+    tight_spread_ratio: float = 0.0005   # spread / mid below this counts as tight
+    calm_vol: float = 0.002              # vol_1m below this counts as calm
+    big_size: float = 1.0                # sizes above this are sliced when liquidity is low
+    low_liquidity: float = 0.5
+    passive_offset: float = 0.25         # post-only price, in spreads from mid
+    aggressive_offset: float = 0.49      # aggressive limit price, in spreads from mid
+
+DEFAULT_PARAMS = PolicyParams()
+
+def choose_execution(snapshot: MarketSnapshot, side: Side, target_size: float, params: PolicyParams = DEFAULT_PARAMS) -> ExecDecision:
+    tight_spread = snapshot.spread / max(snapshot.mid, 1e-9) < params.tight_spread_ratio
+    calm = snapshot.vol_1m < params.calm_vol
+    big = target_size > params.big_size and snapshot.liquidity_score < params.low_liquidity
 
     if big:
         return ExecDecision(style="slice", price=None, size=target_size, reason="Large size vs liquidity: slicing to reduce impact")
     if tight_spread and calm:
-        
-        px = snapshot.mid - snapshot.spread * 0.25 if side == "buy" else snapshot.mid + snapshot.spread * 0.25
+        off = snapshot.spread * params.passive_offset
+        px = snapshot.mid - off if side == "buy" else snapshot.mid + off
         return ExecDecision(style="post_only_limit", price=px, size=target_size, reason="Tight spread + calm: post-only to capture maker")
 
-    px = snapshot.mid + snapshot.spread * 0.49 if side == "buy" else snapshot.mid - snapshot.spread * 0.49
-    return ExecDecision(style="aggressive_limit", price=px, size=target_size, reason="Volatile or wide spread: prioritize fill with aggressive limit")
\ No newline at end of file
+    off = snapshot.spread * params.aggressive_offset
+    px = snapshot.mid + off if side == "buy" else snapshot.mid - off
+    return ExecDecision(style="aggressive_limit", price=px, size=target_size, reason="Volatile or wide spread: prioritize fill with aggressive limit")
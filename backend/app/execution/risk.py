@@ -0,0 +1,125 @@
+from __future__ import annotations
+import math, threading, time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .types import Side
+
+@dataclass(frozen=True)
+class RiskLimits:
+    # 0 disables a limit
+    max_notional: float = 2000.0        # per order, size * price in quote currency
+    max_position: float = 0.05          # per hedge-mode leg after the order, in contracts
+    max_orders_per_s: float = 5.0       # per symbol, sustained
+    burst: float = 10.0                 # per symbol, orders allowed back to back
+    price_band_bps: float = 100.0       # limit price vs mid
+
+DEFAULT_LIMITS = RiskLimits()
+
+CHECKS = ("order", "price_band", "notional", "position", "rate")
+
+class RiskGate:
+    # Pre-trade checks between the policy and place_order. Limits are turned
+    # into plain floats once; each check is a comparison or two and the only
+    # mutable state is a token bucket per symbol, so a full pass costs a few
+    # microseconds. The rate check runs last so a rejected order never spends
+    # a token.
+    def __init__(self, limits: RiskLimits = DEFAULT_LIMITS):
+        self.limits = limits
+        self._max_notional = limits.max_notional or math.inf
+        self._max_position = limits.max_position or math.inf
+        self._band = limits.price_band_bps / 10_000 if limits.price_band_bps else math.inf
+        self._rate = limits.max_orders_per_s
+        self._burst = max(1.0, limits.burst)
+        self._checks: List[Tuple[str, Callable[..., Optional[str]]]] = [
+            ("order", self._order), ("price_band", self._price_band), ("notional", self._notional),
+            ("position", self._position), ("rate", self._rate_limit),
+        ]
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[float]] = {}   # symbol -> [tokens, monotonic ts]
+        self._count = dict.fromkeys(CHECKS, 0)
+        self._rejected = dict.fromkeys(CHECKS, 0)
+        self._ns = dict.fromkeys(CHECKS, 0)
+        self._passed = 0
+        self._last_reject: Optional[str] = None
+
+    def check(self, symbol: str, side: Side, size: float, price: Optional[float], mid: float,
+              position: float = 0.0, market: bool = False) -> Optional[str]:
+        # None when the order may go out, otherwise "<check>: <why>".
+        # market=True means the exchange picks the price: mid stands in for it.
+        # position is the leg the order trades, +long / -short (PositionLedger.exposure).
+        clock = time.perf_counter_ns
+        with self._lock:
+            t = clock()
+            for name, fn in self._checks:
+                err = fn(symbol, side, size, price, mid, position, market)
+                now = clock()
+                self._count[name] += 1
+                self._ns[name] += now - t
+                t = now
+                if err is not None:
+                    self._rejected[name] += 1
+                    self._last_reject = f"{name}: {err}"
+                    return self._last_reject
+            self._passed += 1
+            return None
+
+    def _order(self, symbol, side, size, price, mid, position, market) -> Optional[str]:
+        if side != "buy" and side != "sell":
+            return f"bad side {side!r}"
+        if not (size > 0 and math.isfinite(size)):
+            return f"bad size {size!r}"
+        if not (mid and mid > 0 and math.isfinite(mid)):
+            return f"no usable mid ({mid!r})"
+        if not market and (price is None or not (price > 0 and math.isfinite(price))):
+            return f"bad price {price!r}"
+        return None
+
+    def _price_band(self, symbol, side, size, price, mid, position, market) -> Optional[str]:
+        if market or abs(price - mid) <= self._band * mid:
+            return None
+        return f"price {price} is {abs(price - mid) / mid * 10_000:.0f} bps from mid {mid}"
+
+    def _notional(self, symbol, side, size, price, mid, position, market) -> Optional[str]:
+        n = size * (mid if market else price)
+        return None if n <= self._max_notional else f"notional {n:.2f} > {self._max_notional}"
+
+    def _position(self, symbol, side, size, price, mid, position, market) -> Optional[str]:
+        after = position + size if side == "buy" else position - size
+        # orders that shrink an oversized position are always allowed
+        if abs(after) <= self._max_position or abs(after) < abs(position):
+            return None
+        return f"position {after:g} would exceed {self._max_position:g}"
+
+    def _rate_limit(self, symbol, side, size, price, mid, position, market) -> Optional[str]:
+        if not self._rate:
+            return None
+        now = time.monotonic()
+        b = self._buckets.get(symbol)
+        if b is None:
+            b = self._buckets[symbol] = [self._burst, now]
+        else:
+            b[0] = min(self._burst, b[0] + (now - b[1]) * self._rate)
+            b[1] = now
+        if b[0] < 1.0:
+            return f"over {self._rate:g} orders/s"
+        b[0] -= 1.0
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limits": asdict(self.limits),
+                "checked": self._count["order"],
+                "passed": self._passed,
+                "rejected": sum(self._rejected.values()),
+                "last_reject": self._last_reject,
+                "checks": {
+                    name: {
+                        "count": self._count[name],
+                        "rejected": self._rejected[name],
+                        "avg_ns": self._ns[name] / self._count[name] if self._count[name] else None,
+                    }
+                    for name in CHECKS
+                },
+            }
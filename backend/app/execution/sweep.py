@@ -0,0 +1,247 @@
+from __future__ import annotations
+import argparse, itertools, json, math, mmap, os, random, sqlite3, tempfile, time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .policy import DEFAULT_PARAMS, PolicyParams, choose_execution
+from .types import MarketSnapshot
+
+# Recorded ticks are stored as a flat file of little-endian doubles, COLS per
+# row, one contiguous segment per symbol. Workers mmap the file read-only, so
+# the data is shared through the page cache instead of pickled into each task.
+COLS = ("ts", "mid", "spread", "vol_1m", "liq")
+NCOLS = len(COLS)
+
+Segment = Tuple[str, int, int]  # symbol, first row, end row (exclusive)
+
+def _f(x: Any) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _fill_vol(rows: List[List[float]], alpha: float = 0.1):
+    # history rows from backend/server.py carry no vol_1m: estimate it from
+    # an EWMA of squared log returns of mid
+    var = 0.0
+    for i, r in enumerate(rows):
+        if i:
+            prev = rows[i - 1][1]
+            ret = math.log(r[1] / prev) if prev > 0 and r[1] > 0 else 0.0
+            var = (1 - alpha) * var + alpha * ret * ret
+        if math.isnan(r[3]):
+            r[3] = math.sqrt(var)
+
+def load_history(db_path: str, symbol: Optional[str] = None, source: Optional[str] = None) -> Dict[str, List[List[float]]]:
+    # market snapshots recorded with every decision event by app.history.HistoryStore
+    sql = "SELECT symbol, payload_json FROM events WHERE type = 'decision'"
+    args: List[Any] = []
+    if symbol:
+        sql += " AND symbol = ?"
+        args.append(symbol)
+    sql += " ORDER BY symbol, ts, id"
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        out: Dict[str, List[List[float]]] = {}
+        for sym, payload in conn.execute(sql, args):
+            e = json.loads(payload)
+            snap = e.get("snapshot") or {}
+            if snap.get("source") == "fallback" or (source and snap.get("source") != source):
+                continue
+            row = [_f(e.get("ts")), _f(snap.get("mid")), _f(snap.get("spread")), _f(snap.get("vol_1m")), _f(snap.get("liq"))]
+            if row[1] > 0 and row[2] >= 0:
+                out.setdefault(sym or "?", []).append(row)
+    finally:
+        conn.close()
+    for rows in out.values():
+        _fill_vol(rows)
+    return out
+
+def synthetic(n: int = 20000, seed: int = 7, mid: float = 60000.0) -> Dict[str, List[List[float]]]:
+    # random-walk book for trying the sweep without recorded data
+    rnd = random.Random(seed)
+    rows, vol, t = [], 0.001, time.time() - n
+    for i in range(n):
+        vol = max(0.0002, min(0.006, vol * math.exp(rnd.gauss(0, 0.05))))
+        mid *= math.exp(rnd.gauss(0, vol / 8))
+        spread = mid * rnd.uniform(0.00005, 0.0012)
+        rows.append([t + i, mid, spread, vol, rnd.uniform(0.1, 1.0)])
+    return {"synthetic": rows}
+
+def write_dataset(path: str, data: Dict[str, List[List[float]]]) -> List[Segment]:
+    segments: List[Segment] = []
+    buf = array("d")
+    for sym, rows in data.items():
+        start = len(buf) // NCOLS
+        for r in rows:
+            buf.extend(r)
+        segments.append((sym, start, len(buf) // NCOLS))
+    if buf.itemsize != 8:
+        raise RuntimeError("platform double is not 8 bytes")
+    with open(path, "wb") as f:
+        buf.tofile(f)
+    return segments
+
+# worker side ---------------------------------------------------------------
+
+_DATA: Optional[memoryview] = None
+_SEGMENTS: List[Segment] = []
+_SIM: Dict[str, Any] = {}
+
+def _init_worker(path: str, segments: List[Segment], sim: Dict[str, Any]):
+    global _DATA, _SEGMENTS, _SIM
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _DATA = memoryview(mm).cast("d")
+    _SEGMENTS = segments
+    _SIM = sim
+
+def simulate(data: Sequence[float], segments: Iterable[Segment], params: PolicyParams, *,
+             size: float = 0.5, horizon: int = 10, slices: int = 4) -> Dict[str, Any]:
+    # Replays every recorded tick as a decision point, alternating buy/sell.
+    # A limit buy at px fills at px once a later best ask (mid + spread/2)
+    # trades through it within `horizon` ticks; if it is already marketable
+    # it fills immediately at the ask as a taker. Post-only orders that would
+    # cross are rejected. "slice" takes the ask on the next `slices` ticks.
+    # Slippage is signed vs. the decision mid, positive = cost.
+    decisions = fills = maker = 0
+    slip = 0.0
+    styles: Dict[str, int] = {}
+    for _, start, end in segments:
+        for i in range(start, end - 1):
+            o = i * NCOLS
+            mid, spread = data[o + 1], data[o + 2]
+            snap = MarketSnapshot(mid=mid, spread=spread, vol_1m=data[o + 3], liquidity_score=data[o + 4])
+            side = "buy" if i % 2 == 0 else "sell"
+            sign = 1.0 if side == "buy" else -1.0
+            d = choose_execution(snap, side, size, params)
+            decisions += 1
+            styles[d.style] = styles.get(d.style, 0) + 1
+            last = min(end, i + 1 + horizon)
+
+            if d.style == "slice":
+                k = min(slices, end - i - 1)
+                px = sum(data[(j * NCOLS) + 1] + sign * data[(j * NCOLS) + 2] / 2 for j in range(i + 1, i + 1 + k)) / k
+                fills += 1
+                slip += sign * (px - mid) / mid * 1e4
+                continue
+
+            touch = mid + sign * spread / 2          # opposite best at decision time
+            if sign * (d.price - touch) >= 0:
+                if d.style == "post_only_limit":
+                    continue
+                fills += 1
+                slip += sign * (touch - mid) / mid * 1e4
+                continue
+            for j in range(i + 1, last):
+                q = j * NCOLS
+                if sign * (d.price - (data[q + 1] + sign * data[q + 2] / 2)) >= 0:
+                    fills += 1
+                    maker += 1
+                    slip += sign * (d.price - mid) / mid * 1e4
+                    break
+    return {
+        "decisions": decisions,
+        "fill_rate": fills / decisions if decisions else 0.0,
+        "maker_share": maker / fills if fills else 0.0,
+        "avg_slippage_bps": slip / fills if fills else 0.0,
+        "styles": styles,
+    }
+
+def _evaluate(params: PolicyParams) -> Dict[str, Any]:
+    return {"params": asdict(params), **simulate(_DATA, _SEGMENTS, params, **_SIM)}
+
+# driver --------------------------------------------------------------------
+
+def grid(spec: Dict[str, Sequence[float]], base: PolicyParams = DEFAULT_PARAMS) -> List[PolicyParams]:
+    names = list(spec)
+    return [PolicyParams(**{**asdict(base), **dict(zip(names, combo))}) for combo in itertools.product(*(spec[n] for n in names))]
+
+def random_search(n: int, bounds: Dict[str, Tuple[float, float]], seed: int = 0, base: PolicyParams = DEFAULT_PARAMS) -> List[PolicyParams]:
+    rnd = random.Random(seed)
+    return [PolicyParams(**{**asdict(base), **{k: rnd.uniform(lo, hi) for k, (lo, hi) in bounds.items()}}) for _ in range(n)]
+
+DEFAULT_GRID: Dict[str, Sequence[float]] = {
+    "tight_spread_ratio": (0.00025, 0.0005, 0.001),
+    "calm_vol": (0.001, 0.002, 0.004),
+    "passive_offset": (0.0, 0.25, 0.4),
+    "aggressive_offset": (0.49, 0.5, 0.6),
+}
+DEFAULT_BOUNDS: Dict[str, Tuple[float, float]] = {
+    "tight_spread_ratio": (0.0001, 0.002),
+    "calm_vol": (0.0005, 0.006),
+    "passive_offset": (0.0, 0.49),
+    "aggressive_offset": (0.3, 1.0),
+}
+
+def score(r: Dict[str, Any], w_fill: float = 1.0, w_maker: float = 0.5, w_slip: float = 0.1) -> float:
+    # higher is better: fills and maker share add, each bps of slippage costs w_slip
+    return w_fill * r["fill_rate"] + w_maker * r["maker_share"] - w_slip * r["avg_slippage_bps"]
+
+def rank(results: List[Dict[str, Any]], **weights: float) -> List[Dict[str, Any]]:
+    for r in results:
+        r["score"] = score(r, **weights)
+    return sorted(results, key=lambda r: r["score"], reverse=True)
+
+def run_sweep(data: Dict[str, List[List[float]]], candidates: List[PolicyParams], *, workers: int = 0,
+              size: float = 0.5, horizon: int = 10, slices: int = 4, **weights: float) -> List[Dict[str, Any]]:
+    sim = {"size": size, "horizon": horizon, "slices": slices}
+    fd, path = tempfile.mkstemp(prefix="ordersense_sweep_", suffix=".f64")
+    os.close(fd)
+    try:
+        segments = write_dataset(path, data)
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path, segments, sim)) as pool:
+            results = list(pool.map(_evaluate, candidates, chunksize=max(1, len(candidates) // (workers * 4))))
+    finally:
+        os.unlink(path)
+    return rank(results, **weights)
+
+def main():
+    ap = argparse.ArgumentParser(description="Sweep choose_execution parameters over recorded snapshots")
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--history", default=os.getenv("HISTORY_DB", "history.sqlite"), help="HistoryStore SQLite file")
+    src.add_argument("--synthetic", type=int, metavar="N", help="use N random-walk ticks instead of history")
+    ap.add_argument("--symbol")
+    ap.add_argument("--random", type=int, metavar="N", help="random search with N candidates instead of the grid")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=0)
+    ap.add_argument("--size", type=float, default=0.5)
+    ap.add_argument("--horizon", type=int, default=10, help="ticks a resting order may wait for a fill")
+    ap.add_argument("--w-fill", type=float, default=1.0)
+    ap.add_argument("--w-maker", type=float, default=0.5)
+    ap.add_argument("--w-slip", type=float, default=0.1)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    data = synthetic(args.synthetic) if args.synthetic else load_history(args.history, args.symbol)
+    n_rows = sum(len(v) for v in data.values())
+    if n_rows < 2:
+        raise SystemExit("not enough recorded snapshots to sweep")
+    candidates = random_search(args.random, DEFAULT_BOUNDS, args.seed) if args.random else grid(DEFAULT_GRID)
+    if DEFAULT_PARAMS not in candidates:
+        candidates.append(DEFAULT_PARAMS)
+
+    t0 = time.perf_counter()
+    results = run_sweep(data, candidates, workers=args.workers, size=args.size, horizon=args.horizon,
+                        w_fill=args.w_fill, w_maker=args.w_maker, w_slip=args.w_slip)
+    dt = time.perf_counter() - t0
+    if args.json:
+        print(json.dumps({"rows": n_rows, "candidates": len(candidates), "seconds": dt, "results": results[:args.top]}, indent=2))
+        return
+
+    base = next(r for r in results if r["params"] == asdict(DEFAULT_PARAMS))
+    print(f"{len(candidates)} parameter sets x {n_rows} ticks ({len(data)} symbols) in {dt:.1f}s")
+    names = [f.name for f in fields(PolicyParams)]
+    print(f"{'#':>3} {'score':>7} {'fill':>6} {'maker':>6} {'slip_bps':>9}  " + " ".join(f"{n[:12]:>12}" for n in names))
+    for i, r in enumerate(results[:args.top], 1):
+        row = " ".join(f"{r['params'][n]:>12.6g}" for n in names)
+        print(f"{i:>3} {r['score']:>7.3f} {r['fill_rate']:>6.3f} {r['maker_share']:>6.3f} {r['avg_slippage_bps']:>9.3f}  {row}")
+    print(f"current defaults rank {results.index(base) + 1}: score {base['score']:.3f}, fill {base['fill_rate']:.3f}, "
+          f"maker {base['maker_share']:.3f}, slip {base['avg_slippage_bps']:.3f} bps")
+
+if __name__ == "__main__":
+    main()
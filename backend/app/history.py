@@ -0,0 +1,175 @@
+from __future__ import annotations
+import json, queue, sqlite3, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .events import Event
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def _cursor(c: Optional[str]) -> Optional[Tuple[float, int]]:
+    # "<ts>:<id>" as returned in "next", or a bare unix timestamp
+    if not c:
+        return None
+    ts, _, rid = str(c).partition(":")
+    return float(ts), int(rid) if rid else 0
+
+class HistoryStore:
+    # Append-only on-disk event log. append() only enqueues; a writer thread
+    # commits batches, so the bot loop never waits on SQLite.
+    def __init__(
+        self,
+        db_path: str = "history.sqlite",
+        flush_interval_s: float = 1.0,
+        max_batch: int = 500,
+        max_queue: int = 100_000,
+        retention_s: Optional[float] = None,
+        prune_every_s: float = 3600.0,
+    ):
+        self.db_path = db_path
+        self.flush_interval_s = flush_interval_s
+        self.max_batch = max_batch
+        self.retention_s = retention_s
+        self.prune_every_s = prune_every_s
+        self.written = 0
+        self.dropped = 0
+
+        self._q: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._last_prune = 0.0
+        # opening the database and starting the writer waits for the first use
+        self._t: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._t is not None:
+            return
+        with self._start_lock:
+            if self._t is None:
+                self._init_db()
+                t = threading.Thread(target=self._run, daemon=True)
+                t.start()
+                self._t = t
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                type TEXT NOT NULL,
+                symbol TEXT,
+                payload_json TEXT NOT NULL
+            );""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events(type, ts);")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_symbol_ts ON events(symbol, ts);")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def append(self, evt: Any):
+        if self._t is None:
+            self._ensure_started()
+        try:
+            self._q.put_nowait(evt)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._t is not None:
+            self._t.join(timeout=5)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        try:
+            while not self._stop.is_set() or not self._q.empty():
+                batch: List[Dict[str, Any]] = []
+                try:
+                    batch.append(self._q.get(timeout=self.flush_interval_s))
+                except queue.Empty:
+                    self._prune(conn)
+                    continue
+                # let a burst accumulate so it lands in one transaction
+                time.sleep(0 if self._q.qsize() >= self.max_batch else min(0.05, self.flush_interval_s))
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self._write(conn, batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    print(f"history: write failed, dropped {len(batch)} events: {e}")
+                self._prune(conn)
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Dict[str, Any]]):
+        rows = [
+            (e.ts, e.type, e.get("symbol"), e.json()) if isinstance(e, Event)
+            else (float(e.get("ts") or time.time()), str(e.get("type") or "unknown"), e.get("symbol"), _json(e))
+            for e in batch
+        ]
+        with conn:
+            conn.executemany("INSERT INTO events (ts, type, symbol, payload_json) VALUES (?,?,?,?)", rows)
+        self.written += len(rows)
+
+    def _prune(self, conn: sqlite3.Connection):
+        if not self.retention_s:
+            return
+        now = time.time()
+        if now - self._last_prune < self.prune_every_s:
+            return
+        self._last_prune = now
+        with conn:
+            conn.execute("DELETE FROM events WHERE ts < ?", (now - self.retention_s,))
+
+    def query(
+        self,
+        *,
+        type_: Optional[str] = None,
+        symbol: Optional[str] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        # Newest first. Pass the returned "next" back as before= for the next page.
+        limit = max(1, min(int(limit), 1000))
+        self._ensure_started()
+        where, args = [], []
+        if type_:
+            where.append("type = ?")
+            args.append(type_)
+        if symbol:
+            where.append("symbol = ?")
+            args.append(symbol)
+        b = _cursor(before)
+        if b:
+            where.append("(ts, id) < (?, ?)")
+            args.extend(b)
+        if after:
+            where.append("ts > ?")
+            args.append(float(after))
+        sql = "SELECT id, ts, payload_json FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        args.append(limit)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+        items = [json.loads(p) for _, _, p in rows]
+        nxt = f"{rows[-1][1]!r}:{rows[-1][0]}" if len(rows) == limit else None
+        return {"items": items, "next": nxt}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"queued": self._q.qsize(), "written": self.written, "dropped": self.dropped}
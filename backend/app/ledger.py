@@ -0,0 +1,198 @@
+from __future__ import annotations
+import json, os, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# WEEX hedge mode keeps a long and a short leg per symbol; the order type
+# says which leg a fill touches and whether it opens or closes it. Types come
+# as words or as "1".."4"; buy / sell are what the servers submit as 1 / 2.
+_LEGS = {
+    "open_long": ("long", True), "1": ("long", True), "buy": ("long", True),
+    "open_short": ("short", True), "2": ("short", True), "sell": ("short", True),
+    "close_long": ("long", False), "3": ("long", False),
+    "close_short": ("short", False), "4": ("short", False),
+}
+
+def _f(x: Any) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+class Position:
+    __slots__ = ("symbol", "long_qty", "long_entry", "short_qty", "short_entry", "realized_pnl", "fees", "mark", "fills", "updated_at")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.long_qty = 0.0       # both legs are >= 0
+        self.long_entry = 0.0
+        self.short_qty = 0.0
+        self.short_entry = 0.0
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.mark: Optional[float] = None
+        self.fills = 0
+        self.updated_at: Optional[float] = None
+
+    def apply(self, leg: str, opening: bool, qty: float, price: float, fee: float):
+        q, entry = (self.long_qty, self.long_entry) if leg == "long" else (self.short_qty, self.short_entry)
+        if opening:
+            entry = (entry * q + price * qty) / (q + qty)
+            q += qty
+        else:
+            # a close never flips into the other leg; closing more than is held books what was held
+            closed = min(q, qty)
+            self.realized_pnl += closed * (price - entry if leg == "long" else entry - price)
+            q -= closed
+            if q <= 0:
+                q, entry = 0.0, 0.0
+        if leg == "long":
+            self.long_qty, self.long_entry = q, entry
+        else:
+            self.short_qty, self.short_entry = q, entry
+        self.fees += fee
+        self.fills += 1
+
+    def unrealized_pnl(self) -> float:
+        if self.mark is None:
+            return 0.0
+        return (self.mark - self.long_entry) * self.long_qty + (self.short_entry - self.mark) * self.short_qty
+
+    def to_dict(self) -> Dict[str, Any]:
+        upnl = self.unrealized_pnl()
+        return {
+            "symbol": self.symbol,
+            "long_qty": self.long_qty,
+            "long_entry": self.long_entry,
+            "short_qty": self.short_qty,
+            "short_entry": self.short_entry,
+            "net_qty": self.long_qty - self.short_qty,
+            "gross_qty": self.long_qty + self.short_qty,
+            "mark": self.mark,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": upnl,
+            "fees": self.fees,
+            "net_pnl": self.realized_pnl + upnl - self.fees,
+            "fills": self.fills,
+            "updated_at": self.updated_at,
+        }
+
+class PositionLedger:
+    # Per-symbol long and short legs built incrementally from fill events. Fill events
+    # carry cumulative filled_qty per order, so only the delta since the last
+    # event for that order id is booked; repeated polls are idempotent.
+    def __init__(self, path: Optional[str] = None, checkpoint_interval_s: float = 5.0, max_orders: int = 5000):
+        self.path = path
+        self.checkpoint_interval_s = checkpoint_interval_s
+        self.max_orders = max_orders
+        self._lock = threading.Lock()
+        self._pos: Dict[str, Position] = {}
+        self._booked: "OrderedDict[str, float]" = OrderedDict()
+        self._dirty = False
+        self._last_checkpoint = 0.0
+        if path:
+            self.load()
+
+    def _get(self, symbol: str) -> Position:
+        p = self._pos.get(symbol)
+        if p is None:
+            p = self._pos[symbol] = Position(symbol)
+        return p
+
+    def on_fill(self, fill: Dict[str, Any], symbol: Optional[str] = None) -> bool:
+        leg = _LEGS.get(str(fill.get("side") or "").lower())
+        if leg is None:
+            return False
+        symbol = fill.get("symbol") or symbol
+        qty = _f(fill.get("filled_qty"))
+        price = _f(fill.get("avg_price"))
+        if not symbol or qty <= 0 or price <= 0:
+            return False
+        oid = str(fill.get("order_id") or fill.get("client_oid") or "")
+        with self._lock:
+            prev = self._booked.get(oid, 0.0) if oid else 0.0
+            delta = qty - prev
+            if delta <= 0:
+                return False
+            if oid:
+                self._booked[oid] = qty
+                self._booked.move_to_end(oid)
+                if len(self._booked) > self.max_orders:
+                    self._booked.popitem(last=False)
+            # fee is reported cumulatively too; book it in proportion to the delta,
+            # sign as reported so maker rebates (negative) lower the fee total
+            fee = _f(fill.get("fee")) * delta / qty
+            p = self._get(symbol)
+            p.apply(leg[0], leg[1], delta, price, fee)
+            if p.mark is None:
+                p.mark = price
+            p.updated_at = time.time()
+            self._dirty = True
+        return True
+
+    def mark(self, symbol: str, mid: float):
+        with self._lock:
+            p = self._pos.get(symbol)
+            if p is not None:
+                p.mark = mid
+
+    def positions(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {sym: p.to_dict() for sym, p in self._pos.items()}
+
+    def exposure(self, symbol: str, side: str) -> float:
+        # the leg an order of this side/type trades, signed the way RiskGate
+        # reads it: +long qty for long-leg orders, -short qty for short-leg ones
+        leg = _LEGS.get(str(side).lower())
+        with self._lock:
+            p = self._pos.get(symbol)
+            if p is None or leg is None:
+                return 0.0
+            return p.long_qty if leg[0] == "long" else 0.0 - p.short_qty
+
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            views = [p.to_dict() for p in self._pos.values()]
+        return {k: sum(v[k] for v in views) for k in ("realized_pnl", "unrealized_pnl", "fees", "net_pnl")}
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "positions": {sym: {k: getattr(p, k) for k in Position.__slots__} for sym, p in self._pos.items()},
+                "booked": list(self._booked.items()),
+            }
+
+    def load_state(self, st: Dict[str, Any]):
+        with self._lock:
+            for sym, d in (st.get("positions") or {}).items():
+                p = self._get(sym)
+                for k in Position.__slots__:
+                    if k in d:
+                        setattr(p, k, d[k])
+            self._booked = OrderedDict((str(k), float(v)) for k, v in st.get("booked") or [])
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.load_state(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"ledger: ignoring unreadable checkpoint {self.path}: {e}")
+
+    def maybe_checkpoint(self, force: bool = False) -> bool:
+        if not self.path or not self._dirty:
+            return False
+        now = time.time()
+        if not force and now - self._last_checkpoint < self.checkpoint_interval_s:
+            return False
+        self._dirty = False
+        self._last_checkpoint = now
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_json(self.state()))
+        os.replace(tmp, self.path)
+        return True
@@ -1,6 +1,8 @@
 from __future__ import annotations
 import os, threading, time, random
-from fastapi import FastAPI, WebSocket
+from concurrent.futures import Future, ThreadPoolExecutor
+from fastapi import FastAPI, Header, HTTPException, WebSocket
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -10,9 +12,13 @@ from .ai_log_queue import AiLogQueue
 from .state import store
 from .execution.policy import choose_execution
 from .execution.types import MarketSnapshot
+from .events import DecisionEvent, OrderEvent
+from . import profiler
 
 load_dotenv()
 
+store.set_symbols(settings.symbols)
+
 app = FastAPI(title="OrderSense Backend")
 
 app.add_middleware(
@@ -28,11 +34,32 @@ creds = WeexCredentials(
     secret_key=settings.weex_secret_key,
     passphrase=settings.weex_passphrase,
 )
-weex = WeexClient(creds, settings.weex_base_url)
-aiq = AiLogQueue(weex, db_path="ai_logs.sqlite", flush_interval_s=2.0)
+_weex: WeexClient | None = None
+_aiq: AiLogQueue | None = None
+_lazy_lock = threading.Lock()
+
+def get_weex() -> WeexClient:
+    global _weex
+    if _weex is None:
+        with _lazy_lock:
+            if _weex is None:
+                _weex = WeexClient(creds, settings.weex_base_url)
+    return _weex
+
+def get_aiq() -> AiLogQueue:
+    global _aiq
+    if _aiq is None:
+        weex = get_weex()
+        with _lazy_lock:
+            if _aiq is None:
+                _aiq = AiLogQueue(weex, db_path="ai_logs.sqlite", flush_interval_s=2.0)
+    return _aiq
 
 _bot_thread: threading.Thread | None = None
 _stop_flag = threading.Event()
+# one decision per symbol in flight, run on a pool like backend/server.py does
+decision_pool = ThreadPoolExecutor(max_workers=max(1, settings.workers), thread_name_prefix="decide")
+_busy: dict[str, Future] = {}
 
 def log_ai(stage: str, input_obj: dict, output_obj: dict, explanation: str, order_id: int | None = None):
     payload = {
@@ -43,7 +70,7 @@ def log_ai(stage: str, input_obj: dict, output_obj: dict, explanation: str, orde
         "explanation": explanation[:1000],
         "orderId": order_id,
     }
-    aiq.enqueue(payload)
+    get_aiq().enqueue(payload)
 
 def demo_market_snapshot() -> MarketSnapshot:
     mid = 60000 + random.uniform(-150, 150)
@@ -52,78 +79,128 @@ def demo_market_snapshot() -> MarketSnapshot:
     liquidity_score = random.uniform(0.2, 0.9)
     return MarketSnapshot(mid=mid, spread=spread, vol_1m=vol_1m, liquidity_score=liquidity_score)
 
+def run_symbol(symbol: str):
+    snap = demo_market_snapshot()
+
+    side = "buy" if int(time.time()) % 2 == 0 else "sell"
+    target_size = 0.5
+
+    decision = choose_execution(snap, side, target_size)
+
+    snap_view = {"mid": snap.mid, "spread": snap.spread, "vol_1m": snap.vol_1m, "liq": snap.liquidity_score}
+    decision_evt = DecisionEvent(
+        symbol=symbol,
+        side=side,
+        style=decision.style,
+        price=decision.price,
+        size=decision.size,
+        reason=decision.reason,
+        snapshot=snap_view,
+    )
+    store.add_event(decision_evt)
+    store.update_symbol(symbol, last_snapshot=snap_view, last_decision=decision_evt)
+    store.bump(symbol, "decisions")
+
+    log_ai(
+        stage="Decision Making",
+        input_obj={"symbol": symbol, "side": side, "target_size": target_size, "snapshot": snap.__dict__},
+        output_obj={"execution": decision.__dict__},
+        explanation=decision.reason,
+    )
+
+    fake_order_id = int(time.time() * 1000) % 10_000_000
+    store.add_event(OrderEvent(
+        orderId=fake_order_id,
+        symbol=symbol,
+        side=side,
+        style=decision.style,
+        price=decision.price,
+        size=decision.size,
+        status="placed(simulated)",
+    ))
+    store.bump(symbol, "orders")
+
+    log_ai(
+        stage="Order Placement",
+        input_obj={"requested": decision.__dict__},
+        output_obj={"orderId": fake_order_id, "status": "placed(simulated)"},
+        explanation="Order placed (simulated in MVP). Replace with WEEX place order call.",
+        order_id=fake_order_id,
+    )
+
 def bot_loop():
 
     while not _stop_flag.is_set():
-        snap = demo_market_snapshot()
-
-        side = "buy" if int(time.time()) % 2 == 0 else "sell"
-        target_size = 0.5
-
-        decision = choose_execution(snap, side, target_size)
-
-        store.add_event({
-            "type": "decision",
-            "symbol": store.state.symbol,
-            "side": side,
-            "style": decision.style,
-            "price": decision.price,
-            "size": decision.size,
-            "reason": decision.reason,
-            "snapshot": {"mid": snap.mid, "spread": snap.spread, "vol_1m": snap.vol_1m, "liq": snap.liquidity_score},
-        })
-        with store.lock:
-            store.state.metrics["decisions"] += 1
-
-        log_ai(
-            stage="Decision Making",
-            input_obj={"symbol": store.state.symbol, "side": side, "target_size": target_size, "snapshot": snap.__dict__},
-            output_obj={"execution": decision.__dict__},
-            explanation=decision.reason,
-        )
-
-        fake_order_id = int(time.time() * 1000) % 10_000_000
-        store.add_event({
-            "type": "order",
-            "orderId": fake_order_id,
-            "symbol": store.state.symbol,
-            "side": side,
-            "style": decision.style,
-            "price": decision.price,
-            "size": decision.size,
-            "status": "placed(simulated)",
-        })
-        with store.lock:
-            store.state.metrics["orders"] += 1
-
-        log_ai(
-            stage="Order Placement",
-            input_obj={"requested": decision.__dict__},
-            output_obj={"orderId": fake_order_id, "status": "placed(simulated)"},
-            explanation="Order placed (simulated in MVP). Replace with WEEX place order call.",
-            order_id=fake_order_id,
-        )
+        for symbol in settings.symbols:
+            # a symbol whose previous decision is still running is skipped
+            prev = _busy.get(symbol)
+            if prev is not None and not prev.done():
+                continue
+            _busy[symbol] = decision_pool.submit(run_symbol, symbol)
 
         time.sleep(3)
 
+AILOG_MAX_BACKLOG_AGE_S = float(os.getenv("AILOG_MAX_BACKLOG_AGE_S", "300"))
+
+@app.on_event("startup")
+def resume_ai_logs():
+    # drain AI logs a previous run left in the queue without waiting for a new one
+    if os.path.exists("ai_logs.sqlite"):
+        get_aiq().resume()
+
 @app.get("/health")
 def health():
-    return {"ok": True}
+    degraded = []
+    if _aiq is not None and not _aiq.stats(AILOG_MAX_BACKLOG_AGE_S)["healthy"]:
+        degraded.append("ailog_backlog")
+    return {"ok": True, "degraded": degraded}
+
+@app.get("/api/ailog")
+def ailog():
+    if _aiq is None:
+        return {"started": False, "pending": 0}   # nothing on disk either, see resume_ai_logs
+    return _aiq.stats(AILOG_MAX_BACKLOG_AGE_S)
 
 @app.get("/api/status")
-def status():
+def status(symbol: str | None = None):
+    if symbol:
+        ss = store.symbols_status().get(symbol)
+        if ss is None:
+            raise HTTPException(status_code=404, detail=f"unknown symbol {symbol}")
+        return {"running": store.state.running, **ss}
     with store.lock:
-        return {"running": store.state.running, "started_at": store.state.started_at, "symbol": store.state.symbol}
+        return {"running": store.state.running, "started_at": store.state.started_at, "symbol": store.state.symbol, "symbols": list(store.state.symbols)}
+
+@app.get("/api/symbols")
+def symbols():
+    return store.symbols_status()
 
 @app.get("/api/metrics")
-def metrics():
+def metrics(symbol: str | None = None):
+    if symbol:
+        ss = store.symbols_status().get(symbol)
+        if ss is None:
+            raise HTTPException(status_code=404, detail=f"unknown symbol {symbol}")
+        return ss["metrics"]
     with store.lock:
         return store.state.metrics
 
 @app.get("/api/events")
-def events():
-    with store.lock:
-        return store.state.events[:50]
+def events(symbol: str | None = None):
+    return [e.to_dict() for e in store.recent_events(50, symbol)]
+
+@app.get("/admin/profile")
+def profile(seconds: float = 5.0, hz: int = 100, format: str = "collapsed", x_admin_token: str | None = Header(None)):
+    # plain def: FastAPI runs it in the threadpool, so sampling never blocks the event loop
+    if not profiler.authorized(x_admin_token):
+        raise HTTPException(status_code=403, detail="forbidden")
+    try:
+        counts, meta = profiler.sample(seconds, hz)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "speedscope":
+        return profiler.speedscope(counts, meta)
+    return PlainTextResponse(profiler.collapsed(counts), headers={"X-Profile-Samples": str(meta["samples"])})
 
 @app.post("/api/start")
 def start():
@@ -154,9 +231,9 @@ async def ws(websocket: WebSocket):
     try:
         while True:
             await asyncio_sleep(0.5)
+            evts = [e.to_dict() for e in store.recent_events(25)]
             with store.lock:
-                
-                payload = {"metrics": store.state.metrics, "events": store.state.events[:25]}
+                payload = {"metrics": store.state.metrics, "events": evts}
             await websocket.send_json(payload)
             last_sent += 1
     except Exception:
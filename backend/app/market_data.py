@@ -0,0 +1,141 @@
+from __future__ import annotations
+import math, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable, Dict, Iterable, Optional
+
+def _field(snap: Any, *names: str) -> Any:
+    for n in names:
+        v = snap.get(n) if isinstance(snap, dict) else getattr(snap, n, None)
+        if v is not None:
+            return v
+    return None
+
+class _Entry:
+    __slots__ = ("ts", "version", "snap", "var_s", "n")
+
+    def __init__(self, ts: float, version: int, snap: Any, var_s: float = 0.0, n: int = 0):
+        self.ts = ts
+        self.version = version
+        self.snap = snap
+        self.var_s = var_s   # EWMA of squared log mid returns, per second
+        self.n = n           # returns folded into var_s
+
+class MarketDataCache:
+    # One depth fetch per symbol per tick, shared by every reader in the process.
+    # Each write bumps the symbol's version and folds the mid move into a
+    # volatility EWMA, so readers (HTTP handlers, the decision loop) get
+    # spread / liquidity / vol / age from memory without touching the exchange.
+    def __init__(self, fetch: Callable[[str], Any], max_workers: int = 8, ttl_s: float = 10.0,
+                 vol_alpha: float = 0.1, vol_min_samples: int = 5):
+        self._fetch = fetch
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="md")
+        self._lock = threading.Lock()
+        self._snaps: Dict[str, _Entry] = {}
+        self.ttl_s = ttl_s
+        self.vol_alpha = vol_alpha
+        self.vol_min_samples = vol_min_samples
+
+    def refresh(self, symbols: Iterable[str]) -> Dict[str, Any]:
+        futs = {sym: self._pool.submit(self._fetch, sym) for sym in symbols}
+        out: Dict[str, Any] = {}
+        for sym, fut in futs.items():
+            try:
+                snap = fut.result()
+            except Exception as e:
+                out[sym] = e
+                continue
+            self.put(sym, snap)
+            out[sym] = snap
+        return out
+
+    def put(self, symbol: str, snap: Any, ts: Optional[float] = None) -> int:
+        ts = ts or time.time()
+        mid = _field(snap, "mid")
+        with self._lock:
+            prev = self._snaps.get(symbol)
+            if prev is None:
+                self._snaps[symbol] = _Entry(ts, 1, snap)
+                return 1
+            e = _Entry(ts, prev.version + 1, snap, prev.var_s, prev.n)
+            pmid = _field(prev.snap, "mid")
+            dt = ts - prev.ts
+            if mid and pmid and mid > 0 and pmid > 0 and dt > 0:
+                r = math.log(mid / pmid)
+                e.var_s = (1 - self.vol_alpha) * prev.var_s + self.vol_alpha * r * r / max(dt, 1e-3)
+                e.n = prev.n + 1
+            self._snaps[symbol] = e
+            return e.version
+
+    def get(self, symbol: str, max_age_s: Optional[float] = None) -> Optional[Any]:
+        # None once the snapshot is older than max_age_s (default: the cache TTL)
+        with self._lock:
+            e = self._snaps.get(symbol)
+        if e is None:
+            return None
+        limit = self.ttl_s if max_age_s is None else max_age_s
+        return e.snap if limit is None or time.time() - e.ts <= limit else None
+
+    def age(self, symbol: str) -> Optional[float]:
+        with self._lock:
+            e = self._snaps.get(symbol)
+        return time.time() - e.ts if e else None
+
+    def version(self, symbol: str) -> int:
+        with self._lock:
+            e = self._snaps.get(symbol)
+        return e.version if e else 0
+
+    def vol(self, symbol: str) -> Optional[float]:
+        # 1-minute volatility of mid, None until enough moves have been seen
+        with self._lock:
+            e = self._snaps.get(symbol)
+        if e is None or e.n < self.vol_min_samples:
+            return None
+        return math.sqrt(e.var_s * 60.0)
+
+    def view(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            e = self._snaps.get(symbol)
+        if e is None:
+            return None
+        s = e.snap
+        age = time.time() - e.ts
+        return {
+            "symbol": symbol,
+            "version": e.version,
+            "ts": e.ts,
+            "age_s": round(age, 3),
+            "stale": self.ttl_s is not None and age > self.ttl_s,
+            "mid": _field(s, "mid"),
+            "spread": _field(s, "spread"),
+            "liq": _field(s, "liq", "liquidity_score"),
+            "vol_1m": math.sqrt(e.var_s * 60.0) if e.n >= self.vol_min_samples else None,
+            "source": _field(s, "source"),
+        }
+
+    def views(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            symbols = list(self._snaps)
+        return {sym: v for sym in symbols if (v := self.view(sym)) is not None}
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            snaps = dict(self._snaps)
+        return {
+            sym: [e.ts, asdict(e.snap) if is_dataclass(e.snap) else e.snap, e.version, e.var_s, e.n]
+            for sym, e in snaps.items()
+        }
+
+    def load_state(self, st: Dict[str, Any], build: Optional[Callable[..., Any]] = None):
+        # restored snapshots keep their original timestamp, so age() shows how
+        # stale they are; the volatility estimate carries over as it was
+        with self._lock:
+            for sym, (ts, s, *rest) in st.items():
+                if sym in self._snaps:
+                    continue
+                version, var_s, n = rest if len(rest) == 3 else (1, 0.0, 0)
+                self._snaps[sym] = _Entry(float(ts), int(version), build(**s) if build else s, float(var_s), int(n))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,103 @@
+from __future__ import annotations
+import itertools, os, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+_B36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+def _b36(n: int) -> str:
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = _B36[r] + out
+        if not n:
+            return out
+
+class ClientOidGenerator:
+    # <prefix>_<ms base36>_<process tag><sequence base36>, well under WEEX's 40 chars.
+    # The per-process random tag plus a counter keeps ids unique within the same
+    # millisecond and across processes or restarts.
+    def __init__(self, prefix: str = "os"):
+        self.prefix = prefix
+        self._tag = "".join(_B36[b % 36] for b in os.urandom(4))
+        self._seq = itertools.count()
+
+    def next(self) -> str:
+        return f"{self.prefix}_{_b36(int(time.time() * 1000))}_{self._tag}{_b36(next(self._seq))}"
+
+class OpenOrders:
+    # Live orders placed but not yet resolved (filled, timed out or cancelled).
+    # Checkpointed so a restart can reconcile them with the exchange.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, client_oid: str, *, order_id: Any, symbol: str, side: str):
+        with self._lock:
+            self._orders[client_oid] = {"order_id": str(order_id), "symbol": symbol, "side": side, "ts": time.time()}
+
+    def remove(self, client_oid: str):
+        with self._lock:
+            self._orders.pop(client_oid, None)
+
+    def items(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._orders.items()}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._orders)
+
+    def state(self) -> Dict[str, Any]:
+        return self.items()
+
+    def load_state(self, st: Dict[str, Any]):
+        with self._lock:
+            for oid, o in st.items():
+                self._orders.setdefault(oid, dict(o))
+
+class OrderPipeline:
+    def __init__(self, max_inflight_per_symbol: int = 2, max_workers: int = 8):
+        self.max_inflight_per_symbol = max_inflight_per_symbol
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orders")
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Dict[str, Future]] = {}
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected_full": 0}
+
+    def inflight(self, symbol: str) -> int:
+        with self._lock:
+            return len(self._inflight.get(symbol, ()))
+
+    def try_submit(self, symbol: str, client_oid: str, fn: Callable[..., Any], *args: Any) -> Optional[Future]:
+        with self._lock:
+            slots = self._inflight.setdefault(symbol, {})
+            if len(slots) >= self.max_inflight_per_symbol:
+                self._stats["rejected_full"] += 1
+                return None
+            fut = self._pool.submit(fn, *args)
+            slots[client_oid] = fut
+            self._stats["submitted"] += 1
+        fut.add_done_callback(lambda f: self._done(symbol, client_oid, f))
+        return fut
+
+    def _done(self, symbol: str, client_oid: str, fut: Future):
+        with self._lock:
+            self._inflight.get(symbol, {}).pop(client_oid, None)
+            self._stats["failed" if fut.cancelled() or fut.exception() else "completed"] += 1
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                if not any(self._inflight.values()):
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "max_inflight_per_symbol": self.max_inflight_per_symbol,
+                "inflight": {sym: len(v) for sym, v in self._inflight.items() if v},
+            }
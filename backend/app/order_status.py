@@ -1,6 +1,33 @@
 import time
 from typing import Any, Dict, Optional
 
+from .events import FillEvent
+
+FILLED = ("filled", "full_fill", "complete")
+# resolved one way or the other; any other status may still fill
+TERMINAL = FILLED + ("canceled", "cancelled", "expired", "rejected", "failed")
+
+def is_terminal(detail: Optional[Dict[str, Any]]) -> bool:
+    return bool(detail) and str(detail.get("status", "")).lower() in TERMINAL
+
+# fields WEEX (and its fills endpoint) use to say which side of the trade an order was on
+_ROLE_KEYS = ("liquidity", "role", "tradeScope", "trade_scope", "execType", "exec_type")
+_MAKER_FLAGS = ("is_maker", "isMaker", "maker")
+
+def liquidity(detail: Dict[str, Any]) -> Optional[str]:
+    # "maker" / "taker" when the detail says so, else None
+    for k in _MAKER_FLAGS:
+        v = detail.get(k)
+        if isinstance(v, bool) or str(v).lower() in ("true", "false", "1", "0"):
+            return "maker" if str(v).lower() in ("true", "1") else "taker"
+    for k in _ROLE_KEYS:
+        v = str(detail.get(k) or "").lower()
+        if v in ("maker", "m", "add"):
+            return "maker"
+        if v in ("taker", "t", "remove"):
+            return "taker"
+    return None
+
 def fetch_order_detail(weex, order_id: str) -> Dict[str, Any]:
     return weex.request("GET", "/capi/v2/order/detail", params={"orderId": str(order_id)})
 
@@ -10,26 +37,24 @@ def poll_until_filled(weex, order_id: str, *, timeout_s: float = 20.0, interval_
     while time.time() < deadline:
         last = fetch_order_detail(weex, order_id)
         data = last.get("data", last) if isinstance(last, dict) else last
-        if isinstance(data, dict):
-            status = str(data.get("status", "")).lower()
-            if status in ("filled", "full_fill", "complete"):
-                return data
+        if isinstance(data, dict) and is_terminal(data):
+            return data
         time.sleep(interval_s)
     if isinstance(last, dict):
         data = last.get("data", last)
         return data if isinstance(data, dict) else None
     return None
 
-def to_fill_event(detail: Dict[str, Any]) -> Dict[str, Any]:
-    return {
-        "type": "fill",
-        "order_id": detail.get("order_id") or detail.get("orderId"),
-        "client_oid": detail.get("client_oid"),
-        "symbol": detail.get("symbol"),
-        "status": detail.get("status"),
-        "side": detail.get("type"),  # open_long, open_short, close_long, close_short
-        "filled_qty": detail.get("filled_qty"),
-        "avg_price": detail.get("price_avg"),
-        "fee": detail.get("fee"),
-        "ts": time.time(),
-    }
+def to_fill_event(detail: Dict[str, Any]) -> FillEvent:
+    return FillEvent(
+        order_id=detail.get("order_id") or detail.get("orderId"),
+        client_oid=detail.get("client_oid"),
+        symbol=detail.get("symbol"),
+        status=detail.get("status"),
+        side=detail.get("type"),  # open_long, open_short, close_long, close_short
+        filled_qty=detail.get("filled_qty"),
+        avg_price=detail.get("price_avg"),
+        fee=detail.get("fee"),
+        liquidity=liquidity(detail),
+        ts=time.time(),
+    )
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import hmac, os, sys, threading, time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+# Wall-clock sampling profiler over every thread in the process. Nothing is
+# installed while idle: a profile is just a loop over sys._current_frames()
+# in the thread that asked for it, so the cost is paid only while it runs.
+MAX_SECONDS = 60.0
+MAX_HZ = 1000
+MAX_DEPTH = 128
+
+_busy = threading.Lock()
+
+Stack = Tuple[str, ...]
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def sample(seconds: float = 5.0, hz: int = 100) -> Tuple[Counter, Dict[str, Any]]:
+    seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+    hz = max(1, min(int(hz), MAX_HZ))
+    if not _busy.acquire(blocking=False):
+        raise RuntimeError("a profile is already running")
+    try:
+        me = threading.get_ident()
+        interval = 1.0 / hz
+        counts: Counter = Counter()
+        names: Dict[int, str] = {}
+        n = 0
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            frames = sys._current_frames()
+            if len(names) < len(frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, f in frames.items():
+                if ident == me:
+                    continue
+                stack = []
+                while f is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_label(f.f_code))
+                    f = f.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                counts[tuple(reversed(stack))] += 1
+            del frames
+            n += 1
+            time.sleep(max(0.0, interval - (time.perf_counter() - now)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        _busy.release()
+    return counts, {"seconds": round(elapsed, 3), "hz": hz, "samples": n, "interval_s": interval}
+
+def collapsed(counts: Counter) -> str:
+    # Brendan Gregg's folded format: "thread;outer;...;inner <count>" per line
+    return "".join(f"{';'.join(s)} {c}\n" for s, c in counts.most_common())
+
+def speedscope(counts: Counter, meta: Dict[str, Any], name: str = "OrderSense") -> Dict[str, Any]:
+    # https://www.speedscope.app/file-format-schema.json, one sampled profile per thread
+    frames: Dict[str, int] = {}
+    by_thread: Dict[str, Tuple[list, list]] = {}
+    for stack, c in counts.items():
+        idx = [frames.setdefault(label, len(frames)) for label in stack[1:]]
+        samples, weights = by_thread.setdefault(stack[0], ([], []))
+        samples.append(idx)
+        weights.append(c * meta["interval_s"])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "ordersense.profiler",
+        "shared": {"frames": [{"name": label} for label in frames]},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": thread,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(w),
+                "samples": s,
+                "weights": w,
+            }
+            for thread, (s, w) in sorted(by_thread.items())
+        ],
+    }
+
+def authorized(token: Optional[str], expected: Optional[str] = None) -> bool:
+    # disabled unless ADMIN_TOKEN is set
+    expected = os.getenv("ADMIN_TOKEN", "") if expected is None else expected
+    return bool(expected) and bool(token) and hmac.compare_digest(token.encode(), expected.encode())
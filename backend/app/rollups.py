@@ -0,0 +1,211 @@
+from __future__ import annotations
+import math, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+# name -> (bucket seconds, buckets kept): 1 h of seconds, 1 day of minutes, 30 days of hours
+RESOLUTIONS: Dict[str, Tuple[int, int]] = {"1s": (1, 3600), "1m": (60, 1440), "1h": (3600, 720)}
+
+# resolutions finer than this are not checkpointed; they age out within the hour anyway
+PERSIST_MIN_STEP = 60
+
+def _agg() -> List[float]:
+    return [0, 0.0, math.inf, -math.inf]   # n, sum, min, max
+
+def _fold(a: List[float], x: float):
+    a[0] += 1
+    a[1] += x
+    if x < a[2]:
+        a[2] = x
+    if x > a[3]:
+        a[3] = x
+
+def _merge(a: List[float], b: List[float]):
+    a[0] += b[0]
+    a[1] += b[1]
+    a[2] = min(a[2], b[2])
+    a[3] = max(a[3], b[3])
+
+def _view(a: List[float], nd: int = 3) -> Optional[Dict[str, float]]:
+    if not a[0]:
+        return None
+    return {"min": round(a[2], nd), "mean": round(a[1] / a[0], nd), "max": round(a[3], nd), "n": int(a[0])}
+
+class _Bucket:
+    __slots__ = ("start", "decisions", "styles", "spread_bps", "liq", "fills", "maker", "slippage_bps")
+
+    def __init__(self):
+        self.reset(-1)
+
+    def reset(self, start: int):
+        self.start = start
+        self.decisions = 0
+        self.styles: Dict[str, int] = {}
+        self.spread_bps = _agg()
+        self.liq = _agg()
+        self.fills = 0
+        self.maker = 0
+        self.slippage_bps = _agg()
+
+    def merge(self, o: "_Bucket"):
+        self.decisions += o.decisions
+        for k, v in o.styles.items():
+            self.styles[k] = self.styles.get(k, 0) + v
+        _merge(self.spread_bps, o.spread_bps)
+        _merge(self.liq, o.liq)
+        self.fills += o.fills
+        self.maker += o.maker
+        _merge(self.slippage_bps, o.slippage_bps)
+
+    def view(self) -> Dict[str, Any]:
+        return {
+            "t": self.start,
+            "decisions": self.decisions,
+            "styles": dict(self.styles),
+            "spread_bps": _view(self.spread_bps),
+            "liq": _view(self.liq, 4),
+            "fills": self.fills,
+            "maker_share": round(self.maker / self.fills, 4) if self.fills else None,
+            "slippage_bps": _view(self.slippage_bps),
+        }
+
+    def state(self) -> list:
+        return [self.start, self.decisions, dict(self.styles), list(self.spread_bps), list(self.liq), self.fills, self.maker, list(self.slippage_bps)]
+
+    def load(self, st: list):
+        self.start, self.decisions, styles, spread, liq, self.fills, self.maker, slip = st
+        self.styles = {str(k): int(v) for k, v in styles.items()}
+        # json turns inf into Infinity, which float() reads back
+        self.spread_bps, self.liq, self.slippage_bps = ([float(x) for x in a] for a in (spread, liq, slip))
+
+class _Ring:
+    # Fixed array of buckets indexed by (start / step) % size. A slot holding
+    # an older start is stale and is reset when its time comes round again,
+    # so nothing is ever evicted explicitly and memory never grows.
+    __slots__ = ("step", "size", "_b")
+
+    def __init__(self, step: int, size: int):
+        self.step = step
+        self.size = size
+        self._b = [_Bucket() for _ in range(size)]
+
+    def at(self, ts: float) -> Optional[_Bucket]:
+        start = int(ts // self.step) * self.step
+        b = self._b[(start // self.step) % self.size]
+        if b.start != start:
+            if b.start > start:
+                return None   # older than the ring reaches
+            b.reset(start)
+        return b
+
+    def range(self, t0: float, t1: float) -> List[_Bucket]:
+        # at most `size` slots are visited however long the process has been running
+        first = int(t0 // self.step)
+        last = int(t1 // self.step)
+        first = max(first, last - self.size + 1)
+        out = []
+        for i in range(first, last + 1):
+            b = self._b[i % self.size]
+            if b.start == i * self.step:
+                out.append(b)
+        return out
+
+class Rollups:
+    # Decisions and fills folded into 1s / 1m / 1h buckets as they happen,
+    # per symbol and across all symbols. Each fold touches one bucket per
+    # resolution; a range query reads at most one ring's worth of buckets.
+    def __init__(self, resolutions: Dict[str, Tuple[int, int]] = RESOLUTIONS):
+        self.resolutions = dict(resolutions)
+        self._lock = threading.Lock()
+        self._rings: Dict[Optional[str], Dict[str, _Ring]] = {}
+
+    def _scopes(self, symbol: Optional[str]) -> List[Dict[str, _Ring]]:
+        out = []
+        for key in (None, symbol) if symbol else (None,):
+            r = self._rings.get(key)
+            if r is None:
+                r = self._rings[key] = {name: _Ring(step, size) for name, (step, size) in self.resolutions.items()}
+            out.append(r)
+        return out
+
+    def on_decision(self, symbol: str, style: str, spread: Optional[float], mid: Optional[float], liq: Optional[float], ts: Optional[float] = None):
+        ts = ts or time.time()
+        spread_bps = spread / mid * 1e4 if spread is not None and mid else None
+        with self._lock:
+            for rings in self._scopes(symbol):
+                for ring in rings.values():
+                    b = ring.at(ts)
+                    if b is None:
+                        continue
+                    b.decisions += 1
+                    b.styles[style] = b.styles.get(style, 0) + 1
+                    if spread_bps is not None:
+                        _fold(b.spread_bps, spread_bps)
+                    if liq is not None:
+                        _fold(b.liq, liq)
+
+    def on_fill(self, symbol: str, maker: bool, slippage_bps: Optional[float], ts: Optional[float] = None):
+        ts = ts or time.time()
+        with self._lock:
+            for rings in self._scopes(symbol):
+                for ring in rings.values():
+                    b = ring.at(ts)
+                    if b is None:
+                        continue
+                    b.fills += 1
+                    b.maker += 1 if maker else 0
+                    if slippage_bps is not None:
+                        _fold(b.slippage_bps, slippage_bps)
+
+    def query(self, res: str = "1m", start: Optional[float] = None, end: Optional[float] = None,
+              symbol: Optional[str] = None) -> Dict[str, Any]:
+        if res not in self.resolutions:
+            raise ValueError(f"res must be one of {', '.join(self.resolutions)}")
+        step, size = self.resolutions[res]
+        end = time.time() if end is None else end
+        start = end - step * 60 if start is None else start
+        if start > end:
+            raise ValueError("start is after end")
+        total = _Bucket()
+        with self._lock:
+            rings = self._rings.get(symbol)
+            buckets = rings[res].range(start, end) if rings else []
+            views = [b.view() for b in buckets]
+            for b in buckets:
+                total.merge(b)
+        tv = total.view()
+        tv.pop("t")
+        return {
+            "res": res,
+            "step_s": step,
+            "symbol": symbol,
+            "start": start,
+            "end": end,
+            # the ring cannot answer further back than this
+            "retained_from": (int(end // step) - size + 1) * step,
+            "buckets": views,
+            "total": tv,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                sym or "": {
+                    name: [b.state() for b in ring._b if b.start >= 0]
+                    for name, ring in rings.items() if ring.step >= PERSIST_MIN_STEP
+                }
+                for sym, rings in self._rings.items()
+            }
+
+    def load_state(self, st: Dict[str, Any]):
+        with self._lock:
+            for sym, by_res in st.items():
+                scopes = self._scopes(sym or None)
+                rings = scopes[-1]
+                for name, buckets in by_res.items():
+                    ring = rings.get(name)
+                    if ring is None:
+                        continue
+                    for b in buckets:
+                        slot = ring._b[(int(b[0]) // ring.step) % ring.size]
+                        if slot.start < int(b[0]):
+                            slot.load(b)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import os, struct, threading, time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .execution.types import MarketSnapshot
+from .depth import depth_summary, liquidity_score
+
+# Fixed layout, little endian:
+#   header   64 bytes   magic, layout version, n_symbols, slots
+#   names    n * 32     utf-8 symbol names, NUL padded
+#   regions  n * (8 + slots * 48)
+#            u64 write counter, then a ring of slots:
+#            u64 seq | f64 ts | f64 mid | f64 spread | f64 vol_1m | f64 liq
+# A slot's seq is odd while the feed is writing it; readers retry on odd or
+# changed seq (seqlock), so nothing is locked and nothing is serialized.
+MAGIC = b"OSNAPBUS"
+LAYOUT_VERSION = 1
+_HEADER = struct.Struct("<8sIII")
+_HEADER_SIZE = 64
+_NAME_SIZE = 32
+_U64 = struct.Struct("<Q")
+_PAYLOAD = struct.Struct("<ddddd")
+_SLOT_SIZE = _U64.size + _PAYLOAD.size
+
+def _bus_size(n_symbols: int, slots: int) -> int:
+    return _HEADER_SIZE + n_symbols * (_NAME_SIZE + _U64.size + slots * _SLOT_SIZE)
+
+class SnapshotBus:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._buf = shm.buf
+        magic, version, n, slots = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            raise RuntimeError(f"Not an OrderSense snapshot bus: {shm.name}")
+        self.slots = slots
+        self.symbols: List[str] = []
+        for i in range(n):
+            raw = bytes(self._buf[_HEADER_SIZE + i * _NAME_SIZE:_HEADER_SIZE + (i + 1) * _NAME_SIZE])
+            self.symbols.append(raw.rstrip(b"\0").decode())
+        regions = _HEADER_SIZE + n * _NAME_SIZE
+        region_size = _U64.size + slots * _SLOT_SIZE
+        self._region: Dict[str, int] = {sym: regions + i * region_size for i, sym in enumerate(self.symbols)}
+
+    @classmethod
+    def create(cls, name: str, symbols: Iterable[str], slots: int = 8) -> "SnapshotBus":
+        symbols = list(symbols)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_bus_size(len(symbols), slots))
+        shm.buf[:] = bytes(shm.size)
+        _HEADER.pack_into(shm.buf, 0, MAGIC, LAYOUT_VERSION, len(symbols), slots)
+        for i, sym in enumerate(symbols):
+            raw = sym.encode()
+            if len(raw) > _NAME_SIZE:
+                raise ValueError(f"Symbol name too long for bus: {sym}")
+            off = _HEADER_SIZE + i * _NAME_SIZE
+            shm.buf[off:off + len(raw)] = raw
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SnapshotBus":
+        shm = shared_memory.SharedMemory(name=name)
+        # readers must not unlink the segment when they exit
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return cls(shm, owner=False)
+
+    def publish(self, symbol: str, snap: MarketSnapshot, ts: Optional[float] = None) -> int:
+        base = self._region[symbol]
+        buf = self._buf
+        counter = _U64.unpack_from(buf, base)[0]
+        slot = base + _U64.size + (counter % self.slots) * _SLOT_SIZE
+        seq = _U64.unpack_from(buf, slot)[0]
+        _U64.pack_into(buf, slot, seq + 1)
+        _PAYLOAD.pack_into(buf, slot + _U64.size, ts or time.time(), snap.mid, snap.spread, snap.vol_1m, snap.liquidity_score)
+        _U64.pack_into(buf, slot, seq + 2)
+        _U64.pack_into(buf, base, counter + 1)
+        return counter + 1
+
+    def read(self, symbol: str, retries: int = 100) -> Optional[Tuple[int, float, MarketSnapshot]]:
+        base = self._region.get(symbol)
+        if base is None:
+            return None
+        buf = self._buf
+        for _ in range(retries):
+            counter = _U64.unpack_from(buf, base)[0]
+            if counter == 0:
+                return None
+            slot = base + _U64.size + ((counter - 1) % self.slots) * _SLOT_SIZE
+            s1 = _U64.unpack_from(buf, slot)[0]
+            if s1 & 1:
+                continue
+            ts, mid, spread, vol_1m, liq = _PAYLOAD.unpack_from(buf, slot + _U64.size)
+            if _U64.unpack_from(buf, slot)[0] == s1:
+                return counter, ts, MarketSnapshot(mid=mid, spread=spread, vol_1m=vol_1m, liquidity_score=liq)
+        return None
+
+    def latest(self, symbol: str, max_age_s: Optional[float] = None) -> Optional[MarketSnapshot]:
+        hit = self.read(symbol)
+        if hit is None:
+            return None
+        _, ts, snap = hit
+        if max_age_s is not None and time.time() - ts > max_age_s:
+            return None
+        return snap
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+def snapshot_from_depth(raw: bytes) -> MarketSnapshot:
+    top = depth_summary(raw, 5)
+    liq = liquidity_score(top["ask_qty"], top["bid_qty"])
+    return MarketSnapshot(mid=top["mid"], spread=top["spread"], vol_1m=0.002, liquidity_score=liq)
+
+def run_feed(weex, bus: SnapshotBus, interval_s: float = 1.0, stop: Optional[threading.Event] = None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        for sym in bus.symbols:
+            try:
+                bus.publish(sym, snapshot_from_depth(weex.get_depth_raw(symbol=sym, limit=15)))
+            except Exception as e:
+                print(f"feed: depth_failed for {sym}: {e}")
+        stop.wait(interval_s)
+
+def main():
+    from dotenv import load_dotenv
+    from .weex_client import WeexClient, WeexCredentials
+
+    load_dotenv(".env")
+    name = os.getenv("SNAPSHOT_BUS", "ordersense_md")
+    symbols = [s.strip() for s in os.getenv("SYMBOLS", os.getenv("SYMBOL", "cmt_btcusdt")).split(",") if s.strip()]
+    creds = WeexCredentials(
+        api_key=os.getenv("WEEX_API_KEY", ""),
+        secret_key=os.getenv("WEEX_SECRET_KEY", ""),
+        passphrase=os.getenv("WEEX_PASSPHRASE", ""),
+    )
+    weex = WeexClient(creds, os.getenv("WEEX_BASE_URL", "https://api-contract.weex.com"))
+    bus = SnapshotBus.create(name, symbols, slots=int(os.getenv("SNAPSHOT_BUS_SLOTS", "8")))
+    print(f"OrderSense snapshot feed publishing {len(symbols)} symbols on shm:{name}")
+    try:
+        run_feed(weex, bus, interval_s=float(os.getenv("FEED_INTERVAL_S", "1")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.close()
+
+if __name__ == "__main__":
+    main()
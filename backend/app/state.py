@@ -1,30 +1,125 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from collections import deque
+from typing import Any, Deque, Dict
 import threading, time
 
+from .events import Event, as_event
+
+def _plain(v: Any) -> Any:
+    return v.to_dict() if isinstance(v, Event) else v
+
+def _default_metrics() -> Dict[str, Any]:
+    return {
+        "decisions": 0,
+        "orders": 0,
+        "maker_rate": 0.0,
+        "avg_slippage_bps": 0.0,
+    }
+
+@dataclass
+class SymbolState:
+    symbol: str
+    last_snapshot: Dict[str, Any] | None = None
+    last_decision: Event | Dict[str, Any] | None = None
+    last_error: str | None = None
+    updated_at: float | None = None
+    metrics: Dict[str, Any] = field(default_factory=_default_metrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "last_snapshot": self.last_snapshot,
+            "last_decision": _plain(self.last_decision),
+            "last_error": self.last_error,
+            "updated_at": self.updated_at,
+            "metrics": dict(self.metrics),
+        }
+
+    def load(self, d: Dict[str, Any]):
+        self.last_snapshot = d.get("last_snapshot")
+        self.last_decision = as_event(d["last_decision"]) if d.get("last_decision") else None
+        self.last_error = d.get("last_error")
+        self.updated_at = d.get("updated_at")
+        self.metrics.update(d.get("metrics") or {})
+
 @dataclass
 class BotState:
     running: bool = False
     started_at: float | None = None
     symbol: str = "BTCUSDT"
-    events: List[Dict[str, Any]] = field(default_factory=list)
-    metrics: Dict[str, Any] = field(default_factory=lambda: {
-        "decisions": 0,
-        "orders": 0,
-        "maker_rate": 0.0,
-        "avg_slippage_bps": 0.0,
-    })
+    events: Deque[Event] = field(default_factory=lambda: deque(maxlen=200))
+    metrics: Dict[str, Any] = field(default_factory=_default_metrics)
+    symbols: Dict[str, SymbolState] = field(default_factory=dict)
 
 class StateStore:
     def __init__(self):
         self.state = BotState()
         self.lock = threading.Lock()
+        self.history = None  # optional app.history.HistoryStore
+
+    def add_event(self, evt: Event | Dict[str, Any]):
+        evt = as_event(evt)
+        with self.lock:
+            self.state.events.appendleft(evt)
+        if self.history is not None:
+            self.history.append(evt)
+
+    def symbol_state(self, symbol: str) -> SymbolState:
+        # callers must hold self.lock
+        ss = self.state.symbols.get(symbol)
+        if ss is None:
+            ss = self.state.symbols[symbol] = SymbolState(symbol=symbol)
+        return ss
+
+    def recent_events(self, n: int = 50, symbol: str | None = None) -> list:
+        with self.lock:
+            out = []
+            for e in self.state.events:
+                if symbol and e.get("symbol") != symbol:
+                    continue
+                out.append(e)
+                if len(out) >= n:
+                    break
+            return out
+
+    def set_symbols(self, symbols: list):
+        with self.lock:
+            self.state.symbol = symbols[0] if symbols else self.state.symbol
+            for sym in symbols:
+                self.symbol_state(sym)
+
+    def bump(self, symbol: str, key: str, n: int = 1):
+        with self.lock:
+            self.state.metrics[key] = self.state.metrics.get(key, 0) + n
+            m = self.symbol_state(symbol).metrics
+            m[key] = m.get(key, 0) + n
+
+    def update_symbol(self, symbol: str, **fields: Any):
+        with self.lock:
+            ss = self.symbol_state(symbol)
+            for k, v in fields.items():
+                setattr(ss, k, v)
+            ss.updated_at = time.time()
+
+    def symbols_status(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {sym: ss.to_dict() for sym, ss in self.state.symbols.items()}
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        with self.lock:
+            events = list(self.state.events)
+            metrics = dict(self.state.metrics)
+            symbols = {sym: ss.to_dict() for sym, ss in self.state.symbols.items()}
+        return {"events": [e.to_dict() for e in events], "metrics": metrics, "symbols": symbols}
 
-    def add_event(self, evt: Dict[str, Any]):
+    def load_checkpoint(self, st: Dict[str, Any]):
+        events = [as_event(d) for d in st.get("events") or []]
         with self.lock:
-            evt["ts"] = evt.get("ts") or time.time()
-            self.state.events.insert(0, evt)
-            self.state.events = self.state.events[:200] 
+            self.state.events.clear()
+            self.state.events.extend(events)
+            self.state.metrics.update(st.get("metrics") or {})
+            for sym, d in (st.get("symbols") or {}).items():
+                self.symbol_state(sym).load(d)
 
-store = StateStore()
\ No newline at end of file
+store = StateStore()
@@ -1,9 +1,16 @@
 from __future__ import annotations
-import base64, hashlib, hmac, json, time
+import base64, hashlib, hmac, json, threading, time
+from collections import deque
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
-import requests
+
+if TYPE_CHECKING:
+    import requests
+
+# WEEX caps batchOrders / cancel_batch_orders at 20 entries per request
+BATCH_ORDER_MAX = 20
+BATCH_CANCEL_MAX = 20
 
 def _ms() -> int:
     return int(time.time() * 1000)
@@ -15,6 +22,96 @@ def _b64_hmac_sha256(secret: str, message: str) -> str:
     digest = hmac.new(secret.encode(), message.encode(), hashlib.sha256).digest()
     return base64.b64encode(digest).decode()
 
+class WeexHTTPError(RuntimeError):
+    def __init__(self, status_code: int, msg: str):
+        super().__init__(msg)
+        self.status_code = status_code
+
+# WEEX's documented ACCESS-TIMESTAMP errors: 40005 invalid, 40008 expired.
+# Only these mean the request was refused before it reached the matching
+# engine, so only these are safe to resend (placeOrder included); anything
+# else that merely mentions a timestamp is passed through as an error.
+_TS_CODES = {"40005", "40008"}
+
+def _ts_rejected(status_code: int, payload: Any) -> bool:
+    return status_code >= 400 and isinstance(payload, dict) and str(payload.get("code", "")) in _TS_CODES
+
+class ServerClock:
+    # Offset from the local clock to exchange time, applied to every
+    # ACCESS-TIMESTAMP. Each sample reads /capi/v2/market/time and assumes the
+    # server stamped it at the midpoint of the round trip; of the last few
+    # samples the one with the smallest RTT wins, since queueing delay is the
+    # main error. One clock can be shared by every client of the same exchange.
+    def __init__(self, resync_interval_s: float = 60.0, keep: int = 8):
+        self.resync_interval_s = resync_interval_s
+        self.offset_ms = 0
+        self._samples: Deque[Tuple[float, int]] = deque(maxlen=keep)   # (rtt_ms, offset_ms)
+        self._lock = threading.Lock()
+        self._syncing = False
+        self._last_attempt = 0.0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.rejected = 0
+        self.last_rtt_ms: Optional[float] = None
+        self.synced_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def now_ms(self) -> int:
+        return _ms() + self.offset_ms
+
+    def add_sample(self, t0_ms: float, server_ms: float, t1_ms: float) -> int:
+        rtt = t1_ms - t0_ms
+        off = int(round(server_ms - (t0_ms + t1_ms) / 2))
+        with self._lock:
+            self._samples.append((rtt, off))
+            self.offset_ms = min(self._samples)[1]
+            self.syncs += 1
+            self.last_rtt_ms = round(rtt, 3)
+            self.synced_at = time.time()
+            return self.offset_ms
+
+    def reset(self):
+        # after a rejection the old samples are suspect (e.g. the local clock was stepped)
+        with self._lock:
+            self._samples.clear()
+
+    def claim(self) -> bool:
+        # True for the one caller that should run a periodic resync now
+        if not self.resync_interval_s:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if self._syncing or now - self._last_attempt < self.resync_interval_s:
+                return False
+            self._syncing = True
+            self._last_attempt = now
+            return True
+
+    def release(self, err: Optional[Exception] = None):
+        with self._lock:
+            self._syncing = False
+            if err is not None:
+                self.sync_errors += 1
+                self.last_error = str(err)[:300]
+
+    def on_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "offset_ms": self.offset_ms,
+                "last_rtt_ms": self.last_rtt_ms,
+                "best_rtt_ms": round(min(self._samples)[0], 3) if self._samples else None,
+                "samples": len(self._samples),
+                "syncs": self.syncs,
+                "sync_errors": self.sync_errors,
+                "timestamp_rejections": self.rejected,
+                "synced_at": self.synced_at,
+                "last_error": self.last_error,
+            }
+
 @dataclass(frozen=True)
 class WeexCredentials:
     api_key: str
@@ -22,17 +119,64 @@ class WeexCredentials:
     passphrase: str
 
 class WeexClient:
-    def __init__(self, creds: WeexCredentials, base_url: str):
+    def __init__(self, creds: WeexCredentials, base_url: str, clock: Optional[ServerClock] = None):
         self.creds = creds
         self.base_url = base_url.rstrip("/")
-        self.s = requests.Session()
+        self.clock = clock or ServerClock()
+        # requests (and its urllib3/ssl imports) is loaded on the first call,
+        # not when the server module is imported
+        self._s: Optional["requests.Session"] = None
+        self._s_lock = threading.Lock()
+
+    @property
+    def s(self) -> "requests.Session":
+        if self._s is None:
+            with self._s_lock:
+                if self._s is None:
+                    import requests
+                    self._s = requests.Session()
+        return self._s
 
     def _sign(self, timestamp: str, method: str, path: str, query: str, body: str) -> str:
         # timestamp + METHOD + requestPath + (?query) + body
         msg = f"{timestamp}{method}{path}{query}{body}"
         return _b64_hmac_sha256(self.creds.secret_key, msg)
 
-    def request(
+    def sync_time(self, timeout: float = 3.0) -> int:
+        # one RTT-midpoint sample from the public time endpoint; returns the offset in ms
+        url = f"{self.base_url}/capi/v2/market/time"
+        t0 = time.time() * 1000
+        resp = self.s.get(url, headers={"Accept": "application/json"}, timeout=timeout)
+        t1 = time.time() * 1000
+        payload = resp.json()
+        server_ms = payload.get("timestamp") or float(payload["epoch"]) * 1000
+        return self.clock.add_sample(t0, float(server_ms), t1)
+
+    def _resync(self):
+        try:
+            self.sync_time()
+        except Exception as e:
+            self.clock.release(e)
+        else:
+            self.clock.release()
+
+    def _headers(self, method: str, path: str, query: str, body: str) -> Dict[str, str]:
+        if self.clock.claim():
+            # refreshed off the request path; this request signs with the current offset
+            threading.Thread(target=self._resync, daemon=True, name="weex-time").start()
+        ts = str(self.clock.now_ms())
+        return {
+            "User-Agent": "OrderSense/1.0",
+            "Accept": "application/json",
+            "ACCESS-KEY": self.creds.api_key,
+            "ACCESS-SIGN": self._sign(ts, method, path, query, body),
+            "ACCESS-PASSPHRASE": self.creds.passphrase,
+            "ACCESS-TIMESTAMP": ts,
+            "Content-Type": "application/json",
+            "locale": "en-US",
+        }
+
+    def _send(
         self,
         method: str,
         path: str,
@@ -40,7 +184,7 @@ class WeexClient:
         params: Optional[Dict[str, Any]] = None,
         json_body: Optional[Dict[str, Any]] = None,
         timeout: float = 10.0,
-    ) -> Dict[str, Any]:
+    ) -> requests.Response:
         method = method.upper()
         query = ""
         if params:
@@ -53,34 +197,46 @@ class WeexClient:
             body = _json(json_body)
             data = body
 
-        ts = str(_ms())
-        sign = self._sign(ts, method, path, query, body)
+        headers = self._headers(method, path, query, body)
+        url = f"{self.base_url}{path}{query}"
+        return self.s.get(url, headers=headers, timeout=timeout) if method == "GET" else self.s.post(url, headers=headers, data=data, timeout=timeout)
 
-        headers = {
-            "User-Agent": "OrderSense/1.0",
-            "Accept": "application/json",
-            "ACCESS-KEY": self.creds.api_key,
-            "ACCESS-SIGN": sign,
-            "ACCESS-PASSPHRASE": self.creds.passphrase,
-            "ACCESS-TIMESTAMP": ts,
-            "Content-Type": "application/json",
-            "locale": "en-US",
-        }
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        json_body: Optional[Dict[str, Any]] = None,
+        timeout: float = 10.0,
+    ) -> Dict[str, Any]:
+        resp, payload = self._send_json(method, path, params=params, json_body=json_body, timeout=timeout)
+        if _ts_rejected(resp.status_code, payload) and self._on_ts_rejected():
+            resp, payload = self._send_json(method, path, params=params, json_body=json_body, timeout=timeout)
 
-        url = f"{self.base_url}{path}{query}"
-        resp = self.s.get(url, headers=headers, timeout=timeout) if method == "GET" else self.s.post(url, headers=headers, data=data, timeout=timeout)
+        if resp.status_code >= 400:
+            raise WeexHTTPError(resp.status_code, f"WEEX HTTP {resp.status_code}: {payload}")
 
+        return payload
+
+    def _send_json(self, method: str, path: str, **kwargs: Any) -> Tuple["requests.Response", Any]:
+        resp = self._send(method, path, **kwargs)
         try:
-            payload = resp.json()
+            return resp, resp.json()
         except Exception:
             cf = resp.headers.get("cf-ray","")
             srv = resp.headers.get("server","")
-            raise RuntimeError(f"Non-JSON response (status={resp.status_code}, server={srv}, cf-ray={cf}): {resp.text[:500]}")
-
-        if resp.status_code >= 400:
-            raise RuntimeError(f"WEEX HTTP {resp.status_code}: {payload}")
+            raise WeexHTTPError(resp.status_code, f"Non-JSON response (status={resp.status_code}, server={srv}, cf-ray={cf}): {resp.text[:500]}")
 
-        return payload
+    def _on_ts_rejected(self) -> bool:
+        # the request never reached the matching engine: resync now and send it once more
+        self.clock.on_rejected()
+        self.clock.reset()
+        try:
+            self.sync_time()
+        except Exception:
+            return False
+        return True
 
     def upload_ai_log(
         self,
@@ -104,10 +260,27 @@ class WeexClient:
         }
         return self.request("POST", "/capi/v2/order/uploadAiLog", json_body=body, timeout=timeout)
 
+    def request_raw(self, method: str, path: str, *, params: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> bytes:
+        # undecoded body, for callers with their own parser (see app.depth)
+        resp = self._send(method, path, params=params, timeout=timeout)
+        if resp.status_code >= 400:
+            try:
+                retry = _ts_rejected(resp.status_code, resp.json()) and self._on_ts_rejected()
+            except ValueError:
+                retry = False
+            if retry:
+                resp = self._send(method, path, params=params, timeout=timeout)
+        if resp.status_code >= 400:
+            raise WeexHTTPError(resp.status_code, f"WEEX HTTP {resp.status_code}: {resp.text[:500]}")
+        return resp.content
+
     def get_depth(self, symbol: str, limit: int = 15) -> Dict[str, Any]:
         # GET /capi/v2/market/depth
         return self.request("GET", "/capi/v2/market/depth", params={"symbol": symbol, "limit": limit}, timeout=3.0)
 
+    def get_depth_raw(self, symbol: str, limit: int = 15) -> bytes:
+        return self.request_raw("GET", "/capi/v2/market/depth", params={"symbol": symbol, "limit": limit}, timeout=3.0)
+
     def place_order(
         self,
         *,
@@ -122,20 +295,123 @@ class WeexClient:
         presetStopLossPrice: str | None = None,
         marginMode: int | None = None,
     ) -> Dict[str, Any]:
-        body: Dict[str, Any] = {
-            "symbol": symbol,
-            "client_oid": client_oid[:40],
-            "size": size,
-            "type": type_,
-            "order_type": order_type,
-            "match_price": match_price,
-            "price": price,
-        }
-        if presetTakeProfitPrice is not None:
-            body["presetTakeProfitPrice"] = presetTakeProfitPrice
-        if presetStopLossPrice is not None:
-            body["presetStopLossPrice"] = presetStopLossPrice
-        if marginMode is not None:
-            body["marginMode"] = marginMode
-
+        body: Dict[str, Any] = {"symbol": symbol}
+        body.update(_order_body(
+            client_oid=client_oid,
+            size=size,
+            type_=type_,
+            order_type=order_type,
+            match_price=match_price,
+            price=price,
+            presetTakeProfitPrice=presetTakeProfitPrice,
+            presetStopLossPrice=presetStopLossPrice,
+            marginMode=marginMode,
+        ))
         return self.request("POST", "/capi/v2/order/placeOrder", json_body=body)
+
+    def place_orders(self, *, symbol: str, orders: List[Dict[str, Any]], timeout: float = 10.0) -> List[Dict[str, Any]]:
+        # orders take the same keyword arguments as place_order (minus symbol).
+        # Returns one result per input order, in input order:
+        #   {"client_oid", "order_id", "ok", "error"}
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(orders), BATCH_ORDER_MAX):
+            chunk = [_order_body(**o) for o in orders[i:i + BATCH_ORDER_MAX]]
+            try:
+                resp = self.request(
+                    "POST", "/capi/v2/order/batchOrders",
+                    json_body={"symbol": symbol, "orderDataList": chunk},
+                    timeout=timeout,
+                )
+            except Exception as e:
+                results.extend({"client_oid": o["client_oid"], "order_id": None, "ok": False, "error": str(e)} for o in chunk)
+                continue
+            data = resp.get("data", resp) if isinstance(resp, dict) else resp
+            infos = data.get("order_info", []) if isinstance(data, dict) else data
+            by_cid = {str(x.get("client_oid")): x for x in infos or [] if isinstance(x, dict)}
+            for o in chunk:
+                x = by_cid.get(o["client_oid"])
+                if x is None:
+                    results.append({"client_oid": o["client_oid"], "order_id": None, "ok": False, "error": "missing from batch response"})
+                    continue
+                ok = bool(x.get("result", True)) and bool(x.get("order_id"))
+                results.append({
+                    "client_oid": o["client_oid"],
+                    "order_id": x.get("order_id"),
+                    "ok": ok,
+                    "error": None if ok else (x.get("error_message") or x.get("error_code") or "rejected"),
+                })
+        return results
+
+    def cancel_order(self, *, order_id: str | None = None, client_oid: str | None = None) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"orderId": str(order_id)} if order_id is not None else {"clientOid": client_oid}
+        return self.request("POST", "/capi/v2/order/cancel_order", json_body=body)
+
+    def cancel_orders(
+        self,
+        *,
+        order_ids: List[str] | None = None,
+        client_oids: List[str] | None = None,
+        timeout: float = 10.0,
+    ) -> List[Dict[str, Any]]:
+        # Pass either order_ids or client_oids. One result per id, in input order:
+        #   {"id", "ok", "error"}
+        by_oid = order_ids is not None
+        ids = [str(x) for x in (order_ids if by_oid else client_oids or [])]
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(ids), BATCH_CANCEL_MAX):
+            chunk = ids[i:i + BATCH_CANCEL_MAX]
+            try:
+                resp = self.request(
+                    "POST", "/capi/v2/order/cancel_batch_orders",
+                    json_body={"ids": chunk} if by_oid else {"cids": chunk},
+                    timeout=timeout,
+                )
+            except Exception as e:
+                results.extend({"id": x, "ok": False, "error": str(e)} for x in chunk)
+                continue
+            data = resp.get("data", resp) if isinstance(resp, dict) else resp
+            entries = data.get("cancelOrderResultList", []) if isinstance(data, dict) else data
+            key = "order_id" if by_oid else "client_oid"
+            by_id = {str(x.get(key)): x for x in entries or [] if isinstance(x, dict)}
+            for x in chunk:
+                r = by_id.get(x)
+                if r is None:
+                    results.append({"id": x, "ok": False, "error": "missing from batch response"})
+                    continue
+                ok = bool(r.get("result"))
+                results.append({"id": x, "ok": ok, "error": None if ok else (r.get("err_msg") or "rejected")})
+        return results
+
+    def cancel_all_orders(self, symbol: str | None = None, *, cancel_order_type: str = "normal", timeout: float = 5.0) -> Any:
+        body: Dict[str, Any] = {"cancelOrderType": cancel_order_type}
+        if symbol:
+            body["symbol"] = symbol
+        return self.request("POST", "/capi/v2/order/cancelAllOrders", json_body=body, timeout=timeout)
+
+def _order_body(
+    *,
+    client_oid: str,
+    size: str,
+    type_: str,
+    order_type: str,
+    match_price: str,
+    price: str,
+    presetTakeProfitPrice: str | None = None,
+    presetStopLossPrice: str | None = None,
+    marginMode: int | None = None,
+) -> Dict[str, Any]:
+    body: Dict[str, Any] = {
+        "client_oid": client_oid[:40],
+        "size": size,
+        "type": type_,
+        "order_type": order_type,
+        "match_price": match_price,
+        "price": price,
+    }
+    if presetTakeProfitPrice is not None:
+        body["presetTakeProfitPrice"] = presetTakeProfitPrice
+    if presetStopLossPrice is not None:
+        body["presetStopLossPrice"] = presetStopLossPrice
+    if marginMode is not None:
+        body["marginMode"] = marginMode
+    return body
@@ -0,0 +1,289 @@
+from __future__ import annotations
+import os, threading, time, zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from .exec_metrics import RollingWindow
+from .weex_client import ServerClock, WeexClient, WeexCredentials, WeexHTTPError
+
+# 429 is the documented rate limit; 418 is what some gateways send once a key is banned for a while
+_THROTTLE_STATUS = {418, 429}
+
+def _throttled(e: Exception) -> bool:
+    if isinstance(e, WeexHTTPError) and e.status_code in _THROTTLE_STATUS:
+        return True
+    msg = str(e).lower()
+    return "too many requests" in msg or "rate limit" in msg
+
+def credentials_from_env(environ: Mapping[str, str] = os.environ) -> List[WeexCredentials]:
+    # WEEX_API_KEY / WEEX_SECRET_KEY / WEEX_PASSPHRASE, then the same names
+    # with _2, _3, ... for every extra account
+    out: List[WeexCredentials] = []
+    for i in range(1, 33):
+        sfx = "" if i == 1 else f"_{i}"
+        key = environ.get(f"WEEX_API_KEY{sfx}", "").strip()
+        if not key:
+            if i == 1:
+                continue
+            break
+        out.append(WeexCredentials(key, environ.get(f"WEEX_SECRET_KEY{sfx}", "").strip(), environ.get(f"WEEX_PASSPHRASE{sfx}", "").strip()))
+    return out
+
+def parse_symbol_keys(spec: str) -> Dict[str, int]:
+    # "cmt_btcusdt=0,cmt_ethusdt=1" -> {"cmt_btcusdt": 0, "cmt_ethusdt": 1}
+    out: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        sym, sep, idx = part.partition("=")
+        if sep and sym.strip() and idx.strip():
+            out[sym.strip()] = int(idx)
+    return out
+
+class _Key:
+    __slots__ = ("idx", "client", "label", "inflight", "requests", "errors", "throttled",
+                 "streak", "cooldown_until", "last_error", "last_error_ts", "latency")
+
+    def __init__(self, idx: int, client: WeexClient):
+        self.idx = idx
+        self.client = client
+        self.label = f"key{idx}:...{client.creds.api_key[-4:]}"
+        self.inflight = 0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.streak = 0                  # consecutive failures
+        self.cooldown_until = 0.0
+        self.last_error: Optional[str] = None
+        self.last_error_ts: Optional[float] = None
+        self.latency = RollingWindow(200)
+
+class WeexClientPool:
+    # Several API keys behind the WeexClient interface, one HTTP session each.
+    # A symbol's orders go to its home key (WEEX_SYMBOL_KEYS, else the
+    # configured symbols dealt round-robin, else a stable hash), and every order id placed through the pool remembers its key so
+    # detail / cancel / AI-log calls reach the right account. Everything else
+    # (depth, AI logs without an order id) goes to the least-loaded key. A key
+    # that is throttled or keeps failing cools down and is skipped, and new
+    # orders for its symbols fail over to another key in the meantime.
+    def __init__(self, creds: Sequence[WeexCredentials], base_url: str, symbols: Sequence[str] = (), symbol_keys: Optional[Dict[str, int]] = None,
+                 cooldown_s: float = 2.0, max_cooldown_s: float = 60.0, error_threshold: int = 3, max_orders: int = 10000):
+        if not creds:
+            raise ValueError("WeexClientPool needs at least one credential set")
+        # one exchange, one clock: every key signs with the same offset
+        self.clock = ServerClock()
+        self.keys = [_Key(i, WeexClient(c, base_url, clock=self.clock)) for i, c in enumerate(creds)]
+        self.symbol_keys = {s: i % len(self.keys) for i, s in enumerate(symbols)}
+        self.symbol_keys.update({s: i for s, i in (symbol_keys or {}).items() if 0 <= i < len(self.keys)})
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.error_threshold = error_threshold
+        self.max_orders = max_orders
+        self._lock = threading.Lock()
+        self._owner: "OrderedDict[str, int]" = OrderedDict()   # order id / client oid -> key idx
+
+    # the primary credentials, for callers that check whether keys are configured
+    @property
+    def creds(self) -> WeexCredentials:
+        return self.keys[0].client.creds
+
+    def home(self, symbol: str) -> _Key:
+        i = self.symbol_keys.get(symbol)
+        if i is None:
+            i = zlib.crc32(symbol.encode()) % len(self.keys)
+        return self.keys[i]
+
+    def _pick(self, prefer: Optional[_Key] = None, exclude: Optional[_Key] = None) -> _Key:
+        now = time.monotonic()
+        with self._lock:
+            if prefer is not None and prefer.cooldown_until <= now:
+                return prefer
+            ready = [k for k in self.keys if k.cooldown_until <= now and k is not exclude]
+            if ready:
+                return min(ready, key=lambda k: (k.inflight, k.requests))
+            # every key is cooling down: fail here instead of spending more of the exchange's budget
+            wait = min(k.cooldown_until for k in self.keys) - now
+        raise RuntimeError(f"all WEEX keys cooling down, next ready in {max(0.0, wait):.1f}s")
+
+    def _call(self, k: _Key, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            k.inflight += 1
+            k.requests += 1
+        t0 = time.perf_counter()
+        try:
+            out = fn(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                k.inflight -= 1
+                k.errors += 1
+                k.last_error = str(e)[:300]
+                k.last_error_ts = time.time()
+                throttled = _throttled(e)
+                if throttled:
+                    k.throttled += 1
+                # a 4xx like "order not found" is about the request, not the key's health
+                if throttled or not (isinstance(e, WeexHTTPError) and 400 <= e.status_code < 500):
+                    k.streak += 1
+                if throttled or k.streak >= self.error_threshold:
+                    backoff = min(self.max_cooldown_s, self.cooldown_s * 2 ** min(k.streak - 1, 10))
+                    k.cooldown_until = time.monotonic() + backoff
+            raise
+        with self._lock:
+            k.inflight -= 1
+            k.streak = 0
+            k.cooldown_until = 0.0
+            k.latency.add(time.perf_counter() - t0)
+        return out
+
+    def _any(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        # calls any key can serve; a throttled key gets one retry on another
+        k = self._pick()
+        try:
+            return self._call(k, getattr(k.client, name), *args, **kwargs)
+        except Exception as e:
+            if len(self.keys) < 2 or not _throttled(e):
+                raise
+        k2 = self._pick(exclude=k)
+        return self._call(k2, getattr(k2.client, name), *args, **kwargs)
+
+    def _remember(self, k: _Key, *ids: Any):
+        with self._lock:
+            for x in ids:
+                if x:
+                    self._owner[str(x)] = k.idx
+                    self._owner.move_to_end(str(x))
+            while len(self._owner) > self.max_orders:
+                self._owner.popitem(last=False)
+
+    def owner(self, order_id: Any) -> Optional[_Key]:
+        with self._lock:
+            i = self._owner.get(str(order_id))
+        return self.keys[i] if i is not None else None
+
+    def _on_owner(self, order_id: Any, name: str, *args: Any, **kwargs: Any) -> Any:
+        # orders placed before a restart have no remembered key: ask each account in turn
+        k = self.owner(order_id)
+        if k is not None:
+            return self._call(k, getattr(k.client, name), *args, **kwargs)
+        err: Optional[Exception] = None
+        for k in self.keys:
+            try:
+                out = self._call(k, getattr(k.client, name), *args, **kwargs)
+            except Exception as e:
+                err = e
+                continue
+            self._remember(k, order_id)
+            return out
+        raise err  # type: ignore[misc]
+
+    def client_for(self, symbol: str) -> WeexClient:
+        return self.home(symbol).client
+
+    # --- WeexClient interface ---
+
+    def request(self, method: str, path: str, *, params: Optional[Dict[str, Any]] = None,
+                json_body: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> Dict[str, Any]:
+        oid = (params or {}).get("orderId") or (json_body or {}).get("orderId")
+        if oid and path.startswith("/capi/v2/order/"):
+            return self._on_owner(oid, "request", method, path, params=params, json_body=json_body, timeout=timeout)
+        sym = (json_body or {}).get("symbol") or (params or {}).get("symbol")
+        if sym and path.startswith("/capi/v2/order/"):
+            k = self.home(sym)
+            return self._call(k, k.client.request, method, path, params=params, json_body=json_body, timeout=timeout)
+        return self._any("request", method, path, params=params, json_body=json_body, timeout=timeout)
+
+    def request_raw(self, method: str, path: str, *, params: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> bytes:
+        return self._any("request_raw", method, path, params=params, timeout=timeout)
+
+    def get_depth(self, symbol: str, limit: int = 15) -> Dict[str, Any]:
+        return self._any("get_depth", symbol, limit)
+
+    def get_depth_raw(self, symbol: str, limit: int = 15) -> bytes:
+        return self._any("get_depth_raw", symbol, limit)
+
+    def upload_ai_log(self, *, order_id: Optional[int] = None, **kwargs: Any) -> Dict[str, Any]:
+        k = self.owner(order_id) if order_id is not None else None
+        if k is not None:
+            return self._call(k, k.client.upload_ai_log, order_id=order_id, **kwargs)
+        return self._any("upload_ai_log", order_id=order_id, **kwargs)
+
+    def place_order(self, *, symbol: str, client_oid: str, **kwargs: Any) -> Dict[str, Any]:
+        k = self._pick(prefer=self.home(symbol))
+        resp = self._call(k, k.client.place_order, symbol=symbol, client_oid=client_oid, **kwargs)
+        data = resp.get("data", resp) if isinstance(resp, dict) else {}
+        if isinstance(data, dict):
+            self._remember(k, data.get("order_id") or data.get("orderId"), client_oid)
+        return resp
+
+    def place_orders(self, *, symbol: str, orders: List[Dict[str, Any]], timeout: float = 10.0) -> List[Dict[str, Any]]:
+        k = self._pick(prefer=self.home(symbol))
+        results = self._call(k, k.client.place_orders, symbol=symbol, orders=orders, timeout=timeout)
+        self._remember(k, *(x for r in results if r["ok"] for x in (r["order_id"], r["client_oid"])))
+        return results
+
+    def cancel_order(self, *, order_id: str | None = None, client_oid: str | None = None) -> Dict[str, Any]:
+        return self._on_owner(order_id if order_id is not None else client_oid, "cancel_order", order_id=order_id, client_oid=client_oid)
+
+    def cancel_orders(self, *, order_ids: List[str] | None = None, client_oids: List[str] | None = None,
+                      timeout: float = 10.0) -> List[Dict[str, Any]]:
+        by_oid = order_ids is not None
+        ids = [str(x) for x in (order_ids if by_oid else client_oids or [])]
+        groups: Dict[int, List[str]] = {}
+        unknown: List[str] = []
+        for x in ids:
+            k = self.owner(x)
+            if k is None:
+                unknown.append(x)
+            else:
+                groups.setdefault(k.idx, []).append(x)
+        res: Dict[str, Dict[str, Any]] = {}
+        for idx, chunk in groups.items():
+            k = self.keys[idx]
+            for r in self._call(k, k.client.cancel_orders, **{"order_ids" if by_oid else "client_oids": chunk}, timeout=timeout):
+                res[r["id"]] = r
+        # ids with no remembered key are offered to every account; any success counts
+        for k in self.keys:
+            if not unknown:
+                break
+            try:
+                out = self._call(k, k.client.cancel_orders, **{"order_ids" if by_oid else "client_oids": unknown}, timeout=timeout)
+            except Exception as e:
+                out = [{"id": x, "ok": False, "error": str(e)} for x in unknown]
+            for r in out:
+                res[r["id"]] = r
+            unknown = [r["id"] for r in out if not r["ok"]]
+        return [res[x] for x in ids]
+
+    def cancel_all_orders(self, symbol: str | None = None, *, cancel_order_type: str = "normal", timeout: float = 5.0) -> Dict[str, Any]:
+        # a symbol may have orders on several accounts after a failover, so every key is asked
+        out: Dict[str, Any] = {}
+        failed: List[str] = []
+        for k in self.keys:
+            try:
+                out[k.label] = self._call(k, k.client.cancel_all_orders, symbol, cancel_order_type=cancel_order_type, timeout=timeout)
+            except Exception as e:
+                out[k.label] = f"failed: {e}"
+                failed.append(f"{k.label}: {e}")
+        if failed:
+            raise RuntimeError("cancel_all failed on " + "; ".join(failed))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        homes: Dict[int, List[str]] = {}
+        for s, i in self.symbol_keys.items():
+            homes.setdefault(i, []).append(s)
+        with self._lock:
+            return {
+                "keys": [{
+                    "key": k.label,
+                    "inflight": k.inflight,
+                    "requests": k.requests,
+                    "errors": k.errors,
+                    "throttled": k.throttled,
+                    "cooling_down_s": round(max(0.0, k.cooldown_until - now), 3),
+                    "last_error": k.last_error,
+                    "last_error_ts": k.last_error_ts,
+                    "avg_latency_ms": None if k.latency.mean() is None else round(k.latency.mean() * 1000, 3),
+                    "pinned_symbols": homes.get(k.idx, []),
+                } for k in self.keys],
+                "orders_tracked": len(self._owner),
+            }
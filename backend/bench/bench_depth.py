@@ -0,0 +1,55 @@
+# Depth parsing benchmark: json.loads + float() per level (the previous path
+# in real_market_snapshot) vs. app.depth.depth_summary, which scans only the
+# top levels out of the raw bytes, vs. the full-decode fallback.
+# Run from backend/:  python -m bench.bench_depth
+from __future__ import annotations
+import json, random, timeit
+
+from app import depth
+from app.depth import decoder_name, depth_summary, liquidity_score
+
+def make_payload(levels: int, wrapped: bool = False) -> bytes:
+    rnd = random.Random(7)
+    mid = 68000.0
+    asks = [[f"{mid + 0.5 + i * 0.1:.1f}", f"{rnd.uniform(0.001, 5):.4f}"] for i in range(levels)]
+    bids = [[f"{mid - 0.5 - i * 0.1:.1f}", f"{rnd.uniform(0.001, 5):.4f}"] for i in range(levels)]
+    book = {"asks": asks, "bids": bids, "timestamp": "1716710918113"}
+    return json.dumps({"code": "00000", "data": book} if wrapped else book).encode()
+
+def old_path(raw: bytes, topn: int = 5):
+    d = json.loads(raw)
+    data = d.get("data", d)
+    asks = data.get("asks", [])
+    bids = data.get("bids", [])
+    best_ask = float(asks[0][0])
+    best_bid = float(bids[0][0])
+    ask_qty = sum(float(x[1]) for x in asks[:topn])
+    bid_qty = sum(float(x[1]) for x in bids[:topn])
+    return (best_ask + best_bid) / 2.0, max(0.0, best_ask - best_bid), liquidity_score(ask_qty, bid_qty)
+
+def new_path(raw: bytes, topn: int = 5):
+    top = depth_summary(raw, topn)
+    return top["mid"], top["spread"], liquidity_score(top["ask_qty"], top["bid_qty"])
+
+def fallback_path(raw: bytes, topn: int = 5):
+    top = depth._summary(*depth._json_sides(raw, topn))
+    return top["mid"], top["spread"], liquidity_score(top["ask_qty"], top["bid_qty"])
+
+def bench(fn, raw: bytes, number: int = 20000) -> float:
+    best = min(timeit.repeat(lambda: fn(raw), number=number, repeat=5))
+    return best / number * 1e6
+
+def main():
+    print(f"full decoder: {decoder_name()}")
+    for levels in (15, 200):
+        for wrapped in (False, True):
+            raw = make_payload(levels, wrapped)
+            assert old_path(raw) == new_path(raw) == fallback_path(raw)
+            old = bench(old_path, raw)
+            new = bench(new_path, raw)
+            full = bench(fallback_path, raw)
+            label = f"{levels} levels{' (data-wrapped)' if wrapped else ''}"
+            print(f"{label:28s} {len(raw):6d} B   old {old:7.2f} us   scan {new:7.2f} us (x{old / new:3.1f})   full-decode fallback {full:7.2f} us (x{old / full:3.1f})")
+
+if __name__ == "__main__":
+    main()
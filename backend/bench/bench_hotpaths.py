@@ -0,0 +1,244 @@
+# Microbenchmarks for code that runs every tick. Inputs are seeded, timing
+# uses timeit (gc off) and reports the median of several repeats, and every
+# run can be saved as JSON and compared with an earlier one.
+# Run from backend/:
+#   python -m bench.bench_hotpaths [--only depth,sign] [--quick]
+#   python -m bench.bench_hotpaths --json out/HEAD.json
+#   python -m bench.bench_hotpaths --compare out/base.json
+# Network benchmarks talk to tools.weex_standin on a loopback port.
+from __future__ import annotations
+import argparse, json, os, platform, random, statistics, subprocess, sys, tempfile, threading, time, timeit
+from typing import Any, Callable, Dict, List, Optional
+
+from app.depth import depth_summary, liquidity_score
+from app.events import DecisionEvent, ErrorEvent, FillEvent, OrderEvent, events_json
+from app.execution.policy import choose_execution
+from app.execution.risk import RiskGate, RiskLimits
+from app.execution.types import MarketSnapshot
+from app.state import StateStore
+from app.weex_client import WeexClient, WeexCredentials
+from tools.weex_standin import Book, StandIn
+
+BENCHES: Dict[str, Callable[["Ctx"], Dict[str, float]]] = {}
+
+def bench(name: str):
+    def deco(fn):
+        BENCHES[name] = fn
+        return fn
+    return deco
+
+class Ctx:
+    def __init__(self, quick: bool):
+        self.quick = quick
+        self.repeat = 3 if quick else 7
+        self._standin: Optional[StandIn] = None
+
+    def n(self, full: int) -> int:
+        return max(1, full // 10) if self.quick else full
+
+    def standin(self) -> StandIn:
+        if self._standin is None:
+            self._standin = StandIn().start()
+        return self._standin
+
+    def close(self):
+        if self._standin is not None:
+            self._standin.stop()
+
+def per_op_us(ctx: Ctx, fn: Callable[[], Any], number: int) -> Dict[str, float]:
+    fn()  # warm up
+    runs = timeit.repeat(fn, number=number, repeat=ctx.repeat)
+    per = [r / number * 1e6 for r in runs]
+    return {"us_per_op": statistics.median(per), "us_per_op_min": min(per)}
+
+def _creds() -> WeexCredentials:
+    return WeexCredentials(api_key="bench-key", secret_key="bench-secret-" + "x" * 20, passphrase="bench-pass")
+
+def _events(n: int) -> List[Any]:
+    rnd = random.Random(3)
+    out: List[Any] = []
+    for i in range(n):
+        k = i % 4
+        if k == 0:
+            out.append(DecisionEvent(symbol="cmt_btcusdt", side="buy", style="post_only_limit", price=60000.5, size=0.5,
+                                     reason="Tight spread + calm: post-only to capture maker",
+                                     snapshot={"mid": 60000.0 + rnd.random(), "spread": 1.0, "liq": 0.4, "source": "weex"}))
+        elif k == 1:
+            out.append(OrderEvent(orderId=1000 + i, symbol="cmt_btcusdt", status="placed", client_oid=f"os_x_{i}", note="LIVE order sent to WEEX"))
+        elif k == 2:
+            out.append(FillEvent(order_id=str(1000 + i), client_oid=f"os_x_{i}", symbol="cmt_btcusdt", status="filled",
+                                 side="open_long", filled_qty="0.5", avg_price="60000.4", fee="0.006"))
+        else:
+            out.append(ErrorEvent(symbol="cmt_btcusdt", msg="fill_poll_failed: timeout"))
+    return out
+
+@bench("sign_headers")
+def b_sign(ctx: Ctx) -> Dict[str, float]:
+    c = WeexClient(_creds(), "http://127.0.0.1:1")
+    body = json.dumps({"symbol": "cmt_btcusdt", "client": "os_abc", "size": "0.001", "type": "1", "order_type": "1", "match_price": "0", "price": "60000.0"})
+    return per_op_us(ctx, lambda: c._headers("POST", "/capi/v2/order/placeOrder", "", body), ctx.n(20000))
+
+@bench("depth_summary")
+def b_depth(ctx: Ctx) -> Dict[str, float]:
+    # the parsing half of real_market_snapshot on a 15-level book
+    raw = json.dumps(Book().depth(15)).encode()
+    def run():
+        top = depth_summary(raw, 5)
+        liquidity_score(top["ask_qty"], top["bid_qty"])
+    return per_op_us(ctx, run, ctx.n(20000))
+
+@bench("choose_execution")
+def b_policy(ctx: Ctx) -> Dict[str, float]:
+    rnd = random.Random(5)
+    snaps = [MarketSnapshot(mid=60000 + rnd.uniform(-50, 50), spread=rnd.uniform(1, 40), vol_1m=rnd.uniform(0.0005, 0.004),
+                            liquidity_score=rnd.uniform(0.1, 0.9)) for _ in range(256)]
+    it = iter(range(1 << 62))
+    return per_op_us(ctx, lambda: choose_execution(snaps[next(it) & 255], "buy", 0.5), ctx.n(50000))
+
+@bench("risk_check")
+def b_risk(ctx: Ctx) -> Dict[str, float]:
+    # full pass through every check; rate limit off so nothing is rejected
+    gate = RiskGate(RiskLimits(max_orders_per_s=0))
+    return per_op_us(ctx, lambda: gate.check("cmt_btcusdt", "buy", 0.001, 60010.0, 60000.0, position=0.01), ctx.n(50000))
+
+@bench("add_event_contention")
+def b_add_event(ctx: Ctx) -> Dict[str, float]:
+    # total add_event throughput with 1, 4 and 8 writer threads on one store
+    evts = _events(64)
+    per_thread = ctx.n(20000)
+    out: Dict[str, float] = {}
+    for threads in (1, 4, 8):
+        samples = []
+        for _ in range(ctx.repeat):
+            store = StateStore()
+            barrier = threading.Barrier(threads + 1)
+            def worker():
+                barrier.wait()
+                add = store.add_event
+                for i in range(per_thread):
+                    add(evts[i & 63])
+            ts = [threading.Thread(target=worker) for _ in range(threads)]
+            for t in ts:
+                t.start()
+            barrier.wait()
+            t0 = time.perf_counter()
+            for t in ts:
+                t.join()
+            samples.append(threads * per_thread / (time.perf_counter() - t0))
+        out[f"ops_per_s_{threads}t"] = statistics.median(samples)
+    return out
+
+@bench("events_serialize")
+def b_serialize(ctx: Ctx) -> Dict[str, float]:
+    # Handler._send body for /api/events: cached record JSON vs. re-encoding dicts
+    evts = _events(200)
+    events_json(evts)
+    joined = per_op_us(ctx, lambda: events_json(evts), ctx.n(2000))
+    dumped = per_op_us(ctx, lambda: json.dumps([e.to_dict() for e in evts]).encode("utf-8"), ctx.n(2000))
+    return {"us_per_op": joined["us_per_op"], "us_per_op_dicts": dumped["us_per_op"]}
+
+@bench("depth_http")
+def b_depth_http(ctx: Ctx) -> Dict[str, float]:
+    # full real_market_snapshot shape (signed GET + parse) against the stand-in
+    c = WeexClient(_creds(), ctx.standin().url)
+    def run():
+        top = depth_summary(c.get_depth_raw("cmt_btcusdt", limit=15), 5)
+        liquidity_score(top["ask_qty"], top["bid_qty"])
+    return per_op_us(ctx, run, ctx.n(500))
+
+@bench("ailog_queue")
+def b_ailog(ctx: Ctx) -> Dict[str, float]:
+    from app.ai_log_queue import AiLogQueue
+    import sqlite3
+
+    n = ctx.n(1000)
+    payload = {"stage": "Decision Making", "model": "ordersense-v1", "input": {"symbol": "cmt_btcusdt", "side": "buy"},
+               "output": {"execution": {"style": "post_only_limit", "price": 60000.0}}, "explanation": "bench", "orderId": None}
+    with tempfile.TemporaryDirectory() as d:
+        db = os.path.join(d, "ai_logs.sqlite")
+        q = AiLogQueue(WeexClient(_creds(), ctx.standin().url), db_path=db, flush_interval_s=0.05)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            q.enqueue(payload)
+        t_enq = time.perf_counter() - t0
+        conn = sqlite3.connect(db)
+        try:
+            while conn.execute("SELECT COUNT(*) FROM ai_log_events").fetchone()[0]:
+                if time.perf_counter() - t0 > 120:
+                    raise RuntimeError("AiLogQueue did not drain within 120 s")
+                time.sleep(0.01)
+        finally:
+            conn.close()
+        t_drain = time.perf_counter() - t0
+        q.stop()
+    return {"enqueue_per_s": n / t_enq, "drain_per_s": n / t_drain}
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def run(names: List[str], quick: bool) -> Dict[str, Any]:
+    ctx = Ctx(quick)
+    results: Dict[str, Any] = {}
+    try:
+        for name in names:
+            try:
+                results[name] = BENCHES[name](ctx)
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        ctx.close()
+    return {
+        "rev": _git_rev(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "quick": quick,
+        "created_at": time.time(),
+        "results": results,
+    }
+
+def _higher_is_better(metric: str) -> bool:
+    return "per_s" in metric
+
+def print_report(doc: Dict[str, Any], base: Optional[Dict[str, Any]] = None):
+    print(f"rev {doc['rev']}  python {doc['python']}" + (f"  vs rev {base.get('rev')}" if base else ""))
+    for name, metrics in doc["results"].items():
+        if "error" in metrics:
+            print(f"{name:<22} skipped: {metrics['error']}")
+            continue
+        for metric, v in metrics.items():
+            line = f"{name:<22} {metric:<20} {v:>14,.2f}"
+            old = (base or {}).get("results", {}).get(name, {}).get(metric)
+            if isinstance(old, (int, float)) and old:
+                change = (v - old) / old * 100
+                better = change > 0 if _higher_is_better(metric) else change < 0
+                line += f"   {old:>14,.2f}  {change:+6.1f}% {'better' if better else 'worse'}"
+            print(line)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", help="comma separated subset of: " + ",".join(BENCHES))
+    ap.add_argument("--quick", action="store_true", help="fewer iterations, for smoke runs")
+    ap.add_argument("--json", metavar="PATH", help="also write results to PATH")
+    ap.add_argument("--compare", metavar="PATH", help="compare against an earlier --json file")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHES)
+    unknown = [n for n in names if n not in BENCHES]
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(unknown)}")
+    doc = run(names, args.quick)
+    base = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            base = json.load(f)
+    print_report(doc, base)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
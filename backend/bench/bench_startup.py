@@ -0,0 +1,110 @@
+# Cold-start benchmark: how long importing each entry point takes, which heavy
+# modules the import pulls in, and how long a fresh process needs before it
+# answers GET /health. Every sample is a new interpreter.
+# Run from backend/:  python -m bench.bench_startup [--runs 5]
+from __future__ import annotations
+import argparse, json, os, socket, statistics, subprocess, sys, tempfile, time
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT = os.path.dirname(BACKEND)
+
+# name, cwd, module to import, script to serve (None: import only)
+ENTRIES = [
+    ("backend/server.py", BACKEND, "server", "server.py"),
+    ("server.py", ROOT, "server", "server.py"),
+    ("backend/app/main.py", BACKEND, "app.main", None),
+]
+HEAVY = ("requests", "urllib3", "pydantic", "fastapi", "sqlite3", "multiprocessing.shared_memory")
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {mod}
+dt = time.perf_counter() - t
+print(json.dumps({{"import_s": dt, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _env(tmp: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(p for p in (BACKEND, os.environ.get("PYTHONPATH")) if p),
+        "DRY_RUN": "1",
+        "HISTORY_DB": os.path.join(tmp, "history.sqlite"),
+        "LEDGER_PATH": os.path.join(tmp, "ledger.json"),
+    })
+    return env
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def time_import(cwd: str, mod: str, env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(mod=mod, heavy=HEAVY)],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=60,
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "import failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def time_first_health(cwd: str, script: str, env: dict, timeout_s: float = 30.0) -> float:
+    port = _free_port()
+    env = dict(env, PORT=str(port))
+    url = f"http://127.0.0.1:{port}/health"
+    t0 = time.perf_counter()
+    p = subprocess.Popen([sys.executable, script], cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout_s:
+            if p.poll() is not None:
+                raise RuntimeError(f"{script} exited with {p.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"no /health response within {timeout_s}s")
+    finally:
+        p.terminate()
+        p.wait(timeout=5)
+
+def _ms(xs) -> str:
+    return f"{statistics.median(xs) * 1000:8.1f} ms" if xs else "     n/a"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        for name, cwd, mod, script in ENTRIES:
+            r = {"entry": name, "import_s": [], "health_s": [], "loaded": [], "error": None}
+            try:
+                for _ in range(args.runs):
+                    probe = time_import(cwd, mod, env)
+                    r["import_s"].append(probe["import_s"])
+                    r["loaded"] = probe["loaded"]
+                    if script:
+                        r["health_s"].append(time_first_health(cwd, script, env))
+            except Exception as e:
+                r["error"] = str(e)
+            results.append(r)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"python {sys.version.split()[0]}, median of {args.runs} cold processes")
+    print(f"{'entry':<22}{'import':>12}{'first /health':>16}  heavy modules loaded at import")
+    for r in results:
+        if r["error"]:
+            print(f"{r['entry']:<22}  skipped: {r['error']}")
+            continue
+        print(f"{r['entry']:<22}{_ms(r['import_s']):>12}{_ms(r['health_s']):>16}  {', '.join(r['loaded']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -2,51 +2,150 @@ import json
 import os
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Union
 from urllib.parse import parse_qs, urlparse
 
 from dotenv import load_dotenv
 
 from app.weex_client import WeexClient
-from app.order_status import poll_until_filled, to_fill_event
+from app.weex_pool import WeexClientPool, credentials_from_env, parse_symbol_keys
+from app.order_status import is_terminal, poll_until_filled, to_fill_event
+from app.market_data import MarketDataCache
+from app.state import SymbolState
+from app.order_pipeline import ClientOidGenerator, OpenOrders, OrderPipeline
+from app.exec_metrics import ExecutionMetrics, RollingWindow
+from app.ledger import PositionLedger
+from app.history import HistoryStore
+from app.checkpoint import Checkpointer
+from app.rollups import Rollups
+from app import profiler
+from app.depth import depth_summary, liquidity_score, parse_depth_top
+from app.book_stream import BookFeed, stream as book_stream
+from app.events import DecisionEvent, ErrorEvent, Event, OrderEvent, SystemEvent, as_event, events_json
+from app.execution.risk import RiskGate, RiskLimits
 
 load_dotenv(".env")
 
 
 @dataclass
 class StateStore:
-    events: List[Dict[str, Any]] = field(default_factory=list)
-    last_fill: Dict[str, Any] = field(default_factory=dict)
+    events: Deque[Event] = field(default_factory=lambda: deque(maxlen=500))
+    last_fill: Optional[Event] = None
+    symbols: Dict[str, SymbolState] = field(default_factory=dict)
     lock: threading.Lock = field(default_factory=threading.Lock)
+    history: Optional[HistoryStore] = None
 
-    def add_event(self, e: Dict[str, Any]) -> None:
+    def add_event(self, e: Event | Dict[str, Any]) -> None:
+        e = as_event(e)
         with self.lock:
-            self.events.insert(0, e)
-            self.events = self.events[:500]
+            self.events.appendleft(e)
+        if self.history is not None:
+            self.history.append(e)
 
-    def get_events(self) -> List[Dict[str, Any]]:
+    def get_events(self) -> List[Event]:
         with self.lock:
             return list(self.events)
 
-    def set_last_fill(self, e: Dict[str, Any]) -> None:
+    def set_last_fill(self, e: Event) -> None:
         with self.lock:
-            self.last_fill = dict(e)
+            self.last_fill = e
 
     def get_last_fill(self) -> Dict[str, Any]:
         with self.lock:
-            return dict(self.last_fill)
+            e = self.last_fill
+        return e.to_dict() if e is not None else {}
 
+    def _symbol(self, symbol: str) -> SymbolState:
+        ss = self.symbols.get(symbol)
+        if ss is None:
+            ss = self.symbols[symbol] = SymbolState(symbol=symbol)
+        return ss
 
+    def update_symbol(self, symbol: str, **fields: Any) -> None:
+        with self.lock:
+            ss = self._symbol(symbol)
+            for k, v in fields.items():
+                setattr(ss, k, v)
+            ss.updated_at = time.time()
+
+    def bump(self, symbol: str, key: str, n: int = 1) -> None:
+        with self.lock:
+            m = self._symbol(symbol).metrics
+            m[key] = m.get(key, 0) + n
+
+    def get_symbol(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            ss = self.symbols.get(symbol)
+            return ss.to_dict() if ss else None
+
+    def get_symbols(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {sym: ss.to_dict() for sym, ss in self.symbols.items()}
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        with self.lock:
+            events = list(self.events)
+            last_fill = self.last_fill
+            symbols = {sym: ss.to_dict() for sym, ss in self.symbols.items()}
+        return {
+            "events": [e.to_dict() for e in events],
+            "last_fill": last_fill.to_dict() if last_fill is not None else None,
+            "symbols": symbols,
+        }
+
+    def load_checkpoint(self, st: Dict[str, Any]) -> None:
+        events = [as_event(d) for d in st.get("events") or []]
+        with self.lock:
+            self.events.clear()
+            self.events.extend(events)
+            if st.get("last_fill"):
+                self.last_fill = as_event(st["last_fill"])
+            for sym, d in (st.get("symbols") or {}).items():
+                self._symbol(sym).load(d)
+
+
+_STARTED_AT = time.time()
 store = StateStore()
 
 WEEX_BASE_URL = os.getenv("WEEX_BASE_URL", "https://api-contract.weex.com")
 SYMBOL = os.getenv("SYMBOL", "cmt_btcusdt")
+SYMBOLS = [s.strip() for s in os.getenv("SYMBOLS", SYMBOL).split(",") if s.strip()] or [SYMBOL]
+WORKERS = int(os.getenv("WORKERS", "4"))
+LOOP_INTERVAL_S = float(os.getenv("LOOP_INTERVAL_S", "3"))
+# read depth snapshots from a feed process (python -m app.snapshot_bus) instead of polling WEEX
+SNAPSHOT_BUS = os.getenv("SNAPSHOT_BUS", "").strip()
+SNAPSHOT_MAX_AGE_S = float(os.getenv("SNAPSHOT_MAX_AGE_S", "5"))
+MAX_INFLIGHT_PER_SYMBOL = int(os.getenv("MAX_INFLIGHT_PER_SYMBOL", "2"))
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "200"))
+LEDGER_PATH = os.getenv("LEDGER_PATH", "ledger.json")
+HISTORY_DB = os.getenv("HISTORY_DB", "history.sqlite")
+HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "30"))
+HISTORY_PRUNE_EVERY_S = float(os.getenv("HISTORY_PRUNE_EVERY_S", "3600"))
+# warm-restart snapshot of events, metrics, open orders and market context; empty disables
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "checkpoint.json").strip()
+CHECKPOINT_INTERVAL_S = float(os.getenv("CHECKPOINT_INTERVAL_S", "5"))
+# extra accounts come from WEEX_API_KEY_2 / _3 ...; WEEX_SYMBOL_KEYS=cmt_btcusdt=0,cmt_ethusdt=1 pins symbols to keys
+WEEX_SYMBOL_KEYS = parse_symbol_keys(os.getenv("WEEX_SYMBOL_KEYS", ""))
 DRY_RUN = os.getenv("DRY_RUN", "1").strip() in ("1", "true", "True", "yes", "YES")
 ORDER_SIZE = os.getenv("ORDER_SIZE", "0.0001").strip()  # contracts size for WEEX contract
 DEPTH_LIMIT = int(os.getenv("DEPTH_LIMIT", "15"))
+DEPTH_TOPN = 5  # levels per side that feed the liquidity score
+# live ladder for the dashboard: levels per side kept and streamed, concurrent stream clients
+BOOK_LEVELS = min(DEPTH_LIMIT, int(os.getenv("BOOK_LEVELS", "10")))
+BOOK_MAX_CLIENTS = int(os.getenv("BOOK_MAX_CLIENTS", "16"))
+RECONCILE_EVERY_S = float(os.getenv("RECONCILE_EVERY_S", "60"))
+RECONCILE_MAX_AGE_S = float(os.getenv("RECONCILE_MAX_AGE_S", "86400"))
+# pre-trade limits checked before every order, dry run included; 0 disables one
+RISK_MAX_NOTIONAL = float(os.getenv("RISK_MAX_NOTIONAL", "2000"))
+RISK_MAX_POSITION = float(os.getenv("RISK_MAX_POSITION", "0.05"))
+RISK_MAX_ORDERS_PER_S = float(os.getenv("RISK_MAX_ORDERS_PER_S", "5"))
+RISK_BURST = float(os.getenv("RISK_BURST", "10"))
+RISK_PRICE_BAND_BPS = float(os.getenv("RISK_PRICE_BAND_BPS", "100"))
 
 # creds object must have attributes
 class Creds:
@@ -61,10 +160,38 @@ creds = Creds(
     os.getenv("WEEX_PASSPHRASE", ""),
 )
 
-weex = WeexClient(creds, WEEX_BASE_URL)
+# the HTTP session is created on first use, see get_weex()
+_weex: Optional[Union[WeexClient, WeexClientPool]] = None
+_weex_lock = threading.Lock()
 
 _running = False
 _thread: Optional[threading.Thread] = None
+_busy: Dict[str, Future] = {}
+_bus: Optional["SnapshotBus"] = None
+_bus_lock = threading.Lock()
+# wall time of one loop tick (depth refresh + dispatch), excluding the sleep
+loop_ms = RollingWindow(200)
+loop_ticks = 0
+_reconciling = False
+_last_reconcile = 0.0
+
+store.history = HistoryStore(HISTORY_DB, retention_s=HISTORY_RETENTION_DAYS * 86400 or None, prune_every_s=HISTORY_PRUNE_EVERY_S)
+
+for _sym in SYMBOLS:
+    store.update_symbol(_sym)
+
+
+def get_weex() -> Union[WeexClient, WeexClientPool]:
+    global _weex
+    if _weex is None:
+        with _weex_lock:
+            if _weex is None:
+                accounts = credentials_from_env()
+                if len(accounts) > 1:
+                    _weex = WeexClientPool(accounts, WEEX_BASE_URL, symbols=SYMBOLS, symbol_keys=WEEX_SYMBOL_KEYS)
+                else:
+                    _weex = WeexClient(creds, WEEX_BASE_URL)
+    return _weex
 
 
 def _read_frontend_file(name: str) -> bytes:
@@ -76,116 +203,279 @@ def _read_frontend_file(name: str) -> bytes:
 
 
 def real_market_snapshot(symbol: str) -> Dict[str, Any]:
-    d = weex.request("GET", "/capi/v2/market/depth", params={"symbol": symbol, "limit": DEPTH_LIMIT})
-    data = d.get("data", d)
-    asks = data.get("asks", [])
-    bids = data.get("bids", [])
-    if not asks or not bids:
-        raise RuntimeError(f"Depth empty for {symbol}: {d}")
-    best_ask = float(asks[0][0])
-    best_bid = float(bids[0][0])
-    mid = (best_ask + best_bid) / 2.0
-    spread = max(0.0, best_ask - best_bid)
-    topn = 5
-    ask_qty = sum(float(x[1]) for x in asks[:topn])
-    bid_qty = sum(float(x[1]) for x in bids[:topn])
-    liq = max(0.0, min(1.0, (ask_qty + bid_qty) / 100000.0))
-    return {"mid": mid, "spread": spread, "liq": liq, "source": "weex"}
+    raw = get_weex().get_depth_raw(symbol, limit=DEPTH_LIMIT)
+    try:
+        top = depth_summary(raw, DEPTH_TOPN)
+    except (RuntimeError, ValueError):
+        raise RuntimeError(f"Depth empty for {symbol}: {raw[:500]!r}")
+    liq = liquidity_score(top["ask_qty"], top["bid_qty"])
+    # same response, so the ladder costs no extra exchange traffic
+    book.update(symbol, parse_depth_top(raw, BOOK_LEVELS))
+    return {"mid": top["mid"], "spread": top["spread"], "liq": liq, "source": "weex"}
+
+
+def bus_market_snapshot(symbol: str) -> Dict[str, Any]:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                from app.snapshot_bus import SnapshotBus
+                _bus = SnapshotBus.attach(SNAPSHOT_BUS)
+    snap = _bus.latest(symbol, max_age_s=SNAPSHOT_MAX_AGE_S)
+    if snap is None:
+        raise RuntimeError(f"no fresh snapshot on bus {SNAPSHOT_BUS} for {symbol}")
+    return {"mid": snap.mid, "spread": snap.spread, "liq": snap.liquidity_score, "source": "bus"}
+
+
+def run_symbol(symbol: str, snap: Any) -> None:
+    if isinstance(snap, Exception):
+        store.add_event(ErrorEvent(symbol=symbol, msg=f"depth_failed: {snap}"))
+        store.update_symbol(symbol, last_error=f"depth_failed: {snap}")
+        store.bump(symbol, "errors")
+        snap = {"mid": 60000.0, "spread": 10.0, "liq": 0.5, "source": "fallback"}
+    else:
+        # volatility is tracked by the cache across ticks, not per depth call
+        snap = {**snap, "vol_1m": market.vol(symbol)}
+    store.update_symbol(symbol, last_snapshot=snap)
+    if snap.get("source") != "fallback":
+        ledger.mark(symbol, snap["mid"])
+
+    # toy decision
+    side = "buy" if int(time.time()) % 2 == 0 else "sell"
+    style = "aggressive_limit"
+    price = round(snap["mid"] + (0.05 if side == "buy" else -0.05), 3)
+
+    decision = DecisionEvent(
+        symbol=symbol,
+        side=side,
+        style=style,
+        price=price,
+        size=float(ORDER_SIZE),
+        reason="Live microstructure snapshot",
+        snapshot=snap,
+    )
+    store.add_event(decision)
+    store.update_symbol(symbol, last_decision=decision)
+    store.bump(symbol, "decisions")
+    live = snap.get("source") != "fallback"
+    rollups.on_decision(symbol, style, snap.get("spread") if live else None, snap["mid"], snap.get("liq") if live else None, ts=decision.ts)
+
+    # hand the order to the pipeline; the loop moves on to the next snapshot
+    client_oid = oids.next()
+    exec_metrics.on_decision(client_oid, symbol=symbol, side=side, style=style, mid=snap["mid"], size=float(ORDER_SIZE), ts=decision.ts)
+    if pipeline.try_submit(symbol, client_oid, submit_order, symbol, side, client_oid, snap["mid"]) is None:
+        exec_metrics.discard(client_oid)
+        store.bump(symbol, "skipped_inflight")
+
+
+def submit_order(symbol: str, side: str, client_oid: str, mid: float) -> None:
+    # market order (match_price=1): the gate values it at mid
+    reject = risk.check(symbol, side, float(ORDER_SIZE), None, mid, position=ledger.exposure(symbol, side), market=True)
+    if reject:
+        store.add_event(OrderEvent(symbol=symbol, side=side, size=float(ORDER_SIZE), status="rejected(risk)", client_oid=client_oid, note=reject))
+        store.bump(symbol, "risk_rejected")
+        exec_metrics.discard(client_oid)
+        return
+
+    if DRY_RUN or not (creds.api_key and creds.secret_key and creds.passphrase):
+        store.add_event(OrderEvent(
+            orderId=int(time.time() * 1000) % 10_000_000,
+            symbol=symbol,
+            status="placed(simulated)",
+            client_oid=client_oid,
+            note="DRY_RUN=1 or missing API keys",
+        ))
+        store.bump(symbol, "orders")
+        exec_metrics.discard(client_oid)
+        return
 
+    try:
+        type_ = "1" if side == "buy" else "2"   # open long / open short
+        resp = get_weex().place_order(
+            symbol=symbol,
+            client_oid=client_oid,
+            size=str(ORDER_SIZE),
+            type_=type_,
+            order_type="3",     # IOC
+            match_price="1",    # market
+            price="0",
+        )
+
+        order_id = None
+        if isinstance(resp, dict):
+            order_id = resp.get("order_id") or resp.get("orderId")
+        if not order_id:
+            store.add_event(ErrorEvent(symbol=symbol, msg=f"order_failed: unexpected response {resp}", client_oid=client_oid))
+            store.bump(symbol, "errors")
+            exec_metrics.on_reject(client_oid)
+            return
 
-def bot_loop() -> None:
-    global _running
-    store.add_event({"type": "system", "msg": "Bot started", "ts": time.time()})
+        open_orders.add(client_oid, order_id=order_id, symbol=symbol, side=side)
+        store.add_event(OrderEvent(
+            orderId=order_id,
+            symbol=symbol,
+            status="placed",
+            client_oid=client_oid,
+            note="LIVE order sent to WEEX",
+        ))
+        store.bump(symbol, "orders")
+
+    except Exception as e:
+        store.add_event(ErrorEvent(symbol=symbol, msg=f"order_failed: {e}", client_oid=client_oid))
+        store.bump(symbol, "errors")
+        exec_metrics.on_reject(client_oid)
+        return
+
+    track_fill(symbol, client_oid, str(order_id))
+
+
+def track_fill(symbol: str, client_oid: str, order_id: str, timeout_s: float = 20.0) -> bool:
+    # poll until the order is filled or otherwise final and book it; an order
+    # that is still live (or could not be read) stays in open_orders, and so
+    # in the checkpoint, for the next reconcile. Returns True once resolved.
+    try:
+        detail = poll_until_filled(get_weex(), order_id, timeout_s=timeout_s, interval_s=1.0)
+    except Exception as e:
+        store.add_event(ErrorEvent(symbol=symbol, msg=f"fill_poll_failed: {e}", client_oid=client_oid))
+        store.bump(symbol, "errors")
+        return False
+    if not is_terminal(detail):
+        status = detail.get("status") if detail else None
+        store.add_event(OrderEvent(orderId=order_id, symbol=symbol, status=f"open({status})", client_oid=client_oid, note="unresolved after fill poll"))
+        return False
+    fill_event = to_fill_event(detail)
+    fill_event.client_oid = fill_event.client_oid or client_oid
+    booked = exec_metrics.on_fill(fill_event)
+    if booked:
+        rollups.on_fill(symbol, booked["maker"], booked["slippage_bps"], ts=fill_event.ts)
+    if _qty(fill_event.filled_qty) > 0:
+        ledger.on_fill(fill_event, symbol)
+        store.set_last_fill(fill_event)
+        store.add_event(fill_event)
+        store.bump(symbol, "fills")
+    else:
+        store.add_event(OrderEvent(orderId=order_id, symbol=symbol, status=str(fill_event.status), client_oid=client_oid, note="resolved without a fill"))
+    open_orders.remove(client_oid)
+    return True
+
+
+def _qty(x: Any) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return 0.0
 
-    while _running:
-        symbol = SYMBOL
 
-        # snapshot
-        try:
-            snap = real_market_snapshot(symbol)
-        except Exception as e:
-            store.add_event({"type": "error", "msg": f"depth_failed: {e}", "ts": time.time()})
-            snap = {"mid": 60000.0, "spread": 10.0, "liq": 0.5, "source": "fallback"}
-
-        # toy decision
-        side = "buy" if int(time.time()) % 2 == 0 else "sell"
-        style = "aggressive_limit"
-        price = round(snap["mid"] + (0.05 if side == "buy" else -0.05), 3)
-
-        store.add_event({
-            "type": "decision",
-            "symbol": symbol,
-            "side": side,
-            "style": style,
-            "price": price,
-            "size": float(ORDER_SIZE),
-            "reason": "Live microstructure snapshot",
-            "snapshot": snap,
-            "ts": time.time()
-        })
-
-        # place order
-        client_oid = f"os_{int(time.time()*1000)}"
-        if DRY_RUN or not (creds.api_key and creds.secret_key and creds.passphrase):
-            store.add_event({
-                "type": "order",
-                "orderId": int(time.time() * 1000) % 10_000_000,
-                "status": "placed(simulated)",
-                "client_oid": client_oid,
-                "note": "DRY_RUN=1 or missing API keys",
-                "ts": time.time(),
-            })
-            time.sleep(3)
-            continue
+def reconcile_open_orders(min_age_s: float = 0.0) -> None:
+    # orders still live when the previous process stopped, or whose fill poll
+    # gave up: fetch their state from WEEX so fills that happened meanwhile are
+    # booked. Orders nobody could resolve for RECONCILE_MAX_AGE_S are dropped.
+    global _reconciling
+    now = time.time()
+    try:
+        pending = {k: o for k, o in open_orders.items().items() if now - float(o.get("ts") or 0) >= min_age_s}
+        if not pending or not (creds.api_key and creds.secret_key and creds.passphrase):
+            return
+        store.add_event(SystemEvent(msg=f"reconciling {len(pending)} open orders"))
+        for client_oid, o in pending.items():
+            try:
+                resolved = track_fill(o["symbol"], client_oid, o["order_id"], timeout_s=2.0)
+            except Exception as e:
+                # one bad order detail must not stop the rest of the pass
+                store.add_event(ErrorEvent(symbol=o.get("symbol"), msg=f"reconcile_failed: {e}", client_oid=client_oid))
+                store.bump(o.get("symbol"), "errors")
+                resolved = False
+            if not resolved and now - float(o.get("ts") or 0) > RECONCILE_MAX_AGE_S:
+                open_orders.remove(client_oid)
+                store.add_event(SystemEvent(msg=f"gave up on order {o['order_id']} ({o['symbol']}) after {RECONCILE_MAX_AGE_S:.0f}s unresolved"))
+    finally:
+        _reconciling = False
+
+
+def cancel_all_symbols() -> Dict[str, str]:
+    if DRY_RUN or not (creds.api_key and creds.secret_key and creds.passphrase):
+        return {}
+    # let orders already on the wire land first so the cancel covers them
+    pipeline.drain(timeout=2.0)
+    out: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(SYMBOLS)), thread_name_prefix="cancel") as pool:
+        futs = {sym: pool.submit(get_weex().cancel_all_orders, sym) for sym in SYMBOLS}
+        for sym, fut in futs.items():
+            try:
+                fut.result()
+                out[sym] = "ok"
+            except Exception as e:
+                out[sym] = f"failed: {e}"
+    store.add_event(SystemEvent(msg="cancel_all on stop", results=out))
+    return out
+
+
+oids = ClientOidGenerator()
+exec_metrics = ExecutionMetrics(window=METRICS_WINDOW)
+rollups = Rollups()
+book = BookFeed(levels=BOOK_LEVELS)
+ledger = PositionLedger(LEDGER_PATH)
+risk = RiskGate(RiskLimits(
+    max_notional=RISK_MAX_NOTIONAL,
+    max_position=RISK_MAX_POSITION,
+    max_orders_per_s=RISK_MAX_ORDERS_PER_S,
+    burst=RISK_BURST,
+    price_band_bps=RISK_PRICE_BAND_BPS,
+))
+open_orders = OpenOrders()
+pipeline = OrderPipeline(max_inflight_per_symbol=MAX_INFLIGHT_PER_SYMBOL, max_workers=max(4, len(SYMBOLS) * MAX_INFLIGHT_PER_SYMBOL))
+market = MarketDataCache(bus_market_snapshot if SNAPSHOT_BUS else real_market_snapshot, max_workers=max(1, len(SYMBOLS)))
+decision_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="decide")
+checkpointer: Optional[Checkpointer] = None
+if CHECKPOINT_PATH:
+    checkpointer = Checkpointer(CHECKPOINT_PATH, interval_s=CHECKPOINT_INTERVAL_S)
+    checkpointer.register("store", store.checkpoint_state, store.load_checkpoint)
+    checkpointer.register("exec_metrics", exec_metrics.state, exec_metrics.load_state)
+    checkpointer.register("open_orders", open_orders.state, open_orders.load_state)
+    checkpointer.register("market", market.state, market.load_state)
+    checkpointer.register("rollups", rollups.state, rollups.load_state)
+
+
+def _maybe_reconcile() -> None:
+    # orders left unresolved by their fill poll are re-checked in the background
+    global _reconciling, _last_reconcile
+    now = time.time()
+    if _reconciling or not len(open_orders) or now - _last_reconcile < RECONCILE_EVERY_S:
+        return
+    _reconciling, _last_reconcile = True, now
+    threading.Thread(target=reconcile_open_orders, args=(RECONCILE_EVERY_S,), daemon=True, name="reconcile").start()
 
-        try:
-            type_ = "1" if side == "buy" else "2"   # open long / open short
-            resp = weex.place_order(
-                symbol=symbol,
-                client_oid=client_oid,
-                size=str(ORDER_SIZE),
-                type_=type_,
-                order_type="3",     # IOC
-                match_price="1",    # market
-                price="0",
-            )
-
-            order_id = None
-            if isinstance(resp, dict):
-                order_id = resp.get("order_id") or resp.get("orderId")
-            if not order_id:
-                store.add_event({"type": "error", "msg": f"order_failed: unexpected response {resp}", "ts": time.time()})
-                time.sleep(3)
-                continue
 
-            store.add_event({
-                "type": "order",
-                "orderId": order_id,
-                "status": "placed",
-                "client_oid": client_oid,
-                "note": "LIVE order sent to WEEX",
-                "ts": time.time(),
-            })
+def bot_loop() -> None:
+    global _running, loop_ticks
+    store.add_event(SystemEvent(msg=f"Bot started ({len(SYMBOLS)} symbols)"))
 
-            # poll fill + store last fill
-            try:
-                detail = poll_until_filled(weex, str(order_id), timeout_s=20.0, interval_s=1.0)
-                if detail:
-                    fill_event = to_fill_event(detail)
-                    store.set_last_fill(fill_event)
-                    store.add_event(fill_event)
-            except Exception as e:
-                store.add_event({"type": "error", "msg": f"fill_poll_failed: {e}", "ts": time.time()})
+    while _running:
+        t0 = time.perf_counter()
+        # depth for every symbol in parallel, one request per symbol per tick
+        snaps = market.refresh(SYMBOLS)
+
+        for symbol, snap in snaps.items():
+            # a symbol whose previous decision is still running is skipped
+            prev = _busy.get(symbol)
+            if prev is not None and not prev.done():
+                continue
+            _busy[symbol] = decision_pool.submit(run_symbol, symbol, snap)
 
-        except Exception as e:
-            store.add_event({"type": "error", "msg": f"order_failed: {e}", "client_oid": client_oid, "ts": time.time()})
+        ledger.maybe_checkpoint()
+        _maybe_reconcile()
+        loop_ms.add((time.perf_counter() - t0) * 1000)
+        loop_ticks += 1
+        time.sleep(LOOP_INTERVAL_S)
 
-        time.sleep(3)
+    ledger.maybe_checkpoint(force=True)
 
 
 class Handler(BaseHTTPRequestHandler):
     def _send(self, code: int, obj: Any) -> None:
-        body = json.dumps(obj).encode("utf-8")
+        self._send_raw(code, json.dumps(obj).encode("utf-8"))
+
+    def _send_raw(self, code: int, body: bytes) -> None:
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -193,15 +483,70 @@ class Handler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def _profile(self, q: Dict[str, str]) -> None:
+        if not profiler.authorized(self.headers.get("X-Admin-Token")):
+            self._send(403, {"error": "forbidden"})
+            return
+        try:
+            counts, meta = profiler.sample(float(q.get("seconds", "5")), int(q.get("hz", "100")))
+        except ValueError as e:
+            self._send(400, {"error": f"bad query: {e}"})
+            return
+        except RuntimeError as e:
+            self._send(409, {"error": str(e)})
+            return
+        if q.get("format") == "speedscope":
+            self._send(200, profiler.speedscope(counts, meta))
+            return
+        body = profiler.collapsed(counts).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("X-Profile-Samples", str(meta["samples"]))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _book_stream(self, q: Dict[str, str], symbol: str) -> None:
+        if book.clients >= BOOK_MAX_CLIENTS:
+            self._send(503, {"error": "too many book streams"})
+            return
+        try:
+            hz = float(q.get("hz", "4"))
+        except ValueError:
+            self._send(400, {"error": "bad query: hz"})
+            return
+        fmt = "binary" if q.get("format") == "binary" else "json"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream" if fmt == "binary" else "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        def write(b: bytes) -> None:
+            self.wfile.write(b)
+            self.wfile.flush()
+
+        try:
+            book_stream(book, symbol, write, fmt=fmt, hz=hz)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
     def do_OPTIONS(self) -> None:
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, X-Admin-Token")
         self.end_headers()
 
     def do_GET(self) -> None:
-        path = urlparse(self.path).path
+        url = urlparse(self.path)
+        path = url.path
+        qs = parse_qs(url.query)
+        symbol = (qs.get("symbol") or [None])[0]
+
+        if path == "/health":
+            self._send(200, {"ok": True, "running": _running, "uptime_s": round(time.time() - _STARTED_AT, 3)})
+            return
 
         if path == "/":
             body = _read_frontend_file("index.html")
@@ -234,16 +579,143 @@ class Handler(BaseHTTPRequestHandler):
             return
 
         if path == "/api/status":
-            self._send(200, {"running": _running, "symbol": SYMBOL, "dry_run": DRY_RUN})
+            if symbol:
+                ss = store.get_symbol(symbol)
+                if ss is None:
+                    self._send(404, {"error": f"unknown symbol {symbol}"})
+                    return
+                self._send(200, {"running": _running, "dry_run": DRY_RUN, "inflight": pipeline.inflight(symbol), **ss})
+                return
+            self._send(200, {
+                "running": _running,
+                "symbol": SYMBOLS[0],
+                "symbols": SYMBOLS,
+                "dry_run": DRY_RUN,
+                "pipeline": pipeline.stats(),
+                "open_orders": len(open_orders),
+                "checkpoint": checkpointer.stats() if checkpointer is not None else None,
+                "weex_keys": _weex.stats() if isinstance(_weex, WeexClientPool) else None,
+                "book": book.stats(),
+                "history": store.history.stats(),
+                "loop": {"ticks": loop_ticks, "avg_tick_ms": loop_ms.mean()},
+            })
+            return
+
+        if path == "/api/symbols":
+            self._send(200, store.get_symbols())
             return
 
         if path == "/api/metrics":
-            # lightweight metrics placeholder
-            self._send(200, {"symbol": SYMBOL, "spread": None, "liq": None, "updated_at": time.time()})
+            sym = symbol or SYMBOLS[0]
+            ss = store.get_symbol(sym)
+            if ss is None:
+                self._send(404, {"error": f"unknown symbol {sym}"})
+                return
+            ex = exec_metrics.snapshot(sym)
+            # market fields come from the shared cache: no exchange call here
+            mv = market.view(sym) or {}
+            self._send(200, {
+                "symbol": sym,
+                "spread": mv.get("spread"),
+                "liq": mv.get("liq"),
+                "vol_1m": mv.get("vol_1m"),
+                "mid": mv.get("mid"),
+                "source": mv.get("source"),
+                "snapshot_age_s": mv.get("age_s"),
+                "snapshot_version": mv.get("version", 0),
+                "stale": mv.get("stale", True),
+                **ss["metrics"],
+                "maker_rate": ex["maker_rate"],
+                "avg_slippage_bps": ex["avg_slippage_bps"],
+                "execution": ex,
+                "risk": risk.stats(),
+                # exchange clock offset and timestamp rejections; None until the client exists
+                "clock": _weex.clock.stats() if _weex is not None else None,
+                "updated_at": time.time(),
+            })
+            return
+
+        if path == "/api/market":
+            if symbol:
+                mv = market.view(symbol)
+                if mv is None:
+                    self._send(404, {"error": f"no snapshot for {symbol}"})
+                    return
+                self._send(200, mv)
+                return
+            self._send(200, {"ttl_s": market.ttl_s, "symbols": market.views()})
             return
 
         if path == "/api/events":
-            self._send(200, store.get_events())
+            events = store.get_events()
+            if symbol:
+                events = [e for e in events if e.get("symbol") == symbol]
+            # records cache their JSON, so this is a join, not a re-encode
+            self._send_raw(200, events_json(events))
+            return
+
+        if path == "/api/rollups":
+            # ?res=1s|1m|1h&start=&end= (unix seconds, default: the last 60 buckets)&symbol=
+            q = {k: v[0] for k, v in qs.items()}
+            try:
+                self._send(200, rollups.query(
+                    res=q.get("res", "1m"),
+                    start=float(q["start"]) if q.get("start") else None,
+                    end=float(q["end"]) if q.get("end") else None,
+                    symbol=symbol,
+                ))
+            except ValueError as e:
+                self._send(400, {"error": f"bad query: {e}"})
+            return
+
+        if path == "/api/book":
+            # one frame: a snapshot, or the coalesced delta since ?since=<seq>
+            sym = symbol or SYMBOLS[0]
+            try:
+                since = int((qs.get("since") or ["0"])[0])
+            except ValueError:
+                self._send(400, {"error": "bad query: since"})
+                return
+            frame = book.next_frame(sym, since)
+            if frame is None:
+                seq = book.seq(sym)
+                if not seq:
+                    self._send(404, {"error": f"no book for {sym}"})
+                    return
+                frame = {"type": "delta", "symbol": sym, "seq": seq, "asks": [], "bids": []}
+            self._send(200, frame)
+            return
+
+        if path == "/api/book/stream":
+            # ?symbol=&format=json (SSE) | binary (see app.book_stream)&hz=4
+            self._book_stream({k: v[0] for k, v in qs.items()}, symbol or SYMBOLS[0])
+            return
+
+        if path == "/api/positions":
+            positions = ledger.positions()
+            if symbol:
+                positions = {k: v for k, v in positions.items() if k == symbol}
+            self._send(200, {"positions": positions, "totals": ledger.totals(), "updated_at": time.time()})
+            return
+
+        if path == "/api/history":
+            q = {k: v[0] for k, v in qs.items()}
+            try:
+                page = store.history.query(
+                    type_=q.get("type"),
+                    symbol=symbol,
+                    before=q.get("before"),
+                    after=q.get("after"),
+                    limit=int(q.get("limit", "100")),
+                )
+            except ValueError as e:
+                self._send(400, {"error": f"bad query: {e}"})
+                return
+            self._send(200, page)
+            return
+
+        if path == "/admin/profile":
+            self._profile({k: v[0] for k, v in qs.items()})
             return
 
         if path == "/api/last_fill":
@@ -267,7 +739,7 @@ class Handler(BaseHTTPRequestHandler):
 
         if path == "/api/stop":
             _running = False
-            self._send(200, {"running": False})
+            self._send(200, {"running": False, "cancelled": cancel_all_symbols()})
             return
 
         self.send_response(404)
@@ -276,9 +748,20 @@ class Handler(BaseHTTPRequestHandler):
 
 def main() -> None:
     port = int(os.getenv("PORT", "8000"))
-    httpd = HTTPServer(("0.0.0.0", port), Handler)
+    if checkpointer is not None:
+        restored = checkpointer.restore()
+        if restored:
+            print(f"Restored {', '.join(restored['parts'])} from {CHECKPOINT_PATH} in {restored['ms']} ms (age {restored['age_s']} s)")
+        threading.Thread(target=reconcile_open_orders, daemon=True).start()
+        checkpointer.start()
+    # threaded so a long request (e.g. /admin/profile) does not block the others
+    httpd = ThreadingHTTPServer(("0.0.0.0", port), Handler)
     print(f"OrderSense backend running on http://localhost:{port}")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    finally:
+        if checkpointer is not None:
+            checkpointer.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+from __future__ import annotations
+import os, tempfile
+from types import SimpleNamespace
+import pytest
+
+# keep the module-level stores out of the working tree
+_tmp = tempfile.mkdtemp(prefix="track_fill_")
+for k, name in (("HISTORY_DB", "history.sqlite"), ("LEDGER_PATH", "ledger.json"), ("CHECKPOINT_PATH", "checkpoint.json")):
+    os.environ.setdefault(k, os.path.join(_tmp, name))
+import server
+
+CANCELED = {"order_id": "9001", "client_oid": "c-1", "symbol": "cmt_btcusdt", "status": "canceled", "type": "1", "filled_qty": "0"}
+
+@pytest.fixture
+def bot(monkeypatch):
+    monkeypatch.setattr(server, "get_weex", lambda: None)
+    monkeypatch.setattr(server, "creds", SimpleNamespace(api_key="k", secret_key="s", passphrase="p"))
+    server.store.events.clear()
+    for oid, _ in server.open_orders.items().items():
+        server.open_orders.remove(oid)
+    return server
+
+def test_canceled_without_fill_or_price_resolves(bot, monkeypatch):
+    monkeypatch.setattr(bot, "poll_until_filled", lambda *a, **k: dict(CANCELED))
+    bot.exec_metrics.on_decision("c-1", symbol="cmt_btcusdt", side="buy", style="limit", mid=100.0, size=1.0)
+    bot.open_orders.add("c-1", order_id="9001", symbol="cmt_btcusdt", side="buy")
+    assert bot.track_fill("cmt_btcusdt", "c-1", "9001", timeout_s=0.1) is True
+    assert "c-1" not in bot.open_orders.items()
+    notes = [e.to_dict().get("note") for e in bot.store.get_events()]
+    assert "resolved without a fill" in notes
+    assert not any(e.type == "fill" for e in bot.store.get_events())
+
+def test_reconcile_continues_past_a_failing_order(bot, monkeypatch):
+    monkeypatch.setattr(bot, "poll_until_filled", lambda _weex, order_id, **_: dict(CANCELED, order_id=order_id, client_oid=None))
+    on_fill = bot.exec_metrics.on_fill
+    def book(fill):
+        if fill.order_id == "1":
+            raise TypeError("bad detail")
+        return on_fill(fill)
+    monkeypatch.setattr(bot.exec_metrics, "on_fill", book)
+    bot.open_orders.add("c-1", order_id="1", symbol="cmt_btcusdt", side="buy")
+    bot.open_orders.add("c-2", order_id="2", symbol="cmt_btcusdt", side="buy")
+    bot.reconcile_open_orders()
+    assert "c-1" in bot.open_orders.items()
+    assert "c-2" not in bot.open_orders.items()
+    errors = [e.to_dict() for e in bot.store.get_events() if e.type == "error"]
+    assert [e["client_oid"] for e in errors] == ["c-1"] and "reconcile_failed" in errors[0]["msg"]
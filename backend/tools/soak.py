@@ -0,0 +1,339 @@
+# Soak run: the bot loop from backend/server.py, in this process, against a
+# tools.weex_standin subprocess at accelerated cadence, for hours, with
+# injected failures (random 5xx, periodic stalls via SIGSTOP, periodic
+# restarts that drop every connection and forget every order). Every
+# --interval it samples RSS, traced Python memory, threads, open sockets,
+# sqlite file sizes, queue depths and loop tick time. At the end each series
+# (after --warmup) gets a least-squares slope; a metric fails when its fitted
+# growth over the run exceeds max(rel * its median, abs).
+# Run from backend/:
+#   python -m tools.soak --duration 2h
+#   python -m tools.soak --duration 10m --interval 5 --csv soak.csv
+#   python -m tools.soak --tol rss_mb=0.05:4 --stall-every 0 --restart-every 0
+from __future__ import annotations
+import argparse, csv, json, os, shutil, signal, socket, subprocess, sys, tempfile, threading, time, tracemalloc
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# metric -> (relative tolerance, absolute tolerance) on fitted growth over the run
+TOLERANCES: Dict[str, Tuple[float, float]] = {
+    "rss_mb": (0.10, 8.0),
+    "traced_mb": (0.10, 2.0),
+    "threads": (0.0, 2.0),
+    "sockets": (0.0, 4.0),
+    "db_mb": (0.25, 1.0),
+    "queue": (0.0, 50.0),
+    "loop_ms": (0.50, 2.0),
+}
+
+def parse_duration(s: str) -> float:
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    s = s.strip()
+    if s and s[-1] in units:
+        return float(s[:-1]) * units[s[-1]]
+    return float(s)
+
+def parse_tol(specs: List[str]) -> Dict[str, Tuple[float, float]]:
+    out = dict(TOLERANCES)
+    for spec in specs:
+        name, _, val = spec.partition("=")
+        if name not in out:
+            raise SystemExit(f"--tol: unknown metric {name!r} (one of {', '.join(out)})")
+        rel, _, ab = val.partition(":")
+        out[name] = (float(rel), float(ab) if ab else out[name][1])
+    return out
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        # peak, not current: only catches growth, never a plateau
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def open_sockets() -> Optional[int]:
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    n = 0
+    for fd in fds:
+        try:
+            n += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            pass
+    return n
+
+def files_mb(d: str) -> float:
+    # sqlite databases with their -wal / -shm files
+    return sum(os.path.getsize(os.path.join(d, f)) for f in os.listdir(d) if ".sqlite" in f) / 2**20
+
+def trend(ts: List[float], ys: List[float]) -> Tuple[float, float]:
+    # least-squares slope per second, and the median as the baseline
+    n = len(ts)
+    mt, my = sum(ts) / n, sum(ys) / n
+    var = sum((t - mt) ** 2 for t in ts)
+    slope = sum((t - mt) * (y - my) for t, y in zip(ts, ys)) / var if var else 0.0
+    return slope, sorted(ys)[n // 2]
+
+class StandInProc:
+    # The stand-in in its own interpreter, so its memory, threads and
+    # sockets stay out of the numbers, and it can be paused and restarted.
+    def __init__(self, port: int, latency_ms: float, fail_rate: float, clock_skew_ms: int):
+        self.port = port
+        self.args = [sys.executable, "-m", "tools.weex_standin", "--port", str(port), "--latency-ms", str(latency_ms),
+                     "--fail-rate", str(fail_rate), "--clock-skew-ms", str(clock_skew_ms)]
+        self.p: Optional[subprocess.Popen] = None
+        self.stalls = 0
+        self.restarts = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout_s: float = 10.0):
+        self.p = subprocess.Popen(self.args, cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < timeout_s:
+            try:
+                with urllib.request.urlopen(self.url + "/capi/v2/market/time", timeout=1):
+                    return
+            except OSError:
+                if self.p.poll() is not None:
+                    raise RuntimeError(f"stand-in exited with {self.p.returncode}")
+                time.sleep(0.05)
+        raise RuntimeError("stand-in did not come up")
+
+    def stop(self):
+        if self.p is not None and self.p.poll() is None:
+            self.p.send_signal(signal.SIGCONT)   # a stalled process cannot act on SIGTERM
+            self.p.terminate()
+            self.p.wait(timeout=5)
+
+    def stall(self, seconds: float, stop: threading.Event):
+        # the exchange hangs: connections stay open, nothing answers
+        self.stalls += 1
+        self.p.send_signal(signal.SIGSTOP)
+        stop.wait(seconds)
+        self.p.send_signal(signal.SIGCONT)
+
+    def restart(self):
+        self.restarts += 1
+        self.stop()
+        self.start()
+
+def inject_failures(standin: StandInProc, stop: threading.Event, stall_every: float, stall_s: float, restart_every: float):
+    next_stall = time.monotonic() + stall_every if stall_every else float("inf")
+    next_restart = time.monotonic() + restart_every if restart_every else float("inf")
+    while not stop.wait(0.5):
+        now = time.monotonic()
+        if now >= next_restart:
+            standin.restart()
+            next_restart = now + restart_every
+        elif now >= next_stall:
+            standin.stall(stall_s, stop)
+            next_stall = time.monotonic() + stall_every
+
+def poll_dashboard(base: str, every_s: float, stop: threading.Event):
+    # what an open dashboard tab does, so handler-side leaks show up too
+    paths = ("/api/status", "/api/metrics", "/api/events", "/api/positions")
+    while not stop.wait(every_s):
+        for p in paths:
+            try:
+                with urllib.request.urlopen(base + p, timeout=5) as r:
+                    r.read()
+            except OSError:
+                pass
+
+def _env(args, tmp: str, standin_url: str) -> Dict[str, str]:
+    return {
+        "WEEX_BASE_URL": standin_url,
+        "WEEX_API_KEY": "soak-key", "WEEX_SECRET_KEY": "soak-secret-" + "x" * 20, "WEEX_PASSPHRASE": "soak-pass",
+        "DRY_RUN": "0",
+        "SYMBOLS": args.symbols,
+        "LOOP_INTERVAL_S": str(args.loop_interval),
+        "HISTORY_DB": os.path.join(tmp, "history.sqlite"),
+        # production keeps 30 days and prunes hourly; scaled down so the
+        # database is expected to level off within the run
+        "HISTORY_RETENTION_DAYS": str(args.history_retention_s / 86400),
+        "HISTORY_PRUNE_EVERY_S": str(max(1.0, args.history_retention_s / 10)),
+        "LEDGER_PATH": os.path.join(tmp, "ledger.json"),
+        "CHECKPOINT_PATH": os.path.join(tmp, "checkpoint.json"),
+        "CHECKPOINT_INTERVAL_S": "5",
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Long-run soak of the bot loop against the WEEX stand-in")
+    ap.add_argument("--duration", default="1h", help="e.g. 90s, 30m, 4h")
+    ap.add_argument("--interval", type=float, default=30.0, help="seconds between samples")
+    ap.add_argument("--warmup", type=float, default=0.2, help="fraction of samples ignored by the trend check")
+    ap.add_argument("--symbols", default="cmt_btcusdt,cmt_ethusdt")
+    ap.add_argument("--loop-interval", type=float, default=0.05, help="bot tick, seconds (production: 3)")
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    ap.add_argument("--fail-rate", type=float, default=0.02)
+    ap.add_argument("--clock-skew-ms", type=int, default=0)
+    ap.add_argument("--stall-every", type=float, default=300.0, help="seconds between stand-in stalls, 0 = never")
+    ap.add_argument("--stall-s", type=float, default=5.0)
+    ap.add_argument("--restart-every", type=float, default=900.0, help="seconds between stand-in restarts, 0 = never")
+    ap.add_argument("--history-retention-s", type=float, default=120.0, help="keep it well under --duration")
+    ap.add_argument("--poll-s", type=float, default=1.0, help="dashboard polling period, 0 = off")
+    ap.add_argument("--top", type=int, default=10, help="allocators listed in the report")
+    ap.add_argument("--tol", action="append", default=[], metavar="METRIC=REL[:ABS]")
+    ap.add_argument("--no-tracemalloc", action="store_true", help="skip traced_mb and the allocator report")
+    ap.add_argument("--csv", help="write every sample to this file")
+    ap.add_argument("--json", action="store_true", help="print the verdict as JSON")
+    ap.add_argument("--keep", action="store_true", help="keep the work dir (databases, ledger, checkpoint)")
+    args = ap.parse_args()
+    duration = parse_duration(args.duration)
+    tol = parse_tol(args.tol)
+    if args.no_tracemalloc:
+        tol.pop("traced_mb")
+
+    tmp = tempfile.mkdtemp(prefix="soak-")
+    standin = StandInProc(_free_port(), args.latency_ms, args.fail_rate, args.clock_skew_ms)
+    standin.start()
+    os.environ.update(_env(args, tmp, standin.url))
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    # import after the environment is set: server.py reads it at import time
+    sys.path.insert(0, BACKEND)
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    import server
+    from app.ai_log_queue import AiLogQueue
+    from http.server import ThreadingHTTPServer
+
+    # backend/server.py does not upload AI logs itself; mirror the root
+    # server's one log per fill so ai_logs.sqlite and its flusher are soaked too
+    aiq = AiLogQueue(server.get_weex(), db_path=os.path.join(tmp, "ai_logs.sqlite"), flush_interval_s=1.0)
+    set_last_fill = server.store.set_last_fill
+
+    def on_fill(e):
+        set_last_fill(e)
+        aiq.enqueue({"stage": "fill", "model": "soak", "input": {"client_oid": e.client_oid}, "output": e.to_dict(),
+                     "explanation": "soak run", "orderId": e.order_id})
+
+    server.store.set_last_fill = on_fill
+
+    class Handler(server.Handler):
+        def log_message(self, *args):
+            pass
+
+    stop = threading.Event()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True, name="soak-http").start()
+    if server.checkpointer is not None:
+        server.checkpointer.start()
+    server._running = True
+    bot = threading.Thread(target=server.bot_loop, daemon=True, name="bot")
+    bot.start()
+    workers = [threading.Thread(target=inject_failures, args=(standin, stop, args.stall_every, args.stall_s, args.restart_every), daemon=True)]
+    if args.poll_s:
+        workers.append(threading.Thread(target=poll_dashboard, args=(f"http://127.0.0.1:{httpd.server_address[1]}", args.poll_s, stop), daemon=True))
+    for w in workers:
+        w.start()
+
+    def sample(t: float) -> Dict[str, Any]:
+        aq = aiq.stats()
+        s = {
+            "t": round(t, 1),
+            "rss_mb": round(rss_mb(), 2),
+            "traced_mb": round(tracemalloc.get_traced_memory()[0] / 2**20, 3) if tracemalloc.is_tracing() else None,
+            "threads": threading.active_count(),
+            "sockets": open_sockets(),
+            "db_mb": round(files_mb(tmp), 3),
+            "queue": server.store.history.stats()["queued"] + aq["pending"] + sum(server.pipeline.stats()["inflight"].values()),
+            "loop_ms": round(server.loop_ms.mean() or 0.0, 3),
+            "ticks": server.loop_ticks,
+            "events": len(server.store.events),
+            "ailog_uploaded": aq["uploaded"],
+            "stalls": standin.stalls,
+            "restarts": standin.restarts,
+        }
+        return s
+
+    samples: List[Dict[str, Any]] = []
+    base_snap = None
+    n_samples = max(2, int(duration // args.interval))
+    warm = int(n_samples * args.warmup)
+    print(f"soak: {duration:.0f}s, {n_samples} samples every {args.interval:g}s, stand-in {standin.url}, work dir {tmp}", flush=True)
+    t0 = time.monotonic()
+    try:
+        for i in range(n_samples):
+            time.sleep(max(0.0, t0 + (i + 1) * args.interval - time.monotonic()))
+            s = sample(time.monotonic() - t0)
+            samples.append(s)
+            if i + 1 == warm and tracemalloc.is_tracing():
+                base_snap = tracemalloc.take_snapshot()
+            print(" ".join(f"{k}={v}" for k, v in s.items()), flush=True)
+    except KeyboardInterrupt:
+        print("interrupted, judging what was collected", flush=True)
+    finally:
+        server._running = False
+        stop.set()
+        bot.join(timeout=10)
+        end_snap = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        httpd.shutdown()
+        aiq.stop()
+        if server.checkpointer is not None:
+            server.checkpointer.stop()
+        standin.stop()
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.csv and samples:
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(samples[0]))
+            w.writeheader()
+            w.writerows(samples)
+
+    judged = samples[warm:] if len(samples) - warm >= 3 else samples
+    verdict: Dict[str, Any] = {"samples": len(samples), "judged": len(judged), "metrics": {}, "ok": True}
+    if len(judged) >= 3:
+        span = judged[-1]["t"] - judged[0]["t"]
+        for name, (rel, ab) in tol.items():
+            pts = [(s["t"], s[name]) for s in judged if s[name] is not None]
+            if len(pts) < 3:
+                continue
+            slope, median = trend([p[0] for p in pts], [p[1] for p in pts])
+            growth = slope * span
+            limit = max(rel * abs(median), ab)
+            ok = growth <= limit
+            verdict["metrics"][name] = {"median": round(median, 3), "growth": round(growth, 3), "limit": round(limit, 3), "ok": ok}
+            verdict["ok"] = verdict["ok"] and ok
+    else:
+        verdict["ok"] = None   # too short to say anything
+
+    top: List[str] = []
+    if base_snap is not None and end_snap is not None:
+        skip = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        stats = end_snap.filter_traces(skip).compare_to(base_snap.filter_traces(skip), "lineno")
+        top = [str(st) for st in stats[:args.top] if st.size_diff > 0]
+    verdict["top_growth"] = top
+
+    if args.json:
+        print(json.dumps(verdict, indent=2))
+    else:
+        print(f"\n{'metric':<12}{'median':>12}{'growth':>12}{'limit':>12}")
+        for name, m in verdict["metrics"].items():
+            print(f"{name:<12}{m['median']:>12}{m['growth']:>12}{m['limit']:>12}  {'ok' if m['ok'] else 'DRIFT'}")
+        if top:
+            print(f"\nlargest allocation growth since warm-up (top {args.top}):")
+            for line in top:
+                print("  " + line)
+        print("\n" + {True: "PASS", False: "FAIL", None: "INCONCLUSIVE (too few samples)"}[verdict["ok"]])
+    sys.exit(0 if verdict["ok"] is not False else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# Local stand-in for the WEEX contract REST API: enough of it for benchmarks,
+# soak runs and offline development. Nothing is validated except that signed
+# requests carry the ACCESS-* headers; orders fill immediately at the mid.
+# Run from backend/:  python -m tools.weex_standin [--port 8089] [--latency-ms 0]
+# then point the bot at it with WEEX_BASE_URL=http://127.0.0.1:8089
+from __future__ import annotations
+import argparse, itertools, json, math, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+def _json(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+class Book:
+    # random-walk mid with a fixed tick; depth levels are generated per request
+    def __init__(self, mid: float = 60000.0, seed: int = 7):
+        self.mid = mid
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def step(self) -> float:
+        with self._lock:
+            self.mid *= math.exp(self._rnd.gauss(0, 0.0002))
+            return self.mid
+
+    def depth(self, limit: int) -> Dict[str, Any]:
+        mid = self.step()
+        rnd = self._rnd
+        asks = [[f"{mid + 0.5 + i * 0.1:.1f}", f"{rnd.uniform(0.001, 5):.4f}"] for i in range(limit)]
+        bids = [[f"{mid - 0.5 - i * 0.1:.1f}", f"{rnd.uniform(0.001, 5):.4f}"] for i in range(limit)]
+        return {"asks": asks, "bids": bids, "timestamp": str(int(time.time() * 1000))}
+
+class StandIn:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_s: float = 0.0, fail_rate: float = 0.0, seed: int = 7,
+                 key_rps: float = 0.0, clock_skew_ms: int = 0, ts_window_ms: int = 30000):
+        self.latency_s = latency_s
+        # exchange clock = local clock + skew; signed requests stamped further
+        # than ts_window_ms from it are rejected the way WEEX does (0 = no check)
+        self.clock_skew_ms = clock_skew_ms
+        self.ts_window_ms = ts_window_ms
+        self.ts_rejected = 0
+        self.fail_rate = fail_rate
+        # per ACCESS-KEY request budget; over it the stand-in answers 429 like WEEX does
+        self.key_rps = key_rps
+        self._key_buckets: Dict[str, list] = {}
+        self.throttled: Dict[str, int] = {}
+        self.books: Dict[str, Book] = {}
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.counts: Dict[str, int] = {}
+        self._ids = itertools.count(int(time.time()) * 1000)
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._t: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandIn":
+        self._t = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="weex-standin")
+        self._t.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def now_ms(self) -> int:
+        return int(time.time() * 1000) + self.clock_skew_ms
+
+    def _stale_ts(self, ts: Optional[str]) -> bool:
+        if not self.ts_window_ms or ts is None:
+            return False
+        try:
+            bad = abs(int(ts) - self.now_ms()) > self.ts_window_ms
+        except ValueError:
+            bad = True
+        if bad:
+            with self._lock:
+                self.ts_rejected += 1
+        return bad
+
+    def _over_budget(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            b = self._key_buckets.get(key)
+            if b is None:
+                b = self._key_buckets[key] = [self.key_rps, now]
+            b[0] = min(self.key_rps, b[0] + (now - b[1]) * self.key_rps)
+            b[1] = now
+            if b[0] < 1.0:
+                self.throttled[key] = self.throttled.get(key, 0) + 1
+                return True
+            b[0] -= 1.0
+            return False
+
+    def book(self, symbol: str) -> Book:
+        with self._lock:
+            b = self.books.get(symbol)
+            if b is None:
+                b = self.books[symbol] = Book(seed=len(self.books) + 7)
+            return b
+
+    def _new_order(self, symbol: str, o: Dict[str, Any]) -> Dict[str, Any]:
+        oid = str(next(self._ids))
+        px = self.book(symbol).mid
+        order = {
+            "order_id": oid,
+            "client_oid": o.get("client_oid"),
+            "symbol": symbol,
+            "size": o.get("size"),
+            "type": o.get("type"),
+            "order_type": o.get("order_type"),
+            "status": "filled",
+            "filled_qty": o.get("size"),
+            "price": o.get("price"),
+            "price_avg": f"{px:.1f}",
+            # every order fills on arrival, i.e. takes liquidity
+            "fee": f"{px * float(o.get('size') or 0) * 0.0006:.6f}",
+            "liquidity": "taker",
+            "createTime": int(time.time() * 1000),
+        }
+        with self._lock:
+            self.orders[oid] = order
+        return order
+
+    def route(self, method: str, path: str, q: Dict[str, str], body: Dict[str, Any]) -> Tuple[int, Any]:
+        with self._lock:
+            self.counts[path] = self.counts.get(path, 0) + 1
+        if path == "/capi/v2/market/time":
+            now = self.now_ms()
+            return 200, {"epoch": f"{now / 1000:.3f}", "iso": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now / 1000)), "timestamp": now}
+        if path == "/capi/v2/market/depth":
+            return 200, self.book(q.get("symbol", "cmt_btcusdt")).depth(int(q.get("limit", "15")))
+        if path == "/capi/v2/order/placeOrder":
+            o = self._new_order(body.get("symbol", ""), body)
+            return 200, {"client_oid": o["client_oid"], "order_id": o["order_id"]}
+        if path == "/capi/v2/order/batchOrders":
+            infos = [self._new_order(body.get("symbol", ""), o) for o in body.get("orderDataList") or []]
+            return 200, {"order_info": [{"client_oid": o["client_oid"], "order_id": o["order_id"], "result": True} for o in infos], "result": True}
+        if path == "/capi/v2/order/detail":
+            with self._lock:
+                o = self.orders.get(q.get("orderId", ""))
+            return (200, o) if o else (400, {"code": "40109", "msg": "order not found"})
+        if path in ("/capi/v2/order/cancel_order", "/capi/v2/order/cancelAllOrders"):
+            return 200, {"result": True}
+        if path == "/capi/v2/order/cancel_batch_orders":
+            ids = body.get("ids") or body.get("cids") or []
+            key = "order_id" if body.get("ids") else "client_oid"
+            return 200, {"cancelOrderResultList": [{key: x, "result": True} for x in ids]}
+        if path == "/capi/v2/order/uploadAiLog":
+            return 200, {"code": "00000", "msg": "success", "data": "upload success"}
+        return 404, {"code": "40404", "msg": f"no stand-in for {path}"}
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out as separate writes; without this a
+            # keep-alive client waits on delayed ACK for every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, code: int, obj: Any):
+                body = _json(obj)
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, method: str):
+                url = urlparse(self.path)
+                q = {k: v[0] for k, v in parse_qs(url.query).items()}
+                n = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(n) if n else b""
+                if standin.latency_s:
+                    time.sleep(standin.latency_s)
+                if url.path.startswith("/capi/v2/order") and not self.headers.get("ACCESS-SIGN"):
+                    return self._reply(401, {"code": "40001", "msg": "missing signature"})
+                if standin._stale_ts(self.headers.get("ACCESS-TIMESTAMP")):
+                    return self._reply(400, {"code": "40008", "msg": "Request timestamp expired"})
+                if standin.key_rps and standin._over_budget(self.headers.get("ACCESS-KEY", "")):
+                    return self._reply(429, {"code": "429", "msg": "Too Many Requests"})
+                if standin.fail_rate and standin._rnd.random() < standin.fail_rate:
+                    return self._reply(500, {"code": "50000", "msg": "stand-in injected failure"})
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    return self._reply(400, {"code": "40000", "msg": "bad json"})
+                self._reply(*standin.route(method, url.path, q, body))
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+        return Handler
+
+def main():
+    ap = argparse.ArgumentParser(description="Local WEEX API stand-in")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--key-rps", type=float, default=0.0, help="per API key request budget, 0 = unlimited")
+    ap.add_argument("--clock-skew-ms", type=int, default=0, help="exchange clock minus local clock")
+    args = ap.parse_args()
+    s = StandIn(args.host, args.port, latency_s=args.latency_ms / 1000, fail_rate=args.fail_rate, key_rps=args.key_rps,
+                clock_skew_ms=args.clock_skew_ms)
+    print(f"WEEX stand-in on {s.url}")
+    try:
+        s.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        s.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -2,35 +2,90 @@ import json
 import os
 import threading
 import time
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
 from dotenv import load_dotenv
 
 from app.config import settings
 from app.state import store
 from app.weex_client import WeexClient, WeexCredentials
+from app.weex_pool import WeexClientPool, credentials_from_env, parse_symbol_keys
 from app.ai_log_queue import AiLogQueue
+from app.market_data import MarketDataCache
+from app.order_pipeline import ClientOidGenerator, OpenOrders, OrderPipeline
+from app.exec_metrics import ExecutionMetrics
+from app.ledger import PositionLedger
+from app.history import HistoryStore
+from app.checkpoint import Checkpointer
+from app.rollups import Rollups
+from app.book_stream import BookFeed, stream as book_stream
+from app import profiler
+from app.depth import depth_summary, liquidity_score, parse_depth_top
+from app.order_status import is_terminal, poll_until_filled, to_fill_event
+from app.events import DecisionEvent, OrderEvent, events_json
 from app.execution.policy import choose_execution
+from app.execution.risk import RiskGate, RiskLimits
 from app.execution.types import MarketSnapshot
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-store.state.symbol = settings.symbol
+store.set_symbols(settings.symbols)
+store.history = HistoryStore(
+    os.getenv("HISTORY_DB", "history.sqlite"),
+    retention_s=float(os.getenv("HISTORY_RETENTION_DAYS", "30")) * 86400 or None,
+    prune_every_s=float(os.getenv("HISTORY_PRUNE_EVERY_S", "3600")),
+)
 
 creds = WeexCredentials(
     api_key=settings.weex_api_key,
     secret_key=settings.weex_secret_key,
     passphrase=settings.weex_passphrase,
 )
-weex = WeexClient(creds, settings.weex_base_url)
-aiq = AiLogQueue(weex, db_path="ai_logs.sqlite", flush_interval_s=2.0)
+# built on first use so the server can answer /health before any of it exists
+_weex = None
+_aiq = None
+_lazy_lock = threading.Lock()
+
+def get_weex():
+    # several accounts (WEEX_API_KEY_2, _3, ...) are sharded through a pool
+    global _weex
+    if _weex is None:
+        with _lazy_lock:
+            if _weex is None:
+                accounts = credentials_from_env()
+                if len(accounts) > 1:
+                    _weex = WeexClientPool(accounts, settings.weex_base_url, symbols=settings.symbols, symbol_keys=parse_symbol_keys(os.getenv("WEEX_SYMBOL_KEYS", "")))
+                else:
+                    _weex = WeexClient(creds, settings.weex_base_url)
+    return _weex
+
+def get_aiq() -> AiLogQueue:
+    global _aiq
+    if _aiq is None:
+        weex = get_weex()
+        with _lazy_lock:
+            if _aiq is None:
+                _aiq = AiLogQueue(weex, db_path="ai_logs.sqlite", flush_interval_s=2.0)
+    return _aiq
 
 _stop = threading.Event()
 _bot_thread = None
+_busy = {}
+_bus = None
+_reconciling = False
+_last_reconcile = 0.0
+RECONCILE_EVERY_S = float(os.getenv("RECONCILE_EVERY_S", "60"))
+RECONCILE_MAX_AGE_S = float(os.getenv("RECONCILE_MAX_AGE_S", "86400"))
+SNAPSHOT_BUS = os.getenv("SNAPSHOT_BUS", "").strip()
+SNAPSHOT_MAX_AGE_S = float(os.getenv("SNAPSHOT_MAX_AGE_S", "5"))
+# /health reports ailog_backlog as degraded once the oldest unsent AI log is older than this
+AILOG_MAX_BACKLOG_AGE_S = float(os.getenv("AILOG_MAX_BACKLOG_AGE_S", "300"))
 
 def log_ai(stage, input_obj, output_obj, explanation, order_id=None):
-    aiq.enqueue({
+    get_aiq().enqueue({
         "stage": stage,
         "model": settings.model_name,
         "input": input_obj,
@@ -40,117 +95,281 @@ def log_ai(stage, input_obj, output_obj, explanation, order_id=None):
     })
 
 def real_market_snapshot(symbol: str) -> MarketSnapshot:
-    d = weex.get_depth(symbol=symbol, limit=15)
-    data = d.get("data", d)
-
-    asks = data.get("asks", [])
-    bids = data.get("bids", [])
-
-    if not asks or not bids:
-        raise RuntimeError(f"Depth empty for {symbol}: {d}")
-
-    best_ask = float(asks[0][0])
-    best_bid = float(bids[0][0])
-
-    mid = (best_ask + best_bid) / 2.0
-    spread = max(0.0, best_ask - best_bid)
+    raw = get_weex().get_depth_raw(symbol=symbol, limit=15)
+    try:
+        top = depth_summary(raw, 5)
+    except (RuntimeError, ValueError):
+        raise RuntimeError(f"Depth empty for {symbol}: {raw[:500]!r}")
+    book.update(symbol, parse_depth_top(raw, book.levels))
 
-    topn = 5
-    ask_qty = sum(float(x[1]) for x in asks[:topn])
-    bid_qty = sum(float(x[1]) for x in bids[:topn])
-    liq = max(0.0, min(1.0, (ask_qty + bid_qty) / 100000.0))
+    liq = liquidity_score(top["ask_qty"], top["bid_qty"])
 
     vol_1m = 0.002
-    return MarketSnapshot(mid=mid, spread=spread, vol_1m=vol_1m, liquidity_score=liq)
-
-def bot_loop():
-    while not _stop.is_set():
-        try:
-            snap = real_market_snapshot(store.state.symbol)
-            src = "weex"
-        except Exception as e:
-            store.add_event({"type": "error", "msg": f"depth_failed: {e}"})
-            snap = fallback_snapshot()
-            src = "fallback"
-
-        side = "buy" if int(time.time()) % 2 == 0 else "sell"
-        target_size = 0.5
-        decision = choose_execution(snap, side, target_size)
-
-        store.add_event({
-            "type": "decision",
-            "symbol": store.state.symbol,
-            "side": side,
-            "style": decision.style,
-            "price": decision.price,
-            "size": decision.size,
-            "reason": decision.reason,
-            "snapshot": {"mid": snap.mid, "spread": snap.spread, "liq": snap.liquidity_score},
-        })
-        with store.lock:
-            store.state.metrics["decisions"] += 1
+    return MarketSnapshot(mid=top["mid"], spread=top["spread"], vol_1m=vol_1m, liquidity_score=liq)
+
+def bus_market_snapshot(symbol: str) -> MarketSnapshot:
+    global _bus
+    if _bus is None:
+        with _lazy_lock:
+            if _bus is None:
+                from app.snapshot_bus import SnapshotBus
+                _bus = SnapshotBus.attach(SNAPSHOT_BUS)
+    snap = _bus.latest(symbol, max_age_s=SNAPSHOT_MAX_AGE_S)
+    if snap is None:
+        raise RuntimeError(f"no fresh snapshot on bus {SNAPSHOT_BUS} for {symbol}")
+    return snap
+
+def fallback_snapshot() -> MarketSnapshot:
+    return MarketSnapshot(mid=60000.0, spread=10.0, vol_1m=0.002, liquidity_score=0.5)
+
+def run_symbol(symbol: str, snap):
+    if isinstance(snap, Exception):
+        store.add_event({"type": "error", "symbol": symbol, "msg": f"depth_failed: {snap}"})
+        store.update_symbol(symbol, last_error=f"depth_failed: {snap}")
+        snap = fallback_snapshot()
+        src = "fallback"
+    else:
+        src = "bus" if SNAPSHOT_BUS else "weex"
+        # the depth snapshot carries a placeholder vol; use the cache's estimate once warm
+        vol = market.vol(symbol)
+        if vol is not None:
+            snap = replace(snap, vol_1m=vol)
+
+    side = "buy" if int(time.time()) % 2 == 0 else "sell"
+    target_size = 0.5
+    decision = choose_execution(snap, side, target_size)
+
+    snap_view = {"mid": snap.mid, "spread": snap.spread, "liq": snap.liquidity_score, "vol_1m": snap.vol_1m, "source": src}
+    decision_evt = DecisionEvent(
+        symbol=symbol,
+        side=side,
+        style=decision.style,
+        price=decision.price,
+        size=decision.size,
+        reason=decision.reason,
+        snapshot=snap_view,
+    )
+    store.add_event(decision_evt)
+    store.update_symbol(symbol, last_snapshot=snap_view, last_decision=decision_evt)
+    store.bump(symbol, "decisions")
+    live = src != "fallback"
+    rollups.on_decision(symbol, decision.style, snap.spread if live else None, snap.mid, snap.liquidity_score if live else None, ts=decision_evt.ts)
+    if src != "fallback":
+        ledger.mark(symbol, snap.mid)
+
+    log_ai(
+        "Decision Making",
+        {"symbol": symbol, "side": side, "target_size": target_size, "snapshot": snap.__dict__},
+        {"execution": decision.__dict__},
+        decision.reason,
+    )
+
+    client_oid = oids.next()
+    exec_metrics.on_decision(client_oid, symbol=symbol, side=side, style=decision.style, mid=snap.mid, size=decision.size)
+    if pipeline.try_submit(symbol, client_oid, submit_order, symbol, side, decision, client_oid, snap.mid) is None:
+        exec_metrics.discard(client_oid)
+        store.bump(symbol, "skipped_inflight")
+
+def record_fill(symbol: str, fill_event):
+    booked = exec_metrics.on_fill(fill_event)
+    if booked:
+        rollups.on_fill(symbol, booked["maker"], booked["slippage_bps"], ts=fill_event.ts)
+    ledger.on_fill(fill_event, symbol)
+    store.add_event(fill_event)
+    store.bump(symbol, "fills")
+    ex_all, ex_sym = exec_metrics.snapshot(), exec_metrics.snapshot(symbol)
+    with store.lock:
+        for m, ex in ((store.state.metrics, ex_all), (store.symbol_state(symbol).metrics, ex_sym)):
+            for k in ("maker_rate", "avg_slippage_bps", "fill_ratio", "avg_fill_latency_s"):
+                if ex[k] is not None:
+                    m[k] = ex[k]
+
+def submit_order(symbol: str, side: str, decision, client_oid: str, mid: float):
+    # a bad decision (e.g. "slice" has no price) stops here instead of at the exchange
+    reject = risk.check(symbol, side, float(settings.order_size), decision.price, mid, position=ledger.exposure(symbol, side))
+    if reject:
+        store.add_event(OrderEvent(symbol=symbol, side=side, style=decision.style, price=decision.price, size=float(settings.order_size),
+                                   status="rejected(risk)", client_oid=client_oid, note=reject))
+        store.bump(symbol, "risk_rejected")
+        exec_metrics.discard(client_oid)
+        return
+
+    order_id = None
+    try:
+        if not settings.dry_run:
+            if decision.style == "post_only_limit":
+                order_type = "1"  
+            elif decision.style == "aggressive_limit":
+                order_type = "3"  
+            else:
+                order_type = "0"
+
+            type_ = "1" if side == "buy" else "2" 
+            match_price = "0" 
+            price = f"{decision.price:.2f}"
+
+            resp = get_weex().place_order(
+                symbol=symbol,
+                client_oid=client_oid,
+                size=settings.order_size,
+                type_=type_,
+                order_type=order_type,
+                match_price=match_price,
+                price=price,
+            )
+            data = resp.get("data", resp)
+            order_id = data.get("order_id") or data.get("orderId")
+            if order_id:
+                open_orders.add(client_oid, order_id=order_id, symbol=symbol, side=side)
+            store.add_event(OrderEvent(symbol=symbol, orderId=order_id, status="placed(real)", client_oid=client_oid))
+        else:
+            order_id = int(time.time() * 1000) % 10_000_000
+            store.add_event(OrderEvent(symbol=symbol, orderId=order_id, status="placed(simulated)", client_oid=client_oid))
+            exec_metrics.discard(client_oid)
+
+        store.bump(symbol, "orders")
+
+        oid_int = None
+        if isinstance(order_id, int):
+            oid_int = order_id
+        elif isinstance(order_id, str) and order_id.isdigit():
+            oid_int = int(order_id)
 
         log_ai(
-            "Decision Making",
-            {"symbol": store.state.symbol, "side": side, "target_size": target_size, "snapshot": snap.__dict__},
-            {"execution": decision.__dict__},
-            decision.reason,
+            "Order Placement",
+            {"requested": decision.__dict__, "client_oid": client_oid, "dry_run": settings.dry_run},
+            {"orderId": order_id, "status": "placed"},
+            "Order placement executed.",
+            order_id=oid_int,
         )
 
-        order_id = None
-        client_oid = f"os_{int(time.time()*1000)}"
+    except Exception as e:
+        store.add_event({"type": "error", "symbol": symbol, "msg": f"order_failed: {e}", "client_oid": client_oid})
+        store.update_symbol(symbol, last_error=f"order_failed: {e}")
+        exec_metrics.on_reject(client_oid)
+        return
 
-        try:
-            if not settings.dry_run:
-                if decision.style == "post_only_limit":
-                    order_type = "1"  
-                elif decision.style == "aggressive_limit":
-                    order_type = "3"  
-                else:
-                    order_type = "0"
-
-                type_ = "1" if side == "buy" else "2" 
-                match_price = "0" 
-                price = f"{decision.price:.2f}"
-
-                resp = weex.place_order(
-                    symbol=store.state.symbol,
-                    client_oid=client_oid,
-                    size=settings.order_size,
-                    type_=type_,
-                    order_type=order_type,
-                    match_price=match_price,
-                    price=price,
-                )
-                data = resp.get("data", resp)
-                order_id = data.get("order_id") or data.get("orderId")
-                store.add_event({"type": "order", "orderId": order_id, "status": "placed(real)", "client_oid": client_oid})
-            else:
-                order_id = int(time.time() * 1000) % 10_000_000
-                store.add_event({"type": "order", "orderId": order_id, "status": "placed(simulated)", "client_oid": client_oid})
+    if settings.dry_run or not order_id:
+        return
+    track_fill(symbol, client_oid, str(order_id))
 
-            with store.lock:
-                store.state.metrics["orders"] += 1
-
-            oid_int = None
-            if isinstance(order_id, int):
-                oid_int = order_id
-            elif isinstance(order_id, str) and order_id.isdigit():
-                oid_int = int(order_id)
-
-            log_ai(
-                "Order Placement",
-                {"requested": decision.__dict__, "client_oid": client_oid, "dry_run": settings.dry_run},
-                {"orderId": order_id, "status": "placed"},
-                "Order placement executed.",
-                order_id=oid_int,
-            )
-
-        except Exception as e:
-            store.add_event({"type": "error", "msg": f"order_failed: {e}", "client_oid": client_oid})
+def track_fill(symbol: str, client_oid: str, order_id: str, timeout_s: float = 20.0) -> bool:
+    # an order still live after the poll (or unreadable) stays in open_orders,
+    # and so in the checkpoint, for the next reconcile; True once resolved
+    try:
+        detail = poll_until_filled(get_weex(), order_id, timeout_s=timeout_s, interval_s=1.0)
+    except Exception as e:
+        store.add_event({"type": "error", "symbol": symbol, "msg": f"fill_poll_failed: {e}", "client_oid": client_oid})
+        return False
+    if not is_terminal(detail):
+        status = detail.get("status") if detail else None
+        store.add_event(OrderEvent(symbol=symbol, orderId=order_id, status=f"open({status})", client_oid=client_oid, note="unresolved after fill poll"))
+        return False
+    fill_event = to_fill_event(detail)
+    fill_event.client_oid = fill_event.client_oid or client_oid
+    try:
+        filled = float(fill_event.filled_qty or 0) > 0
+    except (TypeError, ValueError):
+        filled = False
+    if filled:
+        record_fill(symbol, fill_event)
+    else:
+        exec_metrics.on_fill(fill_event)
+        store.add_event(OrderEvent(symbol=symbol, orderId=order_id, status=str(fill_event.status), client_oid=client_oid, note="resolved without a fill"))
+    open_orders.remove(client_oid)
+    return True
+
+def reconcile_open_orders(min_age_s: float = 0.0):
+    # live orders from before the restart, or whose fill poll gave up: book
+    # whatever filled meanwhile; drop what stays unresolved past RECONCILE_MAX_AGE_S
+    global _reconciling
+    now = time.time()
+    try:
+        pending = {k: o for k, o in open_orders.items().items() if now - float(o.get("ts") or 0) >= min_age_s}
+        if not pending or settings.dry_run:
+            return
+        store.add_event({"type": "system", "msg": f"reconciling {len(pending)} open orders"})
+        for client_oid, o in pending.items():
+            try:
+                resolved = track_fill(o["symbol"], client_oid, o["order_id"], timeout_s=2.0)
+            except Exception as e:
+                # one bad order detail must not stop the rest of the pass
+                store.add_event({"type": "error", "symbol": o.get("symbol"), "msg": f"reconcile_failed: {e}", "client_oid": client_oid})
+                resolved = False
+            if not resolved and now - float(o.get("ts") or 0) > RECONCILE_MAX_AGE_S:
+                open_orders.remove(client_oid)
+                store.add_event({"type": "system", "msg": f"gave up on order {o['order_id']} ({o['symbol']}) after {RECONCILE_MAX_AGE_S:.0f}s unresolved"})
+    finally:
+        _reconciling = False
+
+def _maybe_reconcile():
+    global _reconciling, _last_reconcile
+    now = time.time()
+    if _reconciling or not len(open_orders) or now - _last_reconcile < RECONCILE_EVERY_S:
+        return
+    _reconciling, _last_reconcile = True, now
+    threading.Thread(target=reconcile_open_orders, args=(RECONCILE_EVERY_S,), daemon=True, name="reconcile").start()
+
+def cancel_all_symbols():
+    if settings.dry_run:
+        return {}
+    pipeline.drain(timeout=2.0)
+    out = {}
+    with ThreadPoolExecutor(max_workers=max(1, len(settings.symbols)), thread_name_prefix="cancel") as pool:
+        futs = {sym: pool.submit(get_weex().cancel_all_orders, sym) for sym in settings.symbols}
+        for sym, fut in futs.items():
+            try:
+                fut.result()
+                out[sym] = "ok"
+            except Exception as e:
+                out[sym] = f"failed: {e}"
+    store.add_event({"type": "system", "msg": "cancel_all on stop", "results": out})
+    return out
+
+oids = ClientOidGenerator()
+exec_metrics = ExecutionMetrics(window=int(os.getenv("METRICS_WINDOW", "200")))
+ledger = PositionLedger(os.getenv("LEDGER_PATH", "ledger.json"))
+rollups = Rollups()
+book = BookFeed(levels=min(15, int(os.getenv("BOOK_LEVELS", "10"))))
+BOOK_MAX_CLIENTS = int(os.getenv("BOOK_MAX_CLIENTS", "16"))
+risk = RiskGate(RiskLimits(
+    max_notional=settings.risk_max_notional,
+    max_position=settings.risk_max_position,
+    max_orders_per_s=settings.risk_max_orders_per_s,
+    burst=settings.risk_burst,
+    price_band_bps=settings.risk_price_band_bps,
+))
+pipeline = OrderPipeline(
+    max_inflight_per_symbol=settings.max_inflight_per_symbol,
+    max_workers=max(4, len(settings.symbols) * settings.max_inflight_per_symbol),
+)
+market = MarketDataCache(bus_market_snapshot if SNAPSHOT_BUS else real_market_snapshot, max_workers=max(1, len(settings.symbols)))
+decision_pool = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix="decide")
+open_orders = OpenOrders()
+checkpointer = None
+if os.getenv("CHECKPOINT_PATH", "checkpoint.json").strip():
+    checkpointer = Checkpointer(os.getenv("CHECKPOINT_PATH", "checkpoint.json").strip(), interval_s=float(os.getenv("CHECKPOINT_INTERVAL_S", "5")))
+    checkpointer.register("store", store.checkpoint_state, store.load_checkpoint)
+    checkpointer.register("exec_metrics", exec_metrics.state, exec_metrics.load_state)
+    checkpointer.register("open_orders", open_orders.state, open_orders.load_state)
+    checkpointer.register("market", market.state, lambda st: market.load_state(st, build=MarketSnapshot))
+    checkpointer.register("rollups", rollups.state, rollups.load_state)
 
+def bot_loop():
+    while not _stop.is_set():
+        snaps = market.refresh(settings.symbols)
+        for symbol, snap in snaps.items():
+            prev = _busy.get(symbol)
+            if prev is not None and not prev.done():
+                continue
+            _busy[symbol] = decision_pool.submit(run_symbol, symbol, snap)
+
+        ledger.maybe_checkpoint()
+        _maybe_reconcile()
         time.sleep(3)
 
+    ledger.maybe_checkpoint(force=True)
+
 def _read_frontend_index() -> bytes:
     
     p = os.path.join(os.path.dirname(__file__), "..", "frontend", "index.html")
@@ -162,7 +381,9 @@ def _read_frontend_index() -> bytes:
 
 class Handler(BaseHTTPRequestHandler):
     def _send(self, code, obj):
-        body = json.dumps(obj).encode("utf-8")
+        return self._send_raw(code, json.dumps(obj).encode("utf-8"))
+
+    def _send_raw(self, code, body):
         self.send_response(code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -170,15 +391,60 @@ class Handler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def _profile(self, q):
+        if not profiler.authorized(self.headers.get("X-Admin-Token")):
+            return self._send(403, {"error": "forbidden"})
+        try:
+            counts, meta = profiler.sample(float(q.get("seconds", "5")), int(q.get("hz", "100")))
+        except ValueError as e:
+            return self._send(400, {"error": f"bad query: {e}"})
+        except RuntimeError as e:
+            return self._send(409, {"error": str(e)})
+        if q.get("format") == "speedscope":
+            return self._send(200, profiler.speedscope(counts, meta))
+        body = profiler.collapsed(counts).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("X-Profile-Samples", str(meta["samples"]))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _book_stream(self, q, symbol):
+        if book.clients >= BOOK_MAX_CLIENTS:
+            return self._send(503, {"error": "too many book streams"})
+        try:
+            hz = float(q.get("hz", "4"))
+        except ValueError:
+            return self._send(400, {"error": "bad query: hz"})
+        fmt = "binary" if q.get("format") == "binary" else "json"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream" if fmt == "binary" else "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        def write(b):
+            self.wfile.write(b)
+            self.wfile.flush()
+
+        try:
+            book_stream(book, symbol, write, fmt=fmt, hz=hz)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
     def do_OPTIONS(self):
         self.send_response(204)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, X-Admin-Token")
         self.end_headers()
 
     def do_GET(self):
-        path = urlparse(self.path).path
+        url = urlparse(self.path)
+        path = url.path
+        qs = {k: v[0] for k, v in parse_qs(url.query).items()}
+        symbol = qs.get("symbol")
         if path == "/":
             body = _read_frontend_index()
             self.send_response(200)
@@ -190,16 +456,86 @@ class Handler(BaseHTTPRequestHandler):
             return
 
         if path == "/health":
-            return self._send(200, {"ok": True})
+            # stays 200: a lagging upload is worth alerting on, not restarting for
+            degraded = []
+            if _aiq is not None and not _aiq.stats(AILOG_MAX_BACKLOG_AGE_S)["healthy"]:
+                degraded.append("ailog_backlog")
+            return self._send(200, {"ok": True, "degraded": degraded})
+        if path == "/api/ailog":
+            if _aiq is None:
+                return self._send(200, {"started": False, "pending": 0})
+            return self._send(200, _aiq.stats(AILOG_MAX_BACKLOG_AGE_S))
         if path == "/api/status":
+            if symbol:
+                ss = store.symbols_status().get(symbol)
+                if ss is None:
+                    return self._send(404, {"error": f"unknown symbol {symbol}"})
+                return self._send(200, {"running": store.state.running, "dry_run": settings.dry_run, "inflight": pipeline.inflight(symbol), **ss})
             with store.lock:
-                return self._send(200, {"running": store.state.running, "symbol": store.state.symbol, "started_at": store.state.started_at, "dry_run": settings.dry_run})
+                return self._send(200, {"running": store.state.running, "symbol": store.state.symbol, "symbols": list(store.state.symbols), "started_at": store.state.started_at, "dry_run": settings.dry_run, "pipeline": pipeline.stats(), "open_orders": len(open_orders), "checkpoint": checkpointer.stats() if checkpointer else None, "weex_keys": _weex.stats() if isinstance(_weex, WeexClientPool) else None, "book": book.stats()})
+        if path == "/api/symbols":
+            return self._send(200, store.symbols_status())
         if path == "/api/metrics":
+            if symbol:
+                ss = store.symbols_status().get(symbol)
+                if ss is None:
+                    return self._send(404, {"error": f"unknown symbol {symbol}"})
+                return self._send(200, {**ss["metrics"], "market": market.view(symbol), "risk": risk.stats(), "clock": _weex.clock.stats() if _weex else None})
             with store.lock:
-                return self._send(200, store.state.metrics)
+                metrics = dict(store.state.metrics)
+            return self._send(200, {**metrics, "market": market.views(), "risk": risk.stats(), "clock": _weex.clock.stats() if _weex else None})
+        if path == "/api/market":
+            if symbol:
+                mv = market.view(symbol)
+                return self._send(200, mv) if mv else self._send(404, {"error": f"no snapshot for {symbol}"})
+            return self._send(200, {"ttl_s": market.ttl_s, "symbols": market.views()})
+        if path == "/api/rollups":
+            try:
+                return self._send(200, rollups.query(
+                    res=qs.get("res", "1m"),
+                    start=float(qs["start"]) if qs.get("start") else None,
+                    end=float(qs["end"]) if qs.get("end") else None,
+                    symbol=symbol,
+                ))
+            except ValueError as e:
+                return self._send(400, {"error": f"bad query: {e}"})
+        if path == "/api/book":
+            # one frame: a snapshot, or the coalesced delta since ?since=<seq>
+            sym = symbol or store.state.symbol
+            try:
+                since = int(qs.get("since", "0"))
+            except ValueError:
+                return self._send(400, {"error": "bad query: since"})
+            frame = book.next_frame(sym, since)
+            if frame is None:
+                seq = book.seq(sym)
+                if not seq:
+                    return self._send(404, {"error": f"no book for {sym}"})
+                frame = {"type": "delta", "symbol": sym, "seq": seq, "asks": [], "bids": []}
+            return self._send(200, frame)
+        if path == "/api/book/stream":
+            # ?symbol=&format=json (SSE) | binary (see app.book_stream)&hz=4
+            return self._book_stream(qs, symbol or store.state.symbol)
+        if path == "/api/positions":
+            positions = ledger.positions()
+            if symbol:
+                positions = {k: v for k, v in positions.items() if k == symbol}
+            return self._send(200, {"positions": positions, "totals": ledger.totals(), "updated_at": time.time()})
+        if path == "/api/history":
+            try:
+                return self._send(200, store.history.query(
+                    type_=qs.get("type"),
+                    symbol=symbol,
+                    before=qs.get("before"),
+                    after=qs.get("after"),
+                    limit=int(qs.get("limit", "100")),
+                ))
+            except ValueError as e:
+                return self._send(400, {"error": f"bad query: {e}"})
+        if path == "/admin/profile":
+            return self._profile(qs)
         if path == "/api/events":
-            with store.lock:
-                return self._send(200, store.state.events[:50])
+            return self._send_raw(200, events_json(store.recent_events(50, symbol)))
         return self._send(404, {"error": "not found"})
 
     def do_POST(self):
@@ -223,16 +559,30 @@ class Handler(BaseHTTPRequestHandler):
             with store.lock:
                 store.state.running = False
             _stop.set()
+            cancelled = cancel_all_symbols()
             store.add_event({"type": "system", "msg": "Bot stopped"})
-            return self._send(200, {"running": False})
+            return self._send(200, {"running": False, "cancelled": cancelled})
 
         return self._send(404, {"error": "not found"})
 
 def main():
     port = int(os.getenv("PORT", "8000"))
-    httpd = HTTPServer(("0.0.0.0", port), Handler)
+    if os.path.exists("ai_logs.sqlite"):
+        # a previous run left AI logs behind: drain them without waiting for a new one
+        get_aiq().resume()
+    if checkpointer:
+        restored = checkpointer.restore()
+        if restored:
+            print(f"Restored {', '.join(restored['parts'])} in {restored['ms']} ms (age {restored['age_s']} s)")
+        threading.Thread(target=reconcile_open_orders, daemon=True).start()
+        checkpointer.start()
+    httpd = ThreadingHTTPServer(("0.0.0.0", port), Handler)
     print(f"OrderSense backend running on http://localhost:{port}")
-    httpd.serve_forever()
+    try:
+        httpd.serve_forever()
+    finally:
+        if checkpointer:
+            checkpointer.stop()
 
 if __name__ == "__main__":
     main()